@@ -352,27 +352,25 @@ async def sync_garmin_data(
         from app.services.workout_sync import WorkoutSyncService
         from datetime import date, timedelta
         
-        # 创建Garmin服务实例（传入凭证，会自动登录）
-        garmin_service = GarminConnectService(
-            email=credentials["email"],
-            password=credentials["password"],
-            is_cn=credentials.get("is_cn", False),
-            user_id=current_user.id
-        )
-        
-        # 同步每日健康数据
+        # 同步每日健康数据（进入上下文时登录一次，所有日期复用同一客户端）
         synced_days = 0
         failed_days = 0
         today = date.today()
         
-        for i in range(sync_request.days):
-            target_date = today - timedelta(days=i)
-            try:
-                garmin_service.sync_daily_data(db, current_user.id, target_date)
-                synced_days += 1
-            except Exception as e:
-                logger.warning(f"同步 {target_date} 失败: {e}")
-                failed_days += 1
+        async with GarminConnectService(
+            email=credentials["email"],
+            password=credentials["password"],
+            is_cn=credentials.get("is_cn", False),
+            user_id=current_user.id
+        ) as garmin_service:
+            for i in range(sync_request.days):
+                target_date = today - timedelta(days=i)
+                try:
+                    garmin_service.sync_daily_data(db, current_user.id, target_date)
+                    synced_days += 1
+                except Exception as e:
+                    logger.warning(f"同步 {target_date} 失败: {e}")
+                    failed_days += 1
         
         # 同步运动活动数据
         synced_activities = 0
@@ -528,7 +526,7 @@ async def test_garmin_connection(
     
     注意：
     - 中国用户(garmin.cn)需要设置 is_cn=true
-    - 如果账号开启了两步验证(MFA)，会返回 mfa_required=true 和 client_state
+    - 如果账号开启了两步验证(MFA)，会返回 mfa_required=true 和 mfa_session_id
     """
     try:
         from app.services.data_collection.garmin_connect import GarminConnectService
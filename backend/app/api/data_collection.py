@@ -49,32 +49,40 @@ async def sync_garmin_data_range(
     access_token: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """批量同步指定日期范围的Garmin数据"""
+    """批量同步指定日期范围的Garmin数据（各日期并发请求，一次批量保存）"""
     service = DataCollectionService()
     results = []
     errors = []
     
+    try:
+        saved, failed = await service.sync_garmin_range(db, user_id, start_date, end_date, access_token)
+        sync_error = None
+    except Exception as e:
+        saved, failed = [], {}
+        sync_error = str(e)
+    saved_by_date = {row.record_date: row for row in saved}
+    
     current_date = start_date
     while current_date <= end_date:
-        try:
-            result = await service.sync_garmin_data(db, user_id, current_date, access_token)
-            if result:
-                results.append({
-                    "date": current_date.isoformat(),
-                    "data_id": result.id,
-                    "status": "success"
-                })
-            else:
-                errors.append({
-                    "date": current_date.isoformat(),
-                    "status": "failed",
-                    "reason": "无数据或同步失败"
-                })
-        except Exception as e:
+        result = saved_by_date.get(current_date)
+        error = sync_error or failed.get(current_date)
+        if result:
+            results.append({
+                "date": current_date.isoformat(),
+                "data_id": result.id,
+                "status": "success"
+            })
+        elif error:
             errors.append({
                 "date": current_date.isoformat(),
                 "status": "error",
-                "error": str(e)
+                "error": error
+            })
+        else:
+            errors.append({
+                "date": current_date.isoformat(),
+                "status": "failed",
+                "reason": "无数据或同步失败"
             })
         
         current_date += timedelta(days=1)
@@ -214,8 +214,8 @@ async def huawei_oauth_callback(
         )
     
     # 用 code 换取 token
+    adapter = HuaweiHealthAdapter()
     try:
-        adapter = HuaweiHealthAdapter()
         token_result = await adapter.exchange_code_for_token(
             request.code, 
             config.get("redirect_uri", "")
@@ -252,6 +252,8 @@ async def huawei_oauth_callback(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"授权失败: {str(e)}"
         )
+    finally:
+        await adapter.close()
 
 
 @router.post("/huawei/test-connection", summary="测试华为连接")
@@ -273,7 +275,10 @@ async def test_huawei_connection(
     
     try:
         adapter = DeviceManager.create_adapter_from_credential(credential)
-        result = await adapter.test_connection()
+        try:
+            result = await adapter.test_connection()
+        finally:
+            await adapter.close()
         
         if result["success"]:
             credential.mark_valid()
@@ -468,13 +473,9 @@ async def import_apple_health(
         )
     
     try:
-        # 读取文件内容
-        content = await file.read()
-        xml_content = content.decode('utf-8')
-        
-        # 解析 XML
+        # 解析 XML：直接流式读取上传的临时文件，不把整个文件读入内存
         logger.info(f"开始解析 Apple Health XML 文件 (用户 {current_user.id})")
-        parsed_data = AppleHealthAdapter.parse_health_xml(xml_content)
+        parsed_data = AppleHealthAdapter.parse_health_xml(file.file)
         
         if not parsed_data:
             raise HTTPException(
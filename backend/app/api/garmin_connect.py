@@ -5,7 +5,7 @@ from typing import Optional
 from datetime import date, timedelta
 from pydantic import BaseModel
 from app.database import get_db
-from app.services.data_collection.garmin_connect import GarminConnectService
+from app.services.data_collection.garmin_connect import GarminConnectService, get_service
 
 router = APIRouter()
 
@@ -22,6 +22,7 @@ class GarminConnectSyncRequest(BaseModel):
     target_date: Optional[date] = None
     start_date: Optional[date] = None
     end_date: Optional[date] = None
+    force_refresh: bool = False  # 重新获取已定稿且已入库的日期
 
 
 @router.post("/connect/login")
@@ -67,11 +68,13 @@ def sync_garmin_connect_data(
     注意：建议使用环境变量或安全的凭据管理，不要在前端直接传递密码
     """
     try:
-        service = GarminConnectService(credentials.email, credentials.password, user_id=request.user_id)
+        service = get_service(credentials.email, credentials.password, user_id=request.user_id)
         
         if request.target_date:
             # 同步单日数据
-            result = service.sync_daily_data(db, request.user_id, request.target_date)
+            result = service.sync_daily_data(
+                db, request.user_id, request.target_date, force_refresh=request.force_refresh
+            )
             if result:
                 return {
                     "status": "success",
@@ -87,7 +90,8 @@ def sync_garmin_connect_data(
         elif request.start_date and request.end_date:
             # 批量同步日期范围
             result = service.sync_date_range(
-                db, request.user_id, request.start_date, request.end_date
+                db, request.user_id, request.start_date, request.end_date,
+                force_refresh=request.force_refresh
             )
             return {
                 "status": "success",
@@ -121,7 +125,7 @@ def sync_today_garmin_data(
     """同步今日Garmin数据"""
     today = date.today()
     try:
-        service = GarminConnectService(credentials.email, credentials.password, user_id=user_id)
+        service = get_service(credentials.email, credentials.password, user_id=user_id)
         result = service.sync_daily_data(db, user_id, today)
         if result:
             return {
@@ -16,7 +16,7 @@ from app.schemas.heart_rate import (
     HeartRatePoint,
 )
 from app.services.auth import garmin_credential_service
-from app.services.data_collection.garmin_connect import GarminConnectService, GarminAuthenticationError
+from app.services.data_collection.garmin_connect import get_service, GarminAuthenticationError
 import logging
 
 logger = logging.getLogger(__name__)
@@ -258,8 +258,8 @@ async def get_realtime_heart_rate(
         )
     
     try:
-        service = GarminConnectService(credentials["email"], credentials["password"], is_cn=credentials.get("is_cn", False), user_id=current_user.id)
-        raw_hr_data = service.get_heart_rates(record_date)
+        service = get_service(credentials["email"], credentials["password"], is_cn=credentials.get("is_cn", False), user_id=current_user.id)
+        raw_hr_data = await service.aget_heart_rates(record_date)
         
         if not raw_hr_data:
             return {
@@ -15,6 +15,16 @@ class Settings(BaseSettings):
     garmin_email: Optional[str] = None
     garmin_password: Optional[str] = None
     
+    # Garmin接口响应本地缓存（SQLite文件路径，如 ~/.cache/health/garmin_cache.db；默认不缓存）
+    # 文件中保存各用户的原始健康数据，请放在仓库目录之外
+    garmin_cache_path: Optional[str] = None
+    
+    # Garmin登录令牌（garth OAuth）保存目录（用户主目录下，避免落入仓库），重启后免登录；留空则每次重新登录
+    garmin_token_dir: Optional[str] = "~/.garth"
+    
+    # Apple Health 导出解析结果的磁盘缓存目录（按文件内容摘要保存，留空则只缓存在内存中）
+    apple_health_cache_dir: Optional[str] = None
+    
     # Garmin API配置 (OAuth遗留)
     garmin_api_key: Optional[str] = None
     garmin_api_secret: Optional[str] = None
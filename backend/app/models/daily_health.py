@@ -1,5 +1,5 @@
 """日常健康记录模型"""
-from sqlalchemy import Column, Integer, Float, String, DateTime, Date, ForeignKey, Text, Time
+from sqlalchemy import Column, Integer, Float, String, DateTime, Date, ForeignKey, Text, Time, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -86,6 +86,11 @@ class GarminData(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     user = relationship("User", backref="garmin_records")
+    
+    __table_args__ = (
+        # 同一用户同一天只有一条记录，保存时据此做 upsert
+        Index('uq_garmin_user_date', 'user_id', 'record_date', unique=True),
+    )
 
 
 class ExerciseRecord(Base):
@@ -215,10 +220,10 @@ class HeartRateSample(Base):
     
     user = relationship("User", backref="heart_rate_samples")
     
-    # 复合索引：按用户和日期快速查询
+    # 复合唯一索引：按用户和日期快速查询，同步时据此做 upsert
     __table_args__ = (
         # 确保同一用户同一天同一时间只有一条记录
-        # Index('ix_hr_user_date', 'user_id', 'record_date'),
+        Index('uq_hr_user_date_time', 'user_id', 'record_date', 'sample_time', unique=True),
     )
 
 
@@ -3,7 +3,7 @@ import asyncio
 import logging
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
-from app.services.data_collection.garmin_connect import GarminConnectService, GarminAuthenticationError
+from app.services.data_collection.garmin_connect import get_service, GarminAuthenticationError
 from app.services.auth import garmin_credential_service
 from app.models.user import GarminCredential
 from app.database import SessionLocal
@@ -61,7 +61,7 @@ async def sync_user_garmin_data(
     try:
         server_type = "中国版" if is_cn else "国际版"
         logger.info(f"用户 {user_id} 使用 {server_type} Garmin服务器")
-        service = GarminConnectService(email, password, is_cn=is_cn, user_id=user_id)
+        service = get_service(email, password, is_cn=is_cn, user_id=user_id)
         
         # 计算日期范围
         end_date = get_china_today()
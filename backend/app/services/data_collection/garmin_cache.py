@@ -0,0 +1,243 @@
+"""Garmin接口响应的本地缓存（SQLite，按 账号/接口/日期 缓存，带TTL；以及HTTP条件请求的校验信息）"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from datetime import date
+from typing import Any, Optional, Tuple
+import logging
+
+from app.config import settings
+from app.utils import json_utils
+
+logger = logging.getLogger(__name__)
+
+try:
+    from requests.adapters import HTTPAdapter
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    HTTPAdapter = object
+    REQUESTS_AVAILABLE = False
+
+# HTTP连接池：日期范围同步时最多 4 天 × 4 个接口并发
+_POOL_CONNECTIONS = 8
+_POOL_MAXSIZE = 16
+
+# 今天、昨天的数据仍可能变化，缓存1小时；更早的日期数据已定稿，永久缓存
+_RECENT_DAYS = 2
+_RECENT_TTL_SECONDS = 3600
+
+
+def is_finalized(target_date: date) -> bool:
+    """该日期的数据是否已定稿（不会再变化）"""
+    return (date.today() - target_date).days >= _RECENT_DAYS
+
+
+def cache_ttl(target_date: date) -> Optional[float]:
+    """按日期返回缓存有效期（秒），None表示永不过期"""
+    if is_finalized(target_date):
+        return None
+    return _RECENT_TTL_SECONDS
+
+
+def cache_key(account_key: str, endpoint: str, date_str: str) -> str:
+    """缓存键: sha1(账号|接口|日期)"""
+    return hashlib.sha1(f"{account_key}|{endpoint}|{date_str}".encode()).hexdigest()
+
+
+def payload_fingerprint(payload: Any) -> str:
+    """按内容（键排序后）计算指纹，与字典插入顺序无关"""
+    return hashlib.blake2b(
+        json_utils.dumps(payload, sort_keys=True).encode(), digest_size=16
+    ).hexdigest()
+
+
+class GarminResponseCache:
+    """
+    基于 SQLite 的响应缓存
+
+    一个进程共享一个连接，读写由锁串行化，可在同步线程池中安全使用
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS garmin_response_cache ("
+            "key TEXT PRIMARY KEY, payload TEXT NOT NULL, fetched_at REAL NOT NULL, expires_at REAL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS garmin_http_validators ("
+            "key TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body BLOB NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS garmin_day_snapshots ("
+            "key TEXT PRIMARY KEY, summary_hash TEXT NOT NULL, payload TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        """读取未过期的缓存，未命中返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, expires_at FROM garmin_response_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        payload, expires_at = row
+        if expires_at is not None and expires_at < time.time():
+            return None
+        return json_utils.loads(payload)
+
+    def set(self, key: str, payload: Any, ttl: Optional[float]):
+        """写入缓存，ttl为None表示永不过期"""
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO garmin_response_cache (key, payload, fetched_at, expires_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json_utils.dumps(payload), now, expires_at)
+            )
+            self._conn.commit()
+
+    def get_validators(self, key: str) -> Optional[Tuple[Optional[str], Optional[str], bytes]]:
+        """读取某个URL上次响应的 (ETag, Last-Modified, 响应体)"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT etag, last_modified, body FROM garmin_http_validators WHERE key = ?", (key,)
+            ).fetchone()
+
+    def set_validators(self, key: str, etag: Optional[str], last_modified: Optional[str], body: bytes):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO garmin_http_validators (key, etag, last_modified, body) "
+                "VALUES (?, ?, ?, ?)",
+                (key, etag, last_modified, body)
+            )
+            self._conn.commit()
+
+    def get_day_snapshot(self, key: str) -> Optional[Tuple[str, Any]]:
+        """读取某天上次汇总数据的 (summary指纹, 汇总数据)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary_hash, payload FROM garmin_day_snapshots WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json_utils.loads(row[1])
+
+    def set_day_snapshot(self, key: str, summary_hash: str, payload: Any):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO garmin_day_snapshots (key, summary_hash, payload) VALUES (?, ?, ?)",
+                (key, summary_hash, json_utils.dumps(payload))
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_response_cache: Optional[GarminResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[GarminResponseCache]:
+    """获取进程级共享缓存；未配置 garmin_cache_path 或打开失败时返回None（不缓存）"""
+    global _response_cache
+    if not settings.garmin_cache_path:
+        return None
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                try:
+                    _response_cache = GarminResponseCache(settings.garmin_cache_path)
+                except sqlite3.Error as e:
+                    logger.warning(f"Garmin响应缓存不可用，将直接请求接口: {e}")
+                    return None
+    return _response_cache
+
+
+def _fast_json(response: Any):
+    """让 response.json() 走 json_utils（安装了 orjson 时比标准库快数倍），garth 解析响应时自动受益"""
+    if json_utils.ORJSON_AVAILABLE:
+        response.json = lambda **kwargs: json_utils.loads(response.content)
+    return response
+
+
+class GarminHTTPAdapter(HTTPAdapter):
+    """Garmin 会话使用的 requests 适配器：响应 JSON 用 json_utils 解析"""
+
+    def send(self, request, **kwargs):
+        return _fast_json(super().send(request, **kwargs))
+
+
+class ConditionalGetAdapter(GarminHTTPAdapter):
+    """
+    为 GET 请求附加 If-None-Match / If-Modified-Since 的 requests 适配器
+
+    服务端返回304时用本地保存的响应体还原为200响应，调用方（garth）无感知
+    """
+
+    def __init__(self, cache: GarminResponseCache, account_key: str, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+        self.account_key = account_key
+
+    def send(self, request, **kwargs):
+        if request.method != "GET":
+            return super().send(request, **kwargs)
+
+        key = cache_key(self.account_key, "GET", request.url)
+        stored = self.cache.get_validators(key)
+        if stored:
+            etag, last_modified, _ = stored
+            if etag:
+                request.headers["If-None-Match"] = etag
+            if last_modified:
+                request.headers["If-Modified-Since"] = last_modified
+
+        response = super().send(request, **kwargs)
+
+        if response.status_code == 304 and stored:
+            response.status_code = 200
+            response.reason = "OK"
+            response._content = stored[2]
+        elif response.status_code == 200:
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if etag or last_modified:
+                try:
+                    self.cache.set_validators(key, etag, last_modified, response.content)
+                except sqlite3.Error as e:
+                    logger.warning(f"保存Garmin响应校验信息失败: {e}")
+        return response
+
+
+def mount_garmin_adapter(session: Any, cache: Optional[GarminResponseCache], account_key: str) -> bool:
+    """
+    给 garth 的 requests.Session 挂载加大连接池的适配器，启用缓存时同时支持条件请求
+
+    保留原适配器的重试配置（429 仍交给上层限速器和退避处理）
+
+    Returns:
+        是否已挂载（未安装requests或没有会话时返回False）
+    """
+    if not REQUESTS_AVAILABLE or session is None:
+        return False
+    current = session.get_adapter("https://")
+    pool_kwargs = {
+        "pool_connections": _POOL_CONNECTIONS,
+        "pool_maxsize": _POOL_MAXSIZE,
+        "max_retries": getattr(current, "max_retries", 0),
+    }
+    if cache is not None:
+        adapter = ConditionalGetAdapter(cache, account_key, **pool_kwargs)
+    else:
+        adapter = GarminHTTPAdapter(**pool_kwargs)
+    session.mount("https://", adapter)
+    return True
@@ -1,10 +1,26 @@
 """Garmin Connect数据收集服务（使用社区库garminconnect）"""
 import asyncio
-from datetime import date, datetime, timedelta
-from typing import Optional, List, Dict, Any
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
+from datetime import date, datetime, timedelta, time as dt_time
+from typing import Optional, List, Dict, Any, Callable, Union
 from sqlalchemy.orm import Session
+from app.config import settings
 from app.models.daily_health import GarminData
 from app.schemas.daily_health import GarminDataCreate
+from app.services.data_collection.garmin_cache import (
+    cache_key, cache_ttl, get_response_cache, is_finalized, mount_garmin_adapter, payload_fingerprint
+)
+from app.services.data_collection.garmin_parser import parse_garmin_data
+from app.services.data_collection.garmin_service import GarminService
+from app.utils.db_utils import on_conflict_insert
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,6 +32,12 @@ except ImportError:
     GARMINCONNECT_AVAILABLE = False
     logger.warning("garminconnect库未安装，请运行: pip install garminconnect")
 
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
 
 class GarminAuthenticationError(Exception):
     """Garmin认证错误，用于标识凭证问题"""
@@ -29,13 +51,384 @@ class GarminMFARequiredError(Exception):
         self.client_state = client_state
 
 
+# 可重试的HTTP状态码（限流和服务端临时错误）
+_RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+_RETRY_MAX_ATTEMPTS = 5
+_RETRY_MAX_SLEEP = 60.0
+_STATUS_PATTERN = re.compile(r"\b(429|500|502|503|504)\b")
+
+
+def _extract_status(error: Exception) -> Optional[int]:
+    """从异常中提取HTTP状态码（兼容 garth/requests 的异常结构）"""
+    status = getattr(error, "status", None) or getattr(error, "status_code", None)
+    response = getattr(error, "response", None)
+    if status is None and response is not None:
+        status = getattr(response, "status_code", None)
+    if isinstance(status, int):
+        return status
+    match = _STATUS_PATTERN.search(str(error))
+    return int(match.group(1)) if match else None
+
+
+def _extract_retry_after(error: Exception) -> Optional[float]:
+    """读取 Retry-After 响应头（秒）"""
+    headers = getattr(error, "headers", None)
+    response = getattr(error, "response", None)
+    if headers is None and response is not None:
+        headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _with_retry(func: Callable, *args, limiter: Optional["_AdaptiveLimiter"] = None, **kwargs):
+    """
+    调用Garmin接口，遇到429/5xx时指数退避重试（带抖动，遵循Retry-After）
+    
+    传入 limiter 时每次请求前先取令牌，遇到429会降低其速率，并按Retry-After暂停放行
+    （其他线程的请求也一起等待）；其他异常直接抛出，由调用方处理
+    """
+    for attempt in range(_RETRY_MAX_ATTEMPTS):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            status = _extract_status(e)
+            retry_after = _extract_retry_after(e)
+            if status == 429 and limiter is not None:
+                limiter.penalize(retry_after)
+            if status not in _RETRYABLE_STATUS or attempt == _RETRY_MAX_ATTEMPTS - 1:
+                raise
+            delay = min(_RETRY_MAX_SLEEP, (2 ** attempt) * 0.5 + random.random() * 0.5)
+            if retry_after is not None:
+                delay = max(delay, min(retry_after, _RETRY_MAX_SLEEP))
+            logger.warning(f"Garmin接口返回 {status}，{delay:.1f}秒后重试（第{attempt + 1}次）")
+            time.sleep(delay)
+
+
+# 每日数据接口表: {结果键: (garminconnect客户端方法名, 日志名称)}
+_DAILY_ENDPOINTS = {
+    "summary": ("get_user_summary", "Garmin数据"),
+    "sleep": ("get_sleep_data", "睡眠数据"),
+    "heart_rate": ("get_heart_rates", "心率数据"),
+    "body_battery": ("get_body_battery", "身体电量数据"),
+    "stress": ("get_all_day_stress", "压力数据"),
+}
+
+
+# get_all_daily_data 中解析和心率采样都用不到的大型时间序列字段，获取后即丢弃
+_UNUSED_PAYLOAD_KEYS = {
+    "sleep": frozenset((
+        'sleepMovement', 'sleepLevels', 'sleepRestlessMoments', 'sleepHeartRate',
+        'sleepStress', 'sleepBodyBattery', 'wellnessEpochRespirationDataDTOList',
+        'wellnessEpochSPO2DataDTOList', 'breathingDisruptionData',
+    )),
+    "stress": frozenset(('stressValuesArray', 'bodyBatteryValuesArray')),
+}
+
+
+def _compact_payload(kind: str, data: Any) -> Any:
+    """只保留 parse_to_garmin_data_create 可能读取的字段，降低批量同步时的内存占用"""
+    unused = _UNUSED_PAYLOAD_KEYS.get(kind)
+    if not unused or not isinstance(data, dict):
+        return data
+    return {key: value for key, value in data.items() if key not in unused}
+
+
+# 调试日志中最多列出的字段名数量
+_DEBUG_MAX_KEYS = 20
+
+
+def _log_payload_shape(source: str, data: Any):
+    """DEBUG日志：字典列出前 _DEBUG_MAX_KEYS 个键（islice 逐个取，不复制整个键列表），列表记录长度"""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    if isinstance(data, dict):
+        logger.debug("从%s获取的数据键: %s", source, list(islice(data, _DEBUG_MAX_KEYS)))
+    elif isinstance(data, list):
+        logger.debug("从%s获取的是列表，长度: %s", source, len(data))
+    else:
+        logger.debug("从%s获取的数据类型: %s", source, type(data))
+
+
+def _date_range(start_date: date, end_date: date) -> List[date]:
+    """闭区间内的所有日期"""
+    return [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+
+
+def _date_str(value: Union[date, str]) -> str:
+    """日期参数统一转换为 YYYY-MM-DD 字符串（已是字符串则原样返回）"""
+    return value if isinstance(value, str) else value.isoformat()
+
+
+# 日期范围同步的并发数
+_SYNC_MAX_WORKERS = 4
+
+# 请求限速：正常时每秒5个请求（允许短时突发），遇到429后速率减半并保持60秒
+_RATE_LIMIT_PER_SECOND = 5.0
+_RATE_LIMIT_BURST = 5
+_RATE_LIMIT_MIN_PER_SECOND = 0.2
+_RATE_LIMIT_PENALTY_SECONDS = 60.0
+
+
+class _AdaptiveLimiter:
+    """
+    多线程共享的自适应令牌桶
+    
+    未被限流时按 base_rate 放行；penalize() 把速率减半（带 Retry-After 时暂停放行到该时刻），
+    距最近一次429超过 penalty_seconds 后恢复 base_rate
+    """
+    
+    def __init__(
+        self,
+        rate: float = _RATE_LIMIT_PER_SECOND,
+        burst: int = _RATE_LIMIT_BURST,
+        penalty_seconds: float = _RATE_LIMIT_PENALTY_SECONDS
+    ):
+        self.base_rate = rate
+        self.refill_rate = rate
+        self.burst = burst
+        self.penalty_seconds = penalty_seconds
+        self.tokens = float(burst)
+        self.last_429_ts: Optional[float] = None
+        self.paused_until = 0.0
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _refill(self, now: float):
+        if self.last_429_ts is not None and now - self.last_429_ts >= self.penalty_seconds:
+            self.refill_rate = self.base_rate
+            self.last_429_ts = None
+        self.tokens = min(self.burst, self.tokens + (now - self._last_refill) * self.refill_rate)
+        self._last_refill = now
+    
+    def acquire(self):
+        """取一个令牌，不足时预占并阻塞到令牌补足"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            delay = -self.tokens / self.refill_rate if self.tokens < 0 else 0.0
+            if self.paused_until > now:
+                delay += self.paused_until - now
+        if delay > 0:
+            time.sleep(delay)
+    
+    def penalize(self, retry_after: Optional[float] = None):
+        """收到429：速率减半（不低于下限），并重新开始计算恢复时间；有 Retry-After 时清空令牌并暂停放行"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.refill_rate = max(_RATE_LIMIT_MIN_PER_SECOND, self.refill_rate / 2)
+            self.last_429_ts = now
+            if retry_after is not None:
+                pause = min(retry_after, _RETRY_MAX_SLEEP)
+                self.paused_until = max(self.paused_until, now + pause)
+                self.tokens = min(self.tokens, 0.0)
+        logger.warning(f"Garmin接口限流，请求速率降至 {self.refill_rate:.2f} 次/秒")
+
+
+# 心率采样按15分钟分槽（每天96个槽）
+_HR_SLOT_SECONDS = 900
+_HR_SLOTS_PER_DAY = 96
+# 多天批量 upsert 时每条语句最多写入的行数（10天），避免超出SQLite绑定参数上限
+_HR_UPSERT_CHUNK_ROWS = _HR_SLOTS_PER_DAY * 10
+_HR_SAMPLE_KEY_FIELDS = ("user_id", "record_date", "sample_time")
+
+
+def _hr_sample_upsert(db: Session, rows: List[Dict[str, Any]]) -> bool:
+    """
+    按 (user_id, record_date, sample_time) 唯一索引 upsert 心率采样
+    
+    Returns:
+        数据库方言不支持 ON CONFLICT、或旧库尚未建立该唯一索引时返回False，由调用方回退到删除重插
+    """
+    from app.models.daily_health import HeartRateSample
+    
+    dialect_insert = on_conflict_insert(db, HeartRateSample.__table__, _HR_SAMPLE_KEY_FIELDS)
+    if dialect_insert is None:
+        return False
+    
+    stmt = dialect_insert(HeartRateSample).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(_HR_SAMPLE_KEY_FIELDS),
+        set_={
+            "heart_rate": stmt.excluded.heart_rate,
+            "source": stmt.excluded.source,
+        }
+    )
+    db.execute(stmt)
+    return True
+
+
+def _hr_sample_rows(user_id: int, record_date: date, hr_data: Any) -> List[Dict[str, Any]]:
+    """把一天的心率时间序列按15分钟分桶，转换为 heart_rate_samples 的行数据"""
+    if not isinstance(hr_data, dict):
+        return []
+    hr_values = hr_data.get("heartRateValues") or []
+    if not hr_values:
+        return []
+    return [
+        {
+            "user_id": user_id,
+            "record_date": record_date,
+            "sample_time": sample_time,
+            "heart_rate": value,
+            "source": "garmin",
+        }
+        for sample_time, value in _bucket_hr_samples(hr_values)
+    ]
+
+
+def _write_hr_samples(db: Session, user_id: int, dates: List[date], rows: List[Dict[str, Any]]):
+    """
+    写入心率采样行（不提交）
+    
+    单条 INSERT ... ON CONFLICT 写入，不支持的数据库或缺少唯一索引的旧库回退为删除这些日期后重插；
+    两条路径都走 Core 语句，不构造 ORM 对象
+    """
+    chunks = [rows[i:i + _HR_UPSERT_CHUNK_ROWS] for i in range(0, len(rows), _HR_UPSERT_CHUNK_ROWS)]
+    if _hr_sample_upsert(db, chunks[0]):
+        for chunk in chunks[1:]:
+            _hr_sample_upsert(db, chunk)
+        return
+    from app.models.daily_health import HeartRateSample
+    db.query(HeartRateSample).filter(
+        HeartRateSample.user_id == user_id,
+        HeartRateSample.record_date.in_(dates)
+    ).delete(synchronize_session=False)
+    db.execute(HeartRateSample.__table__.insert(), rows)
+
+
+def _local_utc_offset(timestamp: float) -> int:
+    """本地时区在指定时间戳处相对UTC的偏移（秒）"""
+    return int(datetime.fromtimestamp(timestamp).astimezone().utcoffset().total_seconds())
+
+
+def _bucket_hr_samples_numpy(hr_values: list) -> Optional[List[tuple]]:
+    """
+    使用 NumPy 向量化地把心率时间序列按15分钟分槽，每槽保留第一个有效值
+    
+    数据不是规整的 [[timestamp_ms, hr], ...] 数值矩阵、或当天跨越夏令时切换时返回None，
+    由调用方回退到逐条处理；未安装 NumPy 时同样返回None
+    """
+    if not NUMPY_AVAILABLE:
+        return None
+    
+    try:
+        arr = np.asarray(hr_values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return None
+    if arr.ndim != 2 or arr.shape[1] < 2:
+        return None
+    
+    timestamps = arr[:, 0]
+    values = arr[:, 1]
+    valid = ~np.isnan(timestamps) & (values > 0)
+    if not valid.any():
+        return []
+    
+    seconds = (timestamps[valid] // 1000).astype(np.int64)
+    offset = _local_utc_offset(int(seconds[0]))
+    if _local_utc_offset(int(seconds[-1])) != offset:
+        return None
+    
+    slots = ((seconds + offset) % 86400) // _HR_SLOT_SECONDS
+    unique_slots, first_index = np.unique(slots, return_index=True)
+    slot_values = values[valid][first_index].astype(np.int64)
+    
+    return [
+        (dt_time(slot // 4, (slot % 4) * 15), value)
+        for slot, value in zip(unique_slots.tolist(), slot_values.tolist())
+    ]
+
+
+def _bucket_hr_samples(hr_values: list) -> List[tuple]:
+    """
+    心率时间序列按15分钟分槽
+    
+    Returns:
+        按时间排序的 [(采样时间, 心率值)]，每个时间槽只保留第一个有效值
+    """
+    samples = _bucket_hr_samples_numpy(hr_values)
+    if samples is not None:
+        return samples
+    
+    # 下标为槽号 hour * 4 + minute // 15，元素为该槽第一个心率值
+    samples_by_slot: List[Optional[int]] = [None] * _HR_SLOTS_PER_DAY
+    # 时区偏移只会在整点变化（夏令时切换），按小时缓存，避免逐条构造 datetime
+    offsets_by_hour: Dict[int, int] = {}
+    for item in hr_values:
+        try:
+            if isinstance(item, (list, tuple)) and len(item) >= 2:
+                timestamp_ms = item[0]
+                hr_value = item[1]
+                
+                if hr_value is None or hr_value <= 0:
+                    continue
+                
+                # 时间戳换算为本地当天的秒数
+                seconds = int(timestamp_ms // 1000)
+                hour_key = seconds // 3600
+                offset = offsets_by_hour.get(hour_key)
+                if offset is None:
+                    offset = offsets_by_hour[hour_key] = _local_utc_offset(seconds)
+                
+                # 计算15分钟时间槽
+                slot_index = (seconds + offset) % 86400 // _HR_SLOT_SECONDS
+                
+                # 每个时间槽只保留第一个值
+                if samples_by_slot[slot_index] is None:
+                    samples_by_slot[slot_index] = int(hr_value)
+        except (ValueError, TypeError, IndexError, OverflowError, OSError):
+            continue
+    return [
+        (dt_time(*divmod(slot * 15, 60)), value)
+        for slot, value in enumerate(samples_by_slot)
+        if value is not None
+    ]
+
+
+# 登录失败熔断：连续认证失败后按账号指数退避，避免Garmin账号被锁定
+# 格式: {account_key: (连续失败次数, 下次允许登录的时间戳)}
+_auth_failures: Dict[str, tuple] = {}
+_AUTH_COOLDOWN_BASE = 5
+_AUTH_COOLDOWN_MAX = 3600
+
+
+def _auth_account_key(email: str, is_cn: bool) -> str:
+    """熔断器的账号键（区分国际版/中国版）"""
+    return f"{'cn' if is_cn else 'global'}:{email.lower()}"
+
+
+def _token_store_path(account_key: str) -> Optional[str]:
+    """账号对应的 garth 令牌目录（按账号键哈希分目录），未配置时返回None"""
+    if not settings.garmin_token_dir:
+        return None
+    digest = hashlib.sha1(account_key.encode()).hexdigest()[:16]
+    return os.path.join(os.path.expanduser(settings.garmin_token_dir), digest)
+
+
+def _record_auth_failure(account_key: str) -> float:
+    """记录一次认证失败，返回冷却秒数"""
+    count = _auth_failures.get(account_key, (0, 0.0))[0] + 1
+    cooldown = min(_AUTH_COOLDOWN_MAX, (2 ** count) * _AUTH_COOLDOWN_BASE)
+    _auth_failures[account_key] = (count, time.time() + cooldown)
+    return cooldown
+
+
 # 全局 MFA 会话存储（用于跨请求保持 client 对象）
-# 格式: {session_id: {"client": Garmin, "client_state": dict, "expires": timestamp}}
+# 格式: {session_id: {"client": Garmin, "client_state": dict, "owner": (user_id, email), "expires": timestamp}}
 _mfa_sessions: Dict[str, Any] = {}
+_MFA_SESSION_TTL = 300  # 5分钟过期
 
 def _cleanup_expired_mfa_sessions():
     """清理过期的 MFA 会话"""
-    import time
     current_time = time.time()
     expired_keys = [k for k, v in _mfa_sessions.items() if v.get("expires", 0) < current_time]
     for k in expired_keys:
@@ -46,6 +439,28 @@ def _generate_mfa_session_id() -> str:
     import uuid
     return str(uuid.uuid4())
 
+def _store_mfa_session(client, client_state: dict, email: str, is_cn: bool, user_id: Optional[int]) -> str:
+    """
+    保存待验证的 MFA 会话，返回不透明的 session_id
+    
+    同一 (user_id, email) 只保留最新的会话，重复测试连接不会堆积旧会话
+    """
+    _cleanup_expired_mfa_sessions()
+    owner = (user_id, email.lower())
+    for k in [k for k, v in _mfa_sessions.items() if v.get("owner") == owner]:
+        del _mfa_sessions[k]
+    
+    session_id = _generate_mfa_session_id()
+    _mfa_sessions[session_id] = {
+        "client": client,
+        "client_state": client_state,
+        "email": email,
+        "is_cn": is_cn,
+        "owner": owner,
+        "expires": time.time() + _MFA_SESSION_TTL
+    }
+    return session_id
+
 
 def verify_mfa_with_session(session_id: str, mfa_code: str) -> Dict[str, Any]:
     """
@@ -66,8 +481,6 @@ def verify_mfa_with_session(session_id: str, mfa_code: str) -> Dict[str, Any]:
             "is_cn": bool (如果成功)
         }
     """
-    import time
-    
     # 清理过期会话
     _cleanup_expired_mfa_sessions()
     
@@ -173,10 +586,53 @@ class GarminConnectService:
         self.user_id = user_id
         self.client: Optional[Garmin] = None
         self._authenticated = False
-        self._mfa_client_state = None  # 用于存储 MFA 状态
+        self._auth_lock = threading.Lock()
+        self._log_prefix_str = self._build_log_prefix()
+        self._garmin_service: Optional[GarminService] = None
+        self._limiter = _AdaptiveLimiter()
+        self._response_cache = get_response_cache()
     
-    def _log_prefix(self) -> str:
-        """生成日志前缀，包含用户信息"""
+    @property
+    def garmin_service(self) -> GarminService:
+        """数据入库服务，首次使用时创建并在实例内复用"""
+        if self._garmin_service is None:
+            self._garmin_service = GarminService()
+        return self._garmin_service
+    
+    async def __aenter__(self) -> "GarminConnectService":
+        """
+        异步上下文管理：进入时登录一次，块内所有操作复用同一个已认证客户端
+        
+        用法:
+            async with GarminConnectService(email, password) as service:
+                data = await service.aget_all_daily_data(target_date)
+        """
+        await asyncio.to_thread(self._ensure_authenticated)
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        """退出时释放客户端及其HTTP会话"""
+        self.close()
+        return False
+    
+    def close(self):
+        """
+        释放Garmin客户端，下次调用时会重新登录
+        
+        与登录共用 _auth_lock；正在进行的请求已持有 _ensure_authenticated 返回的客户端引用，不受影响
+        """
+        with self._auth_lock:
+            client, self.client = self.client, None
+            self._authenticated = False
+        session = getattr(getattr(client, "garth", None), "sess", None)
+        if session is not None and hasattr(session, "close"):
+            try:
+                session.close()
+            except Exception as e:
+                logger.debug(f"{self._log_prefix()} 关闭Garmin会话失败: {e}")
+    
+    def _build_log_prefix(self) -> str:
+        """生成日志前缀，包含用户信息（初始化时计算一次）"""
         if self.user_id:
             return f"[用户 {self.user_id}]"
         # 隐藏邮箱中间部分
@@ -187,33 +643,99 @@ class GarminConnectService:
             masked_email = '***'
         return f"[{masked_email}]"
     
-    def _ensure_authenticated(self):
-        """确保已认证，认证失败时抛出异常"""
+    def _log_prefix(self) -> str:
+        """日志前缀"""
+        return self._log_prefix_str
+    
+    def _ensure_authenticated(self) -> Any:
+        """
+        确保已认证并返回已登录的客户端，认证失败时抛出异常
+        
+        调用方应使用返回的客户端而不是再读 self.client：其他线程可能同时调用 close()
+        """
+        # 快速路径：已登录时只读两个属性，不争用锁（并发请求绝大多数走这里）
+        client = self.client
+        if self._authenticated and client is not None:
+            return client
         prefix = self._log_prefix()
-        if not self._authenticated or self.client is None:
-            try:
-                self.client = Garmin(self.email, self.password, is_cn=self.is_cn)
-                self.client.login()
-                self._authenticated = True
-                server_type = "中国版 (garmin.cn)" if self.is_cn else "国际版 (garmin.com)"
-                logger.info(f"{prefix} Garmin Connect登录成功 - {server_type}")
-            except Exception as e:
-                self._authenticated = False
-                error_msg = str(e).lower()
-                
-                # 检查是否需要设置密码
-                if 'set password' in error_msg or 'unexpected title' in error_msg:
-                    logger.warning(f"{prefix} Garmin账号需要设置密码")
+        # 多线程并发同步时共享同一客户端，加锁后再检查一次，避免重复登录
+        with self._auth_lock:
+            if not self._authenticated or self.client is None:
+                account_key = _auth_account_key(self.email, self.is_cn)
+                # 令牌登录不会触发账号锁定，熔断冷却期内也可以尝试
+                if self._login_with_saved_tokens(account_key):
+                    return self.client
+                failure = _auth_failures.get(account_key)
+                if failure and time.time() < failure[1]:
+                    retry_at = datetime.fromtimestamp(failure[1]).strftime('%H:%M:%S')
+                    logger.warning(f"{prefix} Garmin登录处于冷却期（连续失败 {failure[0]} 次），{retry_at} 后再试")
                     raise GarminAuthenticationError(
-                        "Garmin账号需要设置密码！请先访问 https://connect.garmin.com 登录并按提示完成密码设置，然后再尝试同步。"
-                    ) from e
+                        f"Garmin登录连续失败 {failure[0]} 次，为避免账号被锁定，请在 {retry_at} 之后重试"
+                    )
+                try:
+                    self.client = Garmin(self.email, self.password, is_cn=self.is_cn)
+                    self.client.login()
+                    self._authenticated = True
+                    _auth_failures.pop(account_key, None)
+                    self._save_tokens(account_key)
+                    self._configure_http_session()
+                    server_type = "中国版 (garmin.cn)" if self.is_cn else "国际版 (garmin.com)"
+                    logger.info(f"{prefix} Garmin Connect登录成功 - {server_type}")
+                except Exception as e:
+                    self._authenticated = False
+                    error_msg = str(e).lower()
                 
-                # 将登录失败转换为明确的认证错误
-                if any(kw in error_msg for kw in ['login', 'auth', '401', 'unauthorized', 'credential', 'password', 'oauth']):
-                    logger.error(f"{prefix} Garmin登录失败: {e}")
-                    raise GarminAuthenticationError(f"Garmin登录失败: {e}") from e
-                logger.error(f"{prefix} Garmin认证异常: {e}")
-                raise
+                    # 检查是否需要设置密码
+                    if 'set password' in error_msg or 'unexpected title' in error_msg:
+                        logger.warning(f"{prefix} Garmin账号需要设置密码")
+                        _record_auth_failure(account_key)
+                        raise GarminAuthenticationError(
+                            "Garmin账号需要设置密码！请先访问 https://connect.garmin.com 登录并按提示完成密码设置，然后再尝试同步。"
+                        ) from e
+                
+                    # 将登录失败转换为明确的认证错误
+                    if any(kw in error_msg for kw in ['login', 'auth', '401', 'unauthorized', 'credential', 'password', 'oauth']):
+                        cooldown = _record_auth_failure(account_key)
+                        logger.error(f"{prefix} Garmin登录失败（{cooldown}秒内不再重试）: {e}")
+                        raise GarminAuthenticationError(f"Garmin登录失败: {e}") from e
+                    logger.error(f"{prefix} Garmin认证异常: {e}")
+                    raise
+            return self.client
+    
+    def _login_with_saved_tokens(self, account_key: str) -> bool:
+        """
+        用上次保存的 garth OAuth 令牌登录，省去完整的登录握手
+        
+        令牌不存在、已失效或库版本不支持 tokenstore 时返回False，由调用方走账号密码登录
+        """
+        token_path = _token_store_path(account_key)
+        if not token_path or not os.path.isdir(token_path):
+            return False
+        try:
+            client = Garmin(self.email, self.password, is_cn=self.is_cn)
+            # login(tokenstore) 会加载令牌并请求用户资料，令牌失效时在此抛出
+            client.login(token_path)
+        except Exception as e:
+            logger.info(f"{self._log_prefix()} 已保存的Garmin令牌不可用，改用账号密码登录: {e}")
+            return False
+        self.client = client
+        self._authenticated = True
+        _auth_failures.pop(account_key, None)
+        self._configure_http_session()
+        logger.info(f"{self._log_prefix()} 使用已保存的令牌登录Garmin Connect")
+        return True
+    
+    def _save_tokens(self, account_key: str):
+        """保存 garth OAuth 令牌，进程重启后可直接复用"""
+        token_path = _token_store_path(account_key)
+        garth_client = getattr(self.client, "garth", None)
+        if not token_path or garth_client is None:
+            return
+        try:
+            os.makedirs(token_path, mode=0o700, exist_ok=True)
+            garth_client.dump(token_path)
+        except Exception as e:
+            logger.warning(f"{self._log_prefix()} 保存Garmin令牌失败: {e}")
     
     def test_connection_with_mfa(self) -> Dict[str, Any]:
         """
@@ -249,22 +771,10 @@ class GarminConnectService:
                 
                 # 检查是否是 MFA 需要的返回格式
                 if first_element == "needs_mfa" and isinstance(second_element, dict):
-                    import time
-                    
-                    # 清理过期会话
-                    _cleanup_expired_mfa_sessions()
-                    
-                    # 生成会话 ID 并存储 client 和 client_state
-                    session_id = _generate_mfa_session_id()
-                    _mfa_sessions[session_id] = {
-                        "client": self.client,
-                        "client_state": second_element,
-                        "email": self.email,
-                        "is_cn": self.is_cn,
-                        "expires": time.time() + 300  # 5分钟过期
-                    }
-                    
-                    self._mfa_client_state = second_element
+                    # 生成会话 ID 并在服务端保存 client 和 client_state
+                    session_id = _store_mfa_session(
+                        self.client, second_element, self.email, self.is_cn, self.user_id
+                    )
                     server_type = "中国版" if self.is_cn else "国际版"
                     logger.info(f"{prefix} Garmin {server_type} 需要两步验证，session_id: {session_id}")
                     return {
@@ -277,6 +787,7 @@ class GarminConnectService:
                 # 正常登录成功返回 (oauth1_token, oauth2_token)
                 if self.client.garth.oauth2_token:
                     self._authenticated = True
+                    _auth_failures.pop(_auth_account_key(self.email, self.is_cn), None)
                     server_type = "中国版 (garmin.cn)" if self.is_cn else "国际版 (garmin.com)"
                     logger.info(f"{prefix} Garmin Connect {server_type} 登录成功")
                     return {
@@ -296,6 +807,7 @@ class GarminConnectService:
             # 其他情况：登录成功（某些情况下可能不返回 tuple）
             if self.client.garth.oauth2_token:
                 self._authenticated = True
+                _auth_failures.pop(_auth_account_key(self.email, self.is_cn), None)
                 server_type = "中国版 (garmin.cn)" if self.is_cn else "国际版 (garmin.com)"
                 logger.info(f"{prefix} Garmin Connect {server_type} 登录成功")
                 return {
@@ -324,11 +836,13 @@ class GarminConnectService:
                     client_state = getattr(self.client.garth, '_client_state', None)
                 
                 if client_state:
-                    self._mfa_client_state = client_state
+                    session_id = _store_mfa_session(
+                        self.client, client_state, self.email, self.is_cn, self.user_id
+                    )
                     return {
                         "success": False,
                         "mfa_required": True,
-                        "client_state": client_state,
+                        "mfa_session_id": session_id,
                         "message": "🔐 需要两步验证！请输入验证码。"
                     }
             
@@ -355,12 +869,12 @@ class GarminConnectService:
                 "message": f"❌ 连接失败: {str(e)}"
             }
     
-    def resume_login_with_mfa(self, client_state: Dict[str, Any], mfa_code: str) -> Dict[str, Any]:
+    def resume_login_with_mfa(self, mfa_session_id: str, mfa_code: str) -> Dict[str, Any]:
         """
         使用 MFA 验证码恢复登录
         
         Args:
-            client_state: test_connection_with_mfa 返回的客户端状态
+            mfa_session_id: test_connection_with_mfa 返回的 session_id
             mfa_code: 用户输入的 MFA 验证码
             
         Returns:
@@ -369,226 +883,226 @@ class GarminConnectService:
                 "message": str
             }
         """
-        prefix = self._log_prefix()
-        try:
-            if self.client is None:
-                # 如果客户端不存在，需要重新创建
-                self.client = Garmin(self.email, self.password, is_cn=self.is_cn)
-            
-            # 使用验证码恢复登录
-            self.client.resume_login(client_state, mfa_code)
+        session = _mfa_sessions.get(mfa_session_id)
+        result = verify_mfa_with_session(mfa_session_id, mfa_code)
+        if result.get("success") and session:
+            # 复用已完成验证的客户端，后续请求无需重新登录
+            self.client = session["client"]
             self._authenticated = True
-            
-            server_type = "中国版" if self.is_cn else "国际版"
-            logger.info(f"{prefix} Garmin {server_type} MFA 验证成功")
-            
-            return {
-                "success": True,
-                "message": "✅ 验证成功！Garmin账号连接成功，可以保存凭证了。"
-            }
-            
-        except Exception as e:
-            error_msg = str(e).lower()
-            
-            if 'invalid' in error_msg or 'incorrect' in error_msg or 'wrong' in error_msg:
-                return {
-                    "success": False,
-                    "message": "❌ 验证码错误！请检查并重新输入。"
-                }
-            
-            logger.error(f"{prefix} MFA 验证失败: {e}")
-            return {
-                "success": False,
-                "message": f"❌ 验证失败: {str(e)}"
-            }
-
-
-    def get_user_summary(self, target_date: date) -> Optional[Dict[str, Any]]:
-        """
-        获取指定日期的每日摘要数据
-        
-        Args:
-            target_date: 目标日期
-            
-        Returns:
-            包含所有健康数据的字典，如果失败返回None
-        """
-        prefix = self._log_prefix()
-        try:
-            self._ensure_authenticated()
-            
-            # 使用get_user_summary获取每日摘要（garminconnect库的实际方法名）
-            summary = self.client.get_user_summary(target_date.isoformat())
-            
-            if summary:
-                logger.info(f"{prefix} 成功获取 {target_date} 的Garmin数据")
-                return summary
-            else:
-                logger.warning(f"{prefix} 未找到 {target_date} 的数据")
-                return None
-                
-        except GarminAuthenticationError:
-            raise
-        except Exception as e:
-            logger.error(f"{prefix} 获取Garmin数据失败: {str(e)}")
-            return None
+            self._configure_http_session()
+            self._save_tokens(_auth_account_key(self.email, self.is_cn))
+        return result
     
-    def get_sleep_data(self, target_date: date) -> Optional[Dict[str, Any]]:
+    def _configure_http_session(self):
         """
-        获取睡眠数据
-        
-        Args:
-            target_date: 目标日期
-            
-        Returns:
-            睡眠数据字典
+        配置客户端的HTTP会话：加大连接池以便并发请求复用TCP/TLS连接，
+        并使用 ETag/Last-Modified 条件请求，数据未变化时服务端只返回304
         """
-        prefix = self._log_prefix()
+        session = getattr(getattr(self.client, "garth", None), "sess", None)
         try:
-            self._ensure_authenticated()
-            sleep_data = self.client.get_sleep_data(target_date.isoformat())
-            if sleep_data:
-                logger.info(f"{prefix} 获取 {target_date} 的睡眠数据成功，类型: {type(sleep_data).__name__}")
-            else:
-                logger.warning(f"{prefix} 获取 {target_date} 的睡眠数据为空")
-            return sleep_data
-        except GarminAuthenticationError:
-            raise
+            mount_garmin_adapter(
+                session, self._response_cache, _auth_account_key(self.email, self.is_cn)
+            )
         except Exception as e:
-            logger.error(f"{prefix} 获取睡眠数据失败: {str(e)}")
-            return None
+            logger.warning(f"{self._log_prefix()} 配置HTTP会话失败: {e}")
     
-    def get_heart_rates(self, target_date: date) -> Optional[Dict[str, Any]]:
+    def _fetch(
+        self,
+        client_method: str,
+        label: str,
+        target_date: Union[date, str],
+        force_refresh: bool = False
+    ) -> Optional[Any]:
         """
-        获取心率数据
+        调用 garminconnect 客户端的按日期查询接口
+        
+        统一处理认证、429/5xx 重试和错误日志；认证错误向上抛出，其他错误返回None。
+        配置了本地响应缓存时，命中未过期的缓存直接返回，不发起请求也不登录
         
         Args:
-            target_date: 目标日期
-            
-        Returns:
-            心率数据字典
+            client_method: Garmin 客户端方法名
+            label: 日志中使用的数据名称
+            target_date: 目标日期（date 或 YYYY-MM-DD 字符串）
+            force_refresh: 为True时不读缓存，总是请求接口（结果仍写回缓存）
         """
-        prefix = self._log_prefix()
+        date_str = _date_str(target_date)
+        key = None
+        if self._response_cache is not None:
+            key = cache_key(_auth_account_key(self.email, self.is_cn), client_method, date_str)
+            cached = None if force_refresh else self._response_cache.get(key)
+            if cached is not None:
+                return cached
         try:
-            self._ensure_authenticated()
-            hr_data = self.client.get_heart_rates(target_date.isoformat())
-            return hr_data
+            client = self._ensure_authenticated()
+            data = _with_retry(
+                getattr(client, client_method), date_str, limiter=self._limiter
+            )
         except GarminAuthenticationError:
             # 认证错误需要传递出去
             raise
         except Exception as e:
-            logger.error(f"{prefix} 获取心率数据失败: {str(e)}")
+            logger.error(f"{self._log_prefix()} 获取{label}失败: {str(e)}")
             return None
-    
-    def get_body_battery(self, target_date: date) -> Optional[Dict[str, Any]]:
-        """
-        获取身体电量数据
         
-        Args:
-            target_date: 目标日期
-            
-        Returns:
-            身体电量数据字典
-        """
-        prefix = self._log_prefix()
-        try:
-            self._ensure_authenticated()
-            battery_data = self.client.get_body_battery(target_date.isoformat())
-            return battery_data
-        except GarminAuthenticationError:
-            raise
-        except Exception as e:
-            logger.error(f"{prefix} 获取身体电量数据失败: {str(e)}")
-            return None
+        # 只缓存有内容的响应，空数据可能稍后才同步到Garmin
+        if key is not None and data:
+            try:
+                self._response_cache.set(key, data, cache_ttl(date.fromisoformat(date_str)))
+            except Exception as e:
+                logger.warning(f"{self._log_prefix()} 写入{label}缓存失败: {e}")
+        return data
     
-    def get_stress_data(self, target_date: date) -> Optional[Dict[str, Any]]:
-        """
-        获取压力数据
-        
-        Args:
-            target_date: 目标日期
-            
-        Returns:
-            压力数据字典
-        """
-        prefix = self._log_prefix()
-        try:
-            self._ensure_authenticated()
-            # 使用get_all_day_stress获取压力数据（garminconnect库的实际方法名）
-            stress_data = self.client.get_all_day_stress(target_date.isoformat())
-            return stress_data
-        except GarminAuthenticationError:
-            raise
-        except Exception as e:
-            logger.error(f"{prefix} 获取压力数据失败: {str(e)}")
-            return None
+    def get_user_summary(
+        self, target_date: Union[date, str], force_refresh: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """获取指定日期的每日摘要数据（包含大部分健康数据），失败返回None"""
+        summary = self._fetch(*_DAILY_ENDPOINTS["summary"], target_date, force_refresh)
+        if summary:
+            logger.info(f"{self._log_prefix()} 成功获取 {target_date} 的Garmin数据")
+            return summary
+        logger.warning(f"{self._log_prefix()} 未找到 {target_date} 的数据")
+        return None
+    
+    def get_sleep_data(
+        self, target_date: Union[date, str], force_refresh: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """获取睡眠数据"""
+        sleep_data = self._fetch(*_DAILY_ENDPOINTS["sleep"], target_date, force_refresh)
+        if sleep_data:
+            logger.info(f"{self._log_prefix()} 获取 {target_date} 的睡眠数据成功，类型: {type(sleep_data).__name__}")
+        else:
+            logger.warning(f"{self._log_prefix()} 获取 {target_date} 的睡眠数据为空")
+        return sleep_data
+    
+    def get_heart_rates(
+        self, target_date: Union[date, str], force_refresh: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """获取心率数据"""
+        return self._fetch(*_DAILY_ENDPOINTS["heart_rate"], target_date, force_refresh)
+    
+    def get_body_battery(
+        self, target_date: Union[date, str], force_refresh: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """获取身体电量数据"""
+        return self._fetch(*_DAILY_ENDPOINTS["body_battery"], target_date, force_refresh)
+    
+    def get_stress_data(
+        self, target_date: Union[date, str], force_refresh: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """获取压力数据"""
+        return self._fetch(*_DAILY_ENDPOINTS["stress"], target_date, force_refresh)
+    
+    async def _acall(self, method_name: str, *args):
+        """在线程池中执行同步方法，避免阻塞事件循环"""
+        return await asyncio.to_thread(getattr(self, method_name), *args)
+    
+    async def aget_user_summary(self, target_date: date) -> Optional[Dict[str, Any]]:
+        """get_user_summary 的异步版本"""
+        return await self._acall("get_user_summary", target_date)
+    
+    async def aget_sleep_data(self, target_date: date) -> Optional[Dict[str, Any]]:
+        """get_sleep_data 的异步版本"""
+        return await self._acall("get_sleep_data", target_date)
     
-    def get_all_daily_data(self, target_date: date) -> Dict[str, Any]:
+    async def aget_heart_rates(self, target_date: date) -> Optional[Dict[str, Any]]:
+        """get_heart_rates 的异步版本"""
+        return await self._acall("get_heart_rates", target_date)
+    
+    async def aget_body_battery(self, target_date: date) -> Optional[Dict[str, Any]]:
+        """get_body_battery 的异步版本"""
+        return await self._acall("get_body_battery", target_date)
+    
+    async def aget_stress_data(self, target_date: date) -> Optional[Dict[str, Any]]:
+        """get_stress_data 的异步版本"""
+        return await self._acall("get_stress_data", target_date)
+    
+    async def aget_all_daily_data(self, target_date: date, force_refresh: bool = False) -> Dict[str, Any]:
+        """get_all_daily_data 的异步版本"""
+        return await self._acall("get_all_daily_data", target_date, force_refresh)
+    
+    def get_all_daily_data(self, target_date: Union[date, str], force_refresh: bool = False) -> Dict[str, Any]:
         """
         获取指定日期的所有数据（汇总）
         
         Args:
-            target_date: 目标日期
+            target_date: 目标日期（date 或 YYYY-MM-DD 字符串）
+            force_refresh: 为True时跳过响应缓存和汇总快照，重新请求各接口
             
         Returns:
             包含所有数据的字典
         """
         result = {}
+        # 日期字符串只计算一次，供各个接口复用
+        date_str = _date_str(target_date)
+        
+        # 先取用户摘要作为探针：与上次同步时的摘要指纹一致，说明当天数据没有变化，
+        # 直接返回上次的汇总结果，省去睡眠/心率等大数据量接口的请求
+        summary = self.get_user_summary(date_str, force_refresh)
+        snapshot_key = None
+        summary_hash = None
+        if self._response_cache is not None and summary and isinstance(summary, dict):
+            snapshot_key = cache_key(_auth_account_key(self.email, self.is_cn), "daily_snapshot", date_str)
+            summary_hash = payload_fingerprint(summary)
+            snapshot = None if force_refresh else self._response_cache.get_day_snapshot(snapshot_key)
+            if snapshot and snapshot[0] == summary_hash:
+                logger.debug("%s %s 的摘要未变化，复用上次的汇总数据", self._log_prefix(), date_str)
+                return snapshot[1]
+        
+        # 其余四个互不依赖的接口并发请求；登录由 _auth_lock 串行化，只会发生一次，
+        # 全部命中本地缓存时则完全不需要登录
+        getters = {
+            "sleep": self.get_sleep_data,
+            "heart_rate": self.get_heart_rates,
+            "body_battery": self.get_body_battery,
+            "stress": self.get_stress_data,
+        }
+        with ThreadPoolExecutor(max_workers=len(getters)) as executor:
+            futures = {key: executor.submit(getter, date_str, force_refresh) for key, getter in getters.items()}
+            fetched = {key: future.result() for key, future in futures.items()}
         
-        # 获取用户摘要（包含大部分数据）
-        summary = self.get_user_summary(target_date)
+        # 用户摘要（包含大部分数据）
         if summary:
             if isinstance(summary, dict):
                 result.update(summary)
-                logger.debug(f"从get_user_summary获取的数据键: {list(summary.keys())[:20]}")
+                _log_payload_shape("get_user_summary", summary)
             else:
                 logger.warning(f"get_user_summary返回的不是字典类型: {type(summary)}")
         
-        # 获取睡眠数据（优先使用独立API，数据更详细）
-        sleep_data = self.get_sleep_data(target_date)
+        # 睡眠数据（优先使用独立API，数据更详细）
+        sleep_data = _compact_payload('sleep', fetched["sleep"])
         if sleep_data:
             result['sleep'] = sleep_data
-            if isinstance(sleep_data, dict):
-                logger.debug(f"从get_sleep_data获取的数据键: {list(sleep_data.keys())[:20]}")
-            elif isinstance(sleep_data, list):
-                logger.debug(f"从get_sleep_data获取的是列表，长度: {len(sleep_data)}")
-            else:
-                logger.debug(f"从get_sleep_data获取的数据类型: {type(sleep_data)}")
+            _log_payload_shape("get_sleep_data", sleep_data)
         elif isinstance(summary, dict) and ('sleepScore' in summary or 'sleepScores' in summary):
             # 如果独立API没有数据，但summary中有睡眠数据，使用summary的
             logger.info("使用summary中的睡眠数据")
         
-        # 获取心率数据（优先使用独立API）
-        hr_data = self.get_heart_rates(target_date)
+        # 心率数据（优先使用独立API）
+        hr_data = fetched["heart_rate"]
         if hr_data:
             result['heart_rate'] = hr_data
-            if isinstance(hr_data, dict):
-                logger.debug(f"从get_heart_rates获取的数据键: {list(hr_data.keys())[:20]}")
-            elif isinstance(hr_data, list):
-                logger.debug(f"从get_heart_rates获取的是列表，长度: {len(hr_data)}")
-            else:
-                logger.debug(f"从get_heart_rates获取的数据类型: {type(hr_data)}")
+            _log_payload_shape("get_heart_rates", hr_data)
         elif isinstance(summary, dict) and ('averageHeartRate' in summary or 'avgHeartRate' in summary):
             # 如果独立API没有数据，但summary中有心率数据，使用summary的
             logger.info("使用summary中的心率数据")
         
-        # 获取身体电量
-        battery_data = self.get_body_battery(target_date)
+        # 身体电量
+        battery_data = fetched["body_battery"]
         if battery_data:
             result['body_battery'] = battery_data
-            if isinstance(battery_data, list):
-                logger.debug(f"从get_body_battery获取的是列表，长度: {len(battery_data)}")
-            elif isinstance(battery_data, dict):
-                logger.debug(f"从get_body_battery获取的数据键: {list(battery_data.keys())[:20]}")
+            _log_payload_shape("get_body_battery", battery_data)
         
-        # 获取压力数据
-        stress_data = self.get_stress_data(target_date)
+        # 压力数据
+        stress_data = _compact_payload('stress', fetched["stress"])
         if stress_data:
             result['stress'] = stress_data
-            if isinstance(stress_data, list):
-                logger.debug(f"从get_stress_data获取的是列表，长度: {len(stress_data)}")
-            elif isinstance(stress_data, dict):
-                logger.debug(f"从get_stress_data获取的数据键: {list(stress_data.keys())[:20]}")
+            _log_payload_shape("get_stress_data", stress_data)
+        
+        if snapshot_key is not None:
+            try:
+                self._response_cache.set_day_snapshot(snapshot_key, summary_hash, result)
+            except Exception as e:
+                logger.warning(f"{self._log_prefix()} 保存 {date_str} 的汇总快照失败: {e}")
         
         return result
     
@@ -609,544 +1123,37 @@ class GarminConnectService:
         Returns:
             GarminDataCreate对象
         """
-        # 调试：打印原始数据结构（仅前1000字符）
-        import json
-        raw_data_str = json.dumps(raw_data, indent=2, default=str)[:2000]
-        logger.debug(f"解析Garmin数据，原始数据结构（前2000字符）:\n{raw_data_str}")
-        
-        # 从get_user_summary获取的数据在根级别
-        summary = raw_data.copy() if isinstance(raw_data, dict) else {}
-        
-        # 处理睡眠数据（可能来自get_sleep_data或summary）
-        sleep_data_raw = raw_data.get('sleep') if isinstance(raw_data, dict) else None
-        
-        # 如果sleep_data是列表，取第一个元素；如果是字典，直接使用；否则为空字典
-        if isinstance(sleep_data_raw, list) and sleep_data_raw:
-            sleep_data = sleep_data_raw[0] if isinstance(sleep_data_raw[0], dict) else {}
-        elif isinstance(sleep_data_raw, dict):
-            sleep_data = sleep_data_raw
-        else:
-            sleep_data = {}
-        
-        # 辅助函数：安全获取嵌套字典值（支持多层嵌套）
-        def safe_get_nested(data, *keys, default=None):
-            """安全获取多层嵌套字典值"""
-            if not isinstance(data, dict):
-                return default
-            for key in keys:
-                if not isinstance(data, dict):
-                    return default
-                data = data.get(key)
-                if data is None:
-                    return default
-            return data if data is not None else default
-        
-        # 尝试多种方式获取睡眠分数
-        sleep_score = None
-        sleep_duration_seconds = 0
-        deep_sleep_seconds = 0
-        rem_sleep_seconds = 0
-        light_sleep_seconds = 0
-        awake_seconds = 0
-        nap_seconds = 0
-        avg_heart_rate_during_sleep = None
-        hrv = None  # HRV数据，优先从睡眠数据获取
-        
-        if isinstance(sleep_data, dict) and sleep_data:
-            # Garmin睡眠数据结构:
-            # sleep_data = {
-            #   'dailySleepDTO': {
-            #     'sleepTimeSeconds': 29280,
-            #     'sleepScores': {'overall': {'value': 87}},
-            #     'deepSleepSeconds': 3720,
-            #     ...
-            #   },
-            #   'restingHeartRate': 51,
-            #   ...
-            # }
-            
-            # 打印睡眠数据的顶层键
-            logger.info(f"睡眠数据顶层键: {list(sleep_data.keys())}")
-            
-            # 获取 dailySleepDTO
-            daily_sleep_dto = sleep_data.get('dailySleepDTO', {})
-            if not isinstance(daily_sleep_dto, dict):
-                daily_sleep_dto = {}
-            
-            # 打印 dailySleepDTO 的键和睡眠分数相关字段
-            if daily_sleep_dto:
-                logger.info(f"dailySleepDTO 键: {list(daily_sleep_dto.keys())}")
-                sleep_scores = daily_sleep_dto.get('sleepScores')
-                if sleep_scores:
-                    logger.info(f"sleepScores 内容: {sleep_scores}")
-            else:
-                logger.info("dailySleepDTO 为空")
-            
-            # 获取睡眠分数 - 正确的路径是 dailySleepDTO.sleepScores.overall.value
-            sleep_score = (
-                safe_get_nested(daily_sleep_dto, 'sleepScores', 'overall', 'value') or
-                safe_get_nested(sleep_data, 'sleepScores', 'overall', 'value') or
-                daily_sleep_dto.get('sleepScore') or
-                sleep_data.get('sleepScore') or
-                safe_get_nested(daily_sleep_dto, 'sleepScores', 'overall') or
-                sleep_data.get('overallSleepScore')
-            )
-            
-            # 如果sleep_score是字典（如 {'value': 87, 'qualifierKey': 'GOOD'}），提取value
-            if isinstance(sleep_score, dict):
-                sleep_score = sleep_score.get('value')
-            
-            logger.debug(f"提取的睡眠分数: {sleep_score}")
-            
-            # 睡眠时长（秒）- 从 dailySleepDTO 获取
-            sleep_duration_seconds = (
-                daily_sleep_dto.get('sleepTimeSeconds') or
-                sleep_data.get('sleepTimeSeconds') or
-                0
-            )
-            
-            # 睡眠阶段数据 - 从 dailySleepDTO 获取
-            deep_sleep_seconds = daily_sleep_dto.get('deepSleepSeconds', 0) or 0
-            rem_sleep_seconds = daily_sleep_dto.get('remSleepSeconds', 0) or 0
-            light_sleep_seconds = daily_sleep_dto.get('lightSleepSeconds', 0) or 0
-            awake_seconds = daily_sleep_dto.get('awakeSleepSeconds', 0) or 0
-            
-            # 小睡时长（秒）- 从 dailySleepDTO 获取
-            nap_seconds = daily_sleep_dto.get('napTimeSeconds', 0) or 0
-            
-            # 睡眠期间平均心率
-            avg_heart_rate_during_sleep = (
-                daily_sleep_dto.get('avgHeartRate') or
-                sleep_data.get('restingHeartRate')
-            )
-            
-            # HRV数据 - 从睡眠数据中获取
-            # avgOvernightHrv 是夜间平均HRV值
-            if hrv is None:
-                hrv = sleep_data.get('avgOvernightHrv')
-            
-            logger.info(f"解析睡眠数据: 分数={sleep_score}, 时长秒={sleep_duration_seconds}, 深睡={deep_sleep_seconds}, REM={rem_sleep_seconds}, HRV={hrv}")
-        else:
-            logger.warning(f"睡眠数据为空或格式不正确: type={type(sleep_data)}, 值={sleep_data}")
-        
-        # 如果从sleep_data没有获取到，尝试从summary获取
-        if isinstance(summary, dict):
-            if sleep_score is None:
-                score_val = (
-                    summary.get('sleepScore') or
-                    safe_get_nested(summary, 'sleepScores', 'overall', 'value') or
-                    safe_get_nested(summary, 'sleepScores', 'overall') or
-                    summary.get('overallSleepScore') or
-                    summary.get('sleepQualityScore')
-                )
-                # 如果是字典，提取value
-                if isinstance(score_val, dict):
-                    sleep_score = score_val.get('value')
-                else:
-                    sleep_score = score_val
-            if sleep_duration_seconds == 0:
-                sleep_millis = summary.get('sleepTimeMillis')
-                sleep_duration_seconds = (
-                    summary.get('sleepTimeSeconds') or
-                    summary.get('sleepDurationSeconds') or
-                    summary.get('sleepingSeconds') or
-                    (sleep_millis / 1000 if sleep_millis else 0) or
-                    summary.get('totalSleepTimeSeconds') or
-                    0
-                )
-            if deep_sleep_seconds == 0:
-                deep_sleep_seconds = summary.get('deepSleepSeconds', 0) or summary.get('deepSleepSecondsOvernight', 0) or 0
-            if rem_sleep_seconds == 0:
-                rem_sleep_seconds = summary.get('remSleepSeconds', 0) or summary.get('remSleepSecondsOvernight', 0) or 0
-            if light_sleep_seconds == 0:
-                light_sleep_seconds = summary.get('lightSleepSeconds', 0) or summary.get('lightSleepSecondsOvernight', 0) or 0
-            if awake_seconds == 0:
-                awake_seconds = summary.get('awakeSleepSeconds', 0) or summary.get('awakeSleepSecondsOvernight', 0) or 0
-        
-        # 处理心率数据（可能来自get_heart_rates或summary）
-        hr_data_raw = None
-        if isinstance(raw_data, dict):
-            hr_data_raw = raw_data.get('heart_rate') or raw_data.get('heartRates')
-        
-        # 如果hr_data是列表，取第一个元素；如果是字典，直接使用；否则为空字典
-        if isinstance(hr_data_raw, list) and hr_data_raw:
-            hr_data = hr_data_raw[0] if isinstance(hr_data_raw[0], dict) else {}
-        elif isinstance(hr_data_raw, dict):
-            hr_data = hr_data_raw
-        else:
-            hr_data = {}
-        
-        avg_hr = None
-        resting_hr = None
-        max_hr = None
-        min_hr = None
-        
-        if isinstance(hr_data, dict) and hr_data:
-            # 从独立的heart_rate数据中提取
-            hr_values = hr_data.get('heartRateValues')
-            first_hr_value = None
-            if isinstance(hr_values, list) and hr_values and isinstance(hr_values[0], dict):
-                first_hr_value = hr_values[0].get('value')
-            
-            avg_hr = (
-                hr_data.get('averageHeartRate') or
-                hr_data.get('avg') or
-                hr_data.get('avgHeartRate') or
-                hr_data.get('average') or
-                first_hr_value
-            )
-            resting_hr = (
-                hr_data.get('restingHeartRate') or
-                hr_data.get('resting') or
-                hr_data.get('restingHeartRateValue')
-            )
-            max_hr = hr_data.get('maxHeartRate') or hr_data.get('max')
-            min_hr = hr_data.get('minHeartRate') or hr_data.get('min')
-        
-        # 如果从hr_data没有获取到，尝试从summary获取
-        if isinstance(summary, dict):
-            if avg_hr is None:
-                avg_hr = (
-                    summary.get('averageHeartRate') or
-                    summary.get('avgHeartRate') or
-                    summary.get('avg') or
-                    summary.get('average') or
-                    summary.get('heartRateAverage')
-                )
-            if resting_hr is None:
-                resting_hr = (
-                    summary.get('restingHeartRate') or
-                    summary.get('resting') or
-                    summary.get('restingHeartRateValue')
-                )
-            if max_hr is None:
-                max_hr = summary.get('maxHeartRate') or summary.get('max')
-            if min_hr is None:
-                min_hr = summary.get('minHeartRate') or summary.get('min')
-        
-        # 如果还没有获取到静息心率，尝试从睡眠数据获取
-        if resting_hr is None and isinstance(sleep_data, dict):
-            resting_hr = sleep_data.get('restingHeartRate')
-            if resting_hr:
-                logger.info(f"从睡眠数据获取静息心率: {resting_hr}")
-        
-        # 如果还没有获取到平均心率，尝试从睡眠数据获取
-        if avg_hr is None and isinstance(sleep_data, dict):
-            daily_sleep_dto = sleep_data.get('dailySleepDTO', {})
-            if isinstance(daily_sleep_dto, dict):
-                avg_hr = daily_sleep_dto.get('avgHeartRate')
-                if avg_hr:
-                    logger.info(f"从睡眠数据获取平均心率: {avg_hr}")
-        
-        # HRV数据 - 如果从睡眠数据没有获取到，尝试从summary获取
-        if hrv is None and isinstance(summary, dict):
-            hrv = summary.get('hrv') or safe_get_nested(summary, 'hrvStatus', 'hrv') or summary.get('avgOvernightHrv')
-        
-        logger.debug(f"最终HRV值: {hrv}")
-        
-        # 身体电量数据（可能来自get_body_battery或summary）
-        battery_data_raw = None
-        if isinstance(raw_data, dict):
-            battery_data_raw = raw_data.get('body_battery') or raw_data.get('bodyBattery')
-        
-        logger.info(f"身体电量原始数据类型: {type(battery_data_raw)}")
-        if battery_data_raw:
-            if isinstance(battery_data_raw, list):
-                logger.info(f"身体电量原始数据(列表)长度: {len(battery_data_raw)}")
-                if battery_data_raw:
-                    sample = battery_data_raw[0] if len(battery_data_raw) > 0 else None
-                    logger.info(f"身体电量第一个元素: {sample}")
-            elif isinstance(battery_data_raw, dict):
-                logger.info(f"身体电量原始数据(字典)键: {list(battery_data_raw.keys())}")
-        
-        # 如果battery_data是列表，可能需要从中提取统计值
-        battery_data = {}
-        charged = None
-        drained = None
-        most_charged = None
-        lowest = None
+        return parse_garmin_data(raw_data, user_id, record_date)
+    
+    def parse_many(
+        self,
+        day_to_raw: Dict[date, Dict[str, Any]],
+        user_id: int
+    ) -> List[GarminDataCreate]:
+        """
+        批量解析多天的原始数据
         
-        if isinstance(battery_data_raw, list) and battery_data_raw:
-            # Garmin返回的是一个时间序列列表，每个元素包含 bodyBatteryLevel 等
-            # 需要遍历找到 charged/drained 或计算 most_charged/lowest
-            battery_levels = []
-            for item in battery_data_raw:
-                if isinstance(item, dict):
-                    level = item.get('bodyBatteryLevel') or item.get('level') or item.get('value')
-                    if level is not None:
-                        battery_levels.append(level)
-                    # 有些格式直接包含统计数据
-                    if item.get('charged') is not None:
-                        charged = item.get('charged')
-                    if item.get('drained') is not None:
-                        drained = item.get('drained')
-            
-            if battery_levels:
-                most_charged = max(battery_levels)
-                lowest = min(battery_levels)
-                # 估算充电和消耗（简化计算）
-                if charged is None and len(battery_levels) >= 2:
-                    # 计算总充电量（上升的部分之和）
-                    total_charged = 0
-                    total_drained = 0
-                    for i in range(1, len(battery_levels)):
-                        diff = battery_levels[i] - battery_levels[i-1]
-                        if diff > 0:
-                            total_charged += diff
-                        else:
-                            total_drained += abs(diff)
-                    charged = total_charged if total_charged > 0 else None
-                    drained = total_drained if total_drained > 0 else None
-            
-            logger.info(f"从列表计算: most_charged={most_charged}, lowest={lowest}, charged={charged}, drained={drained}")
+        Args:
+            day_to_raw: {日期: get_all_daily_data 返回的原始数据}
+            user_id: 用户ID
             
-        elif isinstance(battery_data_raw, dict):
-            battery_data = battery_data_raw
-            charged = battery_data.get('charged') or battery_data.get('bodyBatteryCharged') or battery_data.get('chargedValue')
-            drained = battery_data.get('drained') or battery_data.get('bodyBatteryDrained') or battery_data.get('drainedValue')
-            most_charged = battery_data.get('mostCharged') or battery_data.get('bodyBatteryMostCharged') or battery_data.get('mostChargedValue')
-            lowest = battery_data.get('lowest') or battery_data.get('bodyBatteryLowest') or battery_data.get('lowestValue')
-        
-        # 如果还没有获取到，尝试从 summary 获取
-        if most_charged is None and isinstance(summary, dict):
-            charged = charged or summary.get('bodyBatteryChargedValue') or summary.get('bodyBatteryCharged')
-            drained = drained or summary.get('bodyBatteryDrainedValue') or summary.get('bodyBatteryDrained')
-            most_charged = summary.get('bodyBatteryMostRecentValue') or summary.get('bodyBatteryHighestValue') or summary.get('bodyBatteryMostCharged')
-            lowest = summary.get('bodyBatteryLowestValue') or summary.get('bodyBatteryLowest')
-        
-        logger.info(f"最终身体电量: charged={charged}, drained={drained}, most_charged={most_charged}, lowest={lowest}")
-        
-        # 压力数据（可能来自get_all_day_stress或summary）
-        stress_data_raw = None
-        if isinstance(raw_data, dict):
-            stress_data_raw = raw_data.get('stress')
-        
-        stress_level = None
-        if isinstance(stress_data_raw, list) and stress_data_raw:
-            # get_all_day_stress返回的是数组，需要计算平均值
-            stress_values = [s.get('stressLevelValue', s.get('value', 0)) for s in stress_data_raw if isinstance(s, dict)]
-            stress_level = sum(stress_values) / len(stress_values) if stress_values else None
-        elif isinstance(stress_data_raw, dict) and stress_data_raw:
-            # get_all_day_stress返回字典，包含avgStressLevel和maxStressLevel
-            stress_level = (
-                stress_data_raw.get('avgStressLevel') or
-                stress_data_raw.get('averageStressLevel') or
-                stress_data_raw.get('stressLevel') or
-                stress_data_raw.get('value') or
-                stress_data_raw.get('stressLevelValue')
-            )
-        
-        # 如果从stress数据中没有获取到，尝试从summary获取
-        if stress_level is None and isinstance(summary, dict):
-            stress_level = (
-                summary.get('averageStressLevel') or
-                summary.get('avgStressLevel') or
-                summary.get('stressLevel') or
-                summary.get('stress')
-            )
-        
-        logger.debug(f"提取的压力水平: {stress_level} (来源: {'stress数据' if stress_data_raw else 'summary' if isinstance(summary, dict) else '无'})")
-        
-        # 活动数据（从summary获取）
-        steps = None
-        calories = None
-        active_minutes = None
-        
-        if isinstance(summary, dict):
-            # 步数：优先使用totalSteps
-            steps = (
-                summary.get('totalSteps') or 
-                summary.get('steps') or 
-                safe_get_nested(summary, 'stepGoal', 'steps')
-            )
-            # 卡路里：优先使用totalKilocalories
-            calories = (
-                summary.get('totalKilocalories') or
-                summary.get('activeKilocalories') or
-                summary.get('calories') or 
-                summary.get('caloriesBurned') or 
-                summary.get('totalCalories') or
-                safe_get_nested(summary, 'netCalorieGoal', 'calories')
-            )
-            moderate_mins = summary.get('moderateIntensityMinutes') or summary.get('moderateActivityMinutes') or 0
-            vigorous_mins = summary.get('vigorousIntensityMinutes') or summary.get('vigorousActivityMinutes') or 0
-            highly_active_seconds = summary.get('highlyActiveSeconds') or 0
-            active_minutes = summary.get('activeMinutes') or (highly_active_seconds // 60 if highly_active_seconds else 0) or (moderate_mins + vigorous_mins) or 0
-        
-        # 安全的数值转换函数
-        def safe_int(value):
-            """安全地将值转换为整数，如果是字典或列表则返回None"""
-            if value is None:
-                return None
-            if isinstance(value, (int, float)):
-                return int(value)
-            if isinstance(value, str):
-                try:
-                    return int(float(value))
-                except (ValueError, TypeError):
-                    return None
-            # 如果是字典或列表，尝试提取数值
-            if isinstance(value, dict):
-                # 尝试常见的数值字段名
-                for key in ['value', 'amount', 'count', 'total', 'average', 'avg']:
-                    if key in value and isinstance(value[key], (int, float)):
-                        return int(value[key])
-                return None
-            return None
-        
-        def safe_float(value):
-            """安全地将值转换为浮点数，如果是字典或列表则返回None"""
-            if value is None:
-                return None
-            if isinstance(value, (int, float)):
-                return float(value)
-            if isinstance(value, str):
-                try:
-                    return float(value)
-                except (ValueError, TypeError):
-                    return None
-            if isinstance(value, dict):
-                for key in ['value', 'amount', 'average', 'avg']:
-                    if key in value and isinstance(value[key], (int, float)):
-                        return float(value[key])
-                return None
-            return None
-        
-        # 睡眠时间转换（秒转分钟，处理毫秒）
-        def seconds_to_minutes(value):
-            if not value:
-                return None
-            if isinstance(value, (int, float)):
-                # 如果是毫秒，先转换为秒
-                if value > 86400:  # 如果大于一天的秒数，可能是毫秒
-                    value = value / 1000
-                return int(value // 60)
-            return None
-        
-        # 解析新增字段
-        # HRV状态
-        hrv_status = None
-        hrv_7day_avg = None
-        if isinstance(sleep_data, dict):
-            hrv_status = sleep_data.get('hrvStatus')
-            if isinstance(hrv_status, dict):
-                hrv_status = hrv_status.get('status') or hrv_status.get('hrvStatus')
-            # 7天平均HRV - 从weeklyAverages或直接值
-            hrv_7day_avg = safe_get_nested(sleep_data, 'hrvData', 'weeklyAvg') or sleep_data.get('hrvWeeklyAverage')
-        
-        # 强度活动时间
-        moderate_intensity_mins = 0
-        vigorous_intensity_mins = 0
-        intensity_goal = None
-        if isinstance(summary, dict):
-            moderate_intensity_mins = summary.get('moderateIntensityMinutes', 0) or 0
-            vigorous_intensity_mins = summary.get('vigorousIntensityMinutes', 0) or 0
-            intensity_goal = summary.get('intensityMinutesGoal') or summary.get('weeklyIntensityMinutesGoal')
-        
-        # 卡路里详细分类
-        active_cals = None
-        bmr_cals = None
-        if isinstance(summary, dict):
-            active_cals = summary.get('activeKilocalories') or summary.get('activeCalories')
-            bmr_cals = summary.get('bmrKilocalories') or summary.get('restingCalories') or summary.get('bmrCalories')
-        
-        # 呼吸数据
-        avg_resp_awake = None
-        avg_resp_sleep = None
-        lowest_resp = None
-        highest_resp = None
-        if isinstance(sleep_data, dict):
-            daily_dto = sleep_data.get('dailySleepDTO', {})
-            if isinstance(daily_dto, dict):
-                avg_resp_sleep = daily_dto.get('avgRespirationValue') or daily_dto.get('averageRespirationValue')
-                lowest_resp = daily_dto.get('lowestRespirationValue')
-                highest_resp = daily_dto.get('highestRespirationValue')
-        if isinstance(summary, dict):
-            avg_resp_awake = summary.get('avgWakingRespirationValue') or summary.get('averageRespirationValue')
-            if lowest_resp is None:
-                lowest_resp = summary.get('lowestRespirationValue')
-            if highest_resp is None:
-                highest_resp = summary.get('highestRespirationValue')
-        
-        # 血氧数据
-        spo2_avg = None
-        spo2_min = None
-        spo2_max = None
-        if isinstance(summary, dict):
-            spo2_avg = summary.get('averageSpO2') or summary.get('avgSpO2')
-            spo2_min = summary.get('lowestSpO2') or summary.get('minSpO2')
-            spo2_max = summary.get('highestSpO2') or summary.get('maxSpO2')
-        
-        # VO2 Max
-        vo2max_run = None
-        vo2max_cycle = None
-        if isinstance(summary, dict):
-            vo2max_run = summary.get('vo2MaxRunning') or summary.get('vo2Max')
-            vo2max_cycle = summary.get('vo2MaxCycling')
-        
-        # 楼层和距离
-        floors = None
-        floors_goal_val = None
-        distance = None
-        if isinstance(summary, dict):
-            floors = summary.get('floorsAscended') or summary.get('floorsClimbed')
-            floors_goal_val = summary.get('floorsAscendedGoal') or summary.get('floorsGoal')
-            distance = summary.get('totalDistanceMeters') or summary.get('distanceInMeters')
-        
-        # 记录解析结果用于调试
-        logger.info(f"解析结果 - 睡眠分数: {sleep_score}, 睡眠时长(秒): {sleep_duration_seconds}, 静息心率: {resting_hr}, 平均心率: {avg_hr}")
-        
-        result = GarminDataCreate(
-            user_id=user_id,
-            record_date=record_date,
-            avg_heart_rate=safe_int(avg_hr),
-            max_heart_rate=safe_int(max_hr),
-            min_heart_rate=safe_int(min_hr),
-            resting_heart_rate=safe_int(resting_hr),
-            hrv=safe_float(hrv),
-            hrv_status=hrv_status,
-            hrv_7day_avg=safe_float(hrv_7day_avg),
-            sleep_score=safe_int(sleep_score),
-            total_sleep_duration=seconds_to_minutes(sleep_duration_seconds),
-            deep_sleep_duration=seconds_to_minutes(deep_sleep_seconds),
-            rem_sleep_duration=seconds_to_minutes(rem_sleep_seconds),
-            light_sleep_duration=seconds_to_minutes(light_sleep_seconds),
-            awake_duration=seconds_to_minutes(awake_seconds),
-            nap_duration=seconds_to_minutes(nap_seconds),
-            body_battery_charged=safe_int(charged),
-            body_battery_drained=safe_int(drained),
-            body_battery_most_charged=safe_int(most_charged),
-            body_battery_lowest=safe_int(lowest),
-            stress_level=safe_int(stress_level),
-            steps=safe_int(steps),
-            calories_burned=safe_int(calories),
-            active_calories=safe_int(active_cals),
-            bmr_calories=safe_int(bmr_cals),
-            active_minutes=safe_int(active_minutes),
-            intensity_minutes_goal=safe_int(intensity_goal),
-            moderate_intensity_minutes=safe_int(moderate_intensity_mins),
-            vigorous_intensity_minutes=safe_int(vigorous_intensity_mins),
-            avg_respiration_awake=safe_float(avg_resp_awake),
-            avg_respiration_sleep=safe_float(avg_resp_sleep),
-            lowest_respiration=safe_float(lowest_resp),
-            highest_respiration=safe_float(highest_resp),
-            spo2_avg=safe_float(spo2_avg),
-            spo2_min=safe_float(spo2_min),
-            spo2_max=safe_float(spo2_max),
-            vo2max_running=safe_float(vo2max_run),
-            vo2max_cycling=safe_float(vo2max_cycle),
-            floors_climbed=safe_int(floors),
-            floors_goal=safe_int(floors_goal_val),
-            distance_meters=safe_float(distance),
-        )
-        
-        return result
+        Returns:
+            解析成功的GarminDataCreate列表（解析失败的日期会记录日志并跳过）
+        """
+        parsed = []
+        for record_date, raw_data in day_to_raw.items():
+            try:
+                parsed.append(self.parse_to_garmin_data_create(raw_data, user_id, record_date))
+            except Exception as e:
+                logger.error(f"{self._log_prefix()} 解析 {record_date} 的数据失败: {e}")
+        return parsed
     
     def sync_daily_data(
         self,
         db: Session,
         user_id: int,
-        target_date: date
+        target_date: date,
+        force_refresh: bool = False
     ) -> Optional[GarminData]:
         """
         同步指定日期的数据到数据库
@@ -1155,52 +1162,64 @@ class GarminConnectService:
             db: 数据库会话
             user_id: 用户ID
             target_date: 目标日期
+            force_refresh: 为True时即使数据已定稿且已入库也重新获取，且不使用本地响应缓存
             
         Returns:
             保存的GarminData对象，如果失败返回None
         """
         prefix = self._log_prefix()
         try:
+            # 已定稿且已入库的日期直接返回库中记录，不请求接口
+            if not force_refresh and is_finalized(target_date):
+                existing = db.query(GarminData).filter(
+                    GarminData.user_id == user_id,
+                    GarminData.record_date == target_date
+                ).first()
+                if existing is not None:
+                    logger.info("%s %s 的数据已定稿且已入库，跳过同步", prefix, target_date)
+                    return existing
+            
             # 获取所有数据
-            logger.info(f"{prefix} 开始获取 {target_date} 的数据...")
-            raw_data = self.get_all_daily_data(target_date)
+            logger.info("%s 开始获取 %s 的数据...", prefix, target_date)
+            raw_data = self.get_all_daily_data(target_date, force_refresh)
             
             if not raw_data:
-                logger.warning(f"{prefix} 未获取到 {target_date} 的数据（raw_data为空）")
+                logger.warning("%s 未获取到 %s 的数据（raw_data为空）", prefix, target_date)
                 return None
             
-            logger.info(f"{prefix} 获取到 {target_date} 的原始数据，键数量: {len(raw_data) if isinstance(raw_data, dict) else 'N/A'}")
+            logger.info("%s 获取到 %s 的原始数据，键数量: %s", prefix, target_date, len(raw_data) if isinstance(raw_data, dict) else 'N/A')
             
             # 解析数据
-            logger.info(f"{prefix} 开始解析 {target_date} 的数据...")
+            logger.info("%s 开始解析 %s 的数据...", prefix, target_date)
             garmin_data = self.parse_to_garmin_data_create(raw_data, user_id, target_date)
             
-            logger.info(f"{prefix} 解析完成，步数: {garmin_data.steps}, 心率: {garmin_data.resting_heart_rate}")
+            logger.info("%s 解析完成，步数: %s, 心率: %s", prefix, garmin_data.steps, garmin_data.resting_heart_rate)
             
             # 保存到数据库
-            logger.info(f"{prefix} 开始保存 {target_date} 的数据到数据库...")
-            from app.services.data_collection.garmin_service import GarminService
-            garmin_service = GarminService()
-            result = garmin_service.save_garmin_data(db, garmin_data)
+            logger.info("%s 开始保存 %s 的数据到数据库...", prefix, target_date)
+            result = self.garmin_service.save_garmin_data(db, garmin_data)
             
-            logger.info(f"{prefix} 成功保存 {target_date} 的数据，ID: {result.id}")
+            logger.info("%s 成功保存 %s 的数据，ID: %s", prefix, target_date, result.id)
             
-            # 同步心率采样数据
-            self._sync_heart_rate_samples(db, user_id, target_date)
+            # 同步心率采样数据（复用已获取的心率数据）
+            self._sync_heart_rate_samples(db, user_id, target_date, raw_data.get('heart_rate'))
             
             return result
             
         except Exception as e:
-            import traceback
-            logger.error(f"{prefix} 同步Garmin数据失败: {str(e)}")
-            logger.error(f"{prefix} 详细错误: {traceback.format_exc()}")
+            logger.error("%s 同步Garmin数据失败: %s", prefix, e)
+            # format_exc 开销较大，仅在ERROR级别日志开启时生成
+            if logger.isEnabledFor(logging.ERROR):
+                import traceback
+                logger.error("%s 详细错误: %s", prefix, traceback.format_exc())
             return None
     
     def _sync_heart_rate_samples(
         self,
         db: Session,
         user_id: int,
-        target_date: date
+        target_date: date,
+        hr_data: Optional[Dict[str, Any]] = None
     ) -> int:
         """
         同步心率采样数据（每15分钟一个点）
@@ -1209,6 +1228,7 @@ class GarminConnectService:
             db: 数据库会话
             user_id: 用户ID
             target_date: 目标日期
+            hr_data: 已获取的心率数据，为空时重新请求
             
         Returns:
             保存的采样点数量
@@ -1216,85 +1236,90 @@ class GarminConnectService:
         prefix = self._log_prefix()
         try:
             # 获取心率时间序列数据
-            hr_data = self.get_heart_rates(target_date)
+            if not isinstance(hr_data, dict):
+                hr_data = self.get_heart_rates(target_date)
             
             if not hr_data:
                 logger.debug(f"{prefix} 未获取到 {target_date} 的心率时间序列数据")
                 return 0
             
-            # 解析心率数据
-            hr_values = hr_data.get("heartRateValues") or []
-            if not hr_values:
+            rows = _hr_sample_rows(user_id, target_date, hr_data)
+            if not rows:
                 logger.debug(f"{prefix} {target_date} 的心率时间序列数据为空")
                 return 0
             
-            from app.models.daily_health import HeartRateSample
-            from datetime import time as dt_time
+            _write_hr_samples(db, user_id, [target_date], rows)
+            db.commit()
             
-            # 按15分钟间隔采样
-            samples_by_slot = {}  # key: "HH:MM" (每15分钟一个slot)
+            logger.info(f"{prefix} 保存了 {target_date} 的 {len(rows)} 个心率采样点")
+            return len(rows)
             
-            for item in hr_values:
-                try:
-                    if isinstance(item, (list, tuple)) and len(item) >= 2:
-                        timestamp_ms = item[0]
-                        hr_value = item[1]
-                        
-                        if hr_value is None or hr_value <= 0:
-                            continue
-                        
-                        # 转换时间戳
-                        dt = datetime.fromtimestamp(timestamp_ms / 1000)
-                        
-                        # 计算15分钟时间槽
-                        slot_minute = (dt.minute // 15) * 15
-                        slot_key = f"{dt.hour:02d}:{slot_minute:02d}"
-                        
-                        # 每个时间槽只保留第一个值
-                        if slot_key not in samples_by_slot:
-                            samples_by_slot[slot_key] = {
-                                "time": dt_time(dt.hour, slot_minute),
-                                "value": int(hr_value)
-                            }
-                except (ValueError, TypeError, IndexError):
-                    continue
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"{prefix} 同步心率采样数据失败: {e}")
+            return 0
+    
+    def _sync_heart_rate_samples_batch(
+        self,
+        db: Session,
+        user_id: int,
+        hr_by_date: Dict[date, Optional[Dict[str, Any]]]
+    ) -> int:
+        """
+        批量同步多天的心率采样数据：所有日期的采样点一条语句写入、一次提交
+        
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            hr_by_date: 日期 -> 已获取的心率数据
             
-            if not samples_by_slot:
+        Returns:
+            保存的采样点数量
+        """
+        prefix = self._log_prefix()
+        try:
+            rows = []
+            dates = []
+            for record_date, hr_data in hr_by_date.items():
+                day_rows = _hr_sample_rows(user_id, record_date, hr_data)
+                if day_rows:
+                    rows.extend(day_rows)
+                    dates.append(record_date)
+            if not rows:
                 return 0
             
-            # 删除该日期已有的采样数据
-            db.query(HeartRateSample).filter(
-                HeartRateSample.user_id == user_id,
-                HeartRateSample.record_date == target_date
-            ).delete()
-            
-            # 批量插入新数据
-            samples_to_insert = []
-            for slot_key, data in sorted(samples_by_slot.items()):
-                samples_to_insert.append(HeartRateSample(
-                    user_id=user_id,
-                    record_date=target_date,
-                    sample_time=data["time"],
-                    heart_rate=data["value"],
-                    source="garmin"
-                ))
-            
-            db.bulk_save_objects(samples_to_insert)
+            _write_hr_samples(db, user_id, dates, rows)
             db.commit()
             
-            logger.info(f"{prefix} 保存了 {target_date} 的 {len(samples_to_insert)} 个心率采样点")
-            return len(samples_to_insert)
+            logger.info(f"{prefix} 保存了 {len(dates)} 天共 {len(rows)} 个心率采样点")
+            return len(rows)
             
         except Exception as e:
-            logger.warning(f"{prefix} 同步心率采样数据失败: {e}")
+            db.rollback()
+            logger.warning(f"{prefix} 批量同步心率采样数据失败: {e}")
             return 0
     
-    def sync_date_range(
+    def _finalized_records(
         self,
         db: Session,
         user_id: int,
         start_date: date,
         end_date: date
+    ) -> Dict[date, int]:
+        """一次查询日期范围内已入库且已定稿的记录，返回 日期 -> 记录ID"""
+        rows = db.query(GarminData.record_date, GarminData.id).filter(
+            GarminData.user_id == user_id,
+            GarminData.record_date.between(start_date, end_date)
+        ).all()
+        return {record_date: data_id for record_date, data_id in rows if is_finalized(record_date)}
+    
+    def sync_date_range(
+        self,
+        db: Session,
+        user_id: int,
+        start_date: date,
+        end_date: date,
+        force_refresh: bool = False
     ) -> Dict[str, Any]:
         """
         批量同步日期范围的数据
@@ -1304,48 +1329,192 @@ class GarminConnectService:
             user_id: 用户ID
             start_date: 开始日期
             end_date: 结束日期
+            force_refresh: 为True时重新获取已定稿且已入库的日期，且不使用本地响应缓存
             
         Returns:
-            同步结果统计
+            同步结果统计（已跳过的日期计入 skipped_count）
+        """
+        errors = []
+        raw_by_date: Dict[date, Dict[str, Any]] = {}
+        skipped = {} if force_refresh else self._finalized_records(db, user_id, start_date, end_date)
+        dates = [d for d in _date_range(start_date, end_date) if d not in skipped]
+        
+        # 1. 并发获取各日原始数据（每个请求经 self._limiter 限速，遇到429自动降速）
+        if dates:
+            with ThreadPoolExecutor(max_workers=min(_SYNC_MAX_WORKERS, len(dates))) as executor:
+                futures = {executor.submit(self.get_all_daily_data, d, force_refresh): d for d in dates}
+                try:
+                    for future in as_completed(futures):
+                        current_date = futures[future]
+                        try:
+                            raw_data = future.result()
+                        except GarminAuthenticationError:
+                            raise
+                        except Exception as e:
+                            errors.append({
+                                "date": current_date.isoformat(),
+                                "status": "error",
+                                "error": str(e)
+                            })
+                            continue
+                        if raw_data:
+                            raw_by_date[current_date] = raw_data
+                        else:
+                            errors.append({
+                                "date": current_date.isoformat(),
+                                "status": "no_data"
+                            })
+                except GarminAuthenticationError:
+                    # 认证错误需要向上传递，让调用者处理；取消尚未开始的请求
+                    for pending in futures:
+                        pending.cancel()
+                    raise
+        return self._store_date_range(db, user_id, raw_by_date, errors, skipped)
+    
+    async def async_sync_date_range(
+        self,
+        db: Session,
+        user_id: int,
+        start_date: date,
+        end_date: date,
+        force_refresh: bool = False
+    ) -> Dict[str, Any]:
+        """
+        sync_date_range 的异步版本
+        
+        各日数据在事件循环中并发获取（信号量限制同时进行的日期数，请求仍经 self._limiter 限速），
+        解析和写库放到工作线程中执行，不阻塞事件循环
+        
+        Returns:
+            同步结果统计（与 sync_date_range 相同）
         """
-        results = []
         errors = []
-        current_date = start_date
+        raw_by_date: Dict[date, Dict[str, Any]] = {}
+        skipped = {} if force_refresh else await asyncio.to_thread(
+            self._finalized_records, db, user_id, start_date, end_date
+        )
+        dates = [d for d in _date_range(start_date, end_date) if d not in skipped]
+        semaphore = asyncio.Semaphore(_SYNC_MAX_WORKERS)
         
-        while current_date <= end_date:
-            try:
-                result = self.sync_daily_data(db, user_id, current_date)
-                if result:
-                    results.append({
-                        "date": current_date.isoformat(),
-                        "status": "success",
-                        "data_id": result.id
-                    })
-                else:
-                    errors.append({
-                        "date": current_date.isoformat(),
-                        "status": "no_data"
-                    })
-            except GarminAuthenticationError:
+        async def fetch(current_date: date) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                return await self.aget_all_daily_data(current_date, force_refresh)
+        
+        outcomes = await asyncio.gather(*(fetch(d) for d in dates), return_exceptions=True)
+        for current_date, outcome in zip(dates, outcomes):
+            if isinstance(outcome, GarminAuthenticationError):
                 # 认证错误需要向上传递，让调用者处理
-                raise
-            except Exception as e:
+                raise outcome
+            if isinstance(outcome, BaseException):
                 errors.append({
                     "date": current_date.isoformat(),
                     "status": "error",
-                    "error": str(e)
+                    "error": str(outcome)
+                })
+            elif outcome:
+                raw_by_date[current_date] = outcome
+            else:
+                errors.append({
+                    "date": current_date.isoformat(),
+                    "status": "no_data"
+                })
+        
+        return await asyncio.to_thread(self._store_date_range, db, user_id, raw_by_date, errors, skipped)
+    
+    def _store_date_range(
+        self,
+        db: Session,
+        user_id: int,
+        raw_by_date: Dict[date, Dict[str, Any]],
+        errors: List[Dict[str, Any]],
+        skipped: Optional[Dict[date, int]] = None
+    ) -> Dict[str, Any]:
+        """批量解析已获取的各日数据、一次性写入数据库并同步心率采样，返回同步结果统计"""
+        results = []
+        skipped = skipped or {}
+        raw_by_date = dict(sorted(raw_by_date.items()))
+        
+        # 2. 批量解析并一次性写入数据库
+        parsed = self.parse_many(raw_by_date, user_id)
+        parsed_dates = {item.record_date for item in parsed}
+        for record_date in raw_by_date:
+            if record_date not in parsed_dates:
+                errors.append({
+                    "date": record_date.isoformat(),
+                    "status": "error",
+                    "error": "数据解析失败"
                 })
-            
-            current_date += timedelta(days=1)
-            
-            # 避免请求过快，添加小延迟
-            import time
-            time.sleep(0.8)  # 稍微增加延迟，避免被Garmin限制
         
+        try:
+            saved = self.garmin_service.save_garmin_data_batch(db, parsed)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"{self._log_prefix()} 批量保存Garmin数据失败: {e}")
+            saved = []
+            errors.extend(
+                {"date": item.record_date.isoformat(), "status": "error", "error": str(e)}
+                for item in parsed
+            )
+        
+        # 3. 同步心率采样数据（所有日期一次写入）
+        for record in saved:
+            results.append({
+                "date": record.record_date.isoformat(),
+                "status": "success",
+                "data_id": record.id
+            })
+        self._sync_heart_rate_samples_batch(db, user_id, {
+            record.record_date: raw_by_date[record.record_date].get('heart_rate')
+            for record in saved
+        })
+        
+        results.extend(
+            {"date": record_date.isoformat(), "status": "skipped", "data_id": data_id}
+            for record_date, data_id in skipped.items()
+        )
+        results.sort(key=lambda item: item["date"])
+        errors.sort(key=lambda item: item["date"])
         return {
-            "success_count": len(results),
+            "success_count": len(results) - len(skipped),
+            "skipped_count": len(skipped),
             "error_count": len(errors),
             "results": results,
             "errors": errors
         }
 
+
+# 进程级服务缓存：同一账号的多次同步复用同一个已登录客户端、限速器和连接池
+_SERVICE_CACHE_MAXSIZE = 128
+_service_cache: "OrderedDict[tuple, GarminConnectService]" = OrderedDict()
+_service_cache_lock = threading.Lock()
+
+
+def get_service(
+    email: str,
+    password: str,
+    is_cn: bool = False,
+    user_id: int = None
+) -> GarminConnectService:
+    """
+    获取（或创建）按 账号/用户 缓存的 GarminConnectService
+    
+    密码变化时替换旧实例重新创建；超过容量时淘汰最久未使用的实例。
+    被替换/淘汰的实例在释放缓存锁后关闭（close 可能要等待该实例上进行中的登录）
+    """
+    key = (_auth_account_key(email, is_cn), user_id)
+    stale = []
+    with _service_cache_lock:
+        service = _service_cache.get(key)
+        if service is not None and service.password == password:
+            _service_cache.move_to_end(key)
+            return service
+        if service is not None:
+            stale.append(service)
+        service = GarminConnectService(email, password, is_cn=is_cn, user_id=user_id)
+        _service_cache[key] = service
+        _service_cache.move_to_end(key)
+        while len(_service_cache) > _SERVICE_CACHE_MAXSIZE:
+            stale.append(_service_cache.popitem(last=False)[1])
+    for old in stale:
+        old.close()
+    return service
@@ -0,0 +1,689 @@
+"""Garmin Connect 原始数据解析（纯数据转换，不涉及网络和数据库）"""
+from datetime import date
+from functools import lru_cache
+from typing import Optional, Dict, Any, Callable, Tuple
+import logging
+
+from app.schemas.daily_health import GarminDataCreate
+from app.utils import json_utils
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+PathResolver = Callable[[Any], Any]
+
+
+@lru_cache(maxsize=64)
+def _compile_path(path: Tuple[str, ...]) -> PathResolver:
+    """
+    把嵌套键路径编译为取值函数（按路径缓存）
+    
+    返回的函数在路径中任一层不是字典或缺失时返回None；
+    1~3 层路径展开为直接的 .get 调用，解析时不再逐键循环
+    """
+    if len(path) == 1:
+        (k1,) = path
+        
+        def resolve(data: Any) -> Any:
+            return data.get(k1) if isinstance(data, dict) else None
+    elif len(path) == 2:
+        k1, k2 = path
+        
+        def resolve(data: Any) -> Any:
+            if not isinstance(data, dict):
+                return None
+            value = data.get(k1)
+            return value.get(k2) if isinstance(value, dict) else None
+    elif len(path) == 3:
+        k1, k2, k3 = path
+        
+        def resolve(data: Any) -> Any:
+            if not isinstance(data, dict):
+                return None
+            value = data.get(k1)
+            if not isinstance(value, dict):
+                return None
+            value = value.get(k2)
+            return value.get(k3) if isinstance(value, dict) else None
+    else:
+        def resolve(data: Any) -> Any:
+            for key in path:
+                if not isinstance(data, dict):
+                    return None
+                data = data.get(key)
+            return data
+    return resolve
+
+
+def _compile_paths(paths: Tuple[Tuple[str, ...], ...]) -> Tuple[PathResolver, ...]:
+    return tuple(_compile_path(path) for path in paths)
+
+
+# 睡眠分数候选路径（按优先级排列），分别用于睡眠数据和 summary
+_SLEEP_SCORE_PATHS = _compile_paths((
+    ("sleepScores", "overall", "value"),
+    ("sleepScore",),
+    ("sleepScores", "overall"),
+    ("overallSleepScore",),
+))
+_SUMMARY_SLEEP_SCORE_PATHS = _compile_paths((
+    ("sleepScore",),
+    ("sleepScores", "overall", "value"),
+    ("sleepScores", "overall"),
+    ("overallSleepScore",),
+    ("sleepQualityScore",),
+))
+
+# 其他嵌套字段的取值函数
+_HRV_STATUS_HRV = _compile_path(('hrvStatus', 'hrv'))
+_STEP_GOAL_STEPS = _compile_path(('stepGoal', 'steps'))
+_CALORIE_GOAL_CALORIES = _compile_path(('netCalorieGoal', 'calories'))
+_HRV_WEEKLY_AVG = _compile_path(('hrvData', 'weeklyAvg'))
+
+
+def _first_path(data: Any, resolvers: Tuple[PathResolver, ...]) -> Any:
+    """按顺序尝试已编译的候选路径，返回第一个非空值（与 `a or b or ...` 语义一致），找不到返回None"""
+    if not isinstance(data, dict):
+        return None
+    for resolve in resolvers:
+        value = resolve(data)
+        if value:
+            return value
+    return None
+
+
+# summary/压力/身体电量字段的候选键（按优先级排列）
+_FIELD_KEYS = {
+    "heart_rate_payload": ('heart_rate', 'heartRates'),
+    "battery_payload": ('body_battery', 'bodyBattery'),
+    "hr_avg": ('averageHeartRate', 'avg', 'avgHeartRate', 'average'),
+    "summary_hr_avg": ('averageHeartRate', 'avgHeartRate', 'avg', 'average', 'heartRateAverage'),
+    "hr_resting": ('restingHeartRate', 'resting', 'restingHeartRateValue'),
+    "hr_max": ('maxHeartRate', 'max'),
+    "hr_min": ('minHeartRate', 'min'),
+    "summary_deep_sleep": ('deepSleepSeconds', 'deepSleepSecondsOvernight'),
+    "summary_rem_sleep": ('remSleepSeconds', 'remSleepSecondsOvernight'),
+    "summary_light_sleep": ('lightSleepSeconds', 'lightSleepSecondsOvernight'),
+    "summary_awake_sleep": ('awakeSleepSeconds', 'awakeSleepSecondsOvernight'),
+    "battery_level": ('bodyBatteryLevel', 'level', 'value'),
+    "moderate_minutes": ('moderateIntensityMinutes', 'moderateActivityMinutes'),
+    "vigorous_minutes": ('vigorousIntensityMinutes', 'vigorousActivityMinutes'),
+    "hrv_status": ('status', 'hrvStatus'),
+    "stress": ('avgStressLevel', 'averageStressLevel', 'stressLevel', 'value', 'stressLevelValue'),
+    "summary_stress": ('averageStressLevel', 'avgStressLevel', 'stressLevel', 'stress'),
+    "battery_charged": ('charged', 'bodyBatteryCharged', 'chargedValue'),
+    "battery_drained": ('drained', 'bodyBatteryDrained', 'drainedValue'),
+    "battery_most_charged": ('mostCharged', 'bodyBatteryMostCharged', 'mostChargedValue'),
+    "battery_lowest": ('lowest', 'bodyBatteryLowest', 'lowestValue'),
+    "summary_battery_charged": ('bodyBatteryChargedValue', 'bodyBatteryCharged'),
+    "summary_battery_drained": ('bodyBatteryDrainedValue', 'bodyBatteryDrained'),
+    "summary_battery_most_charged": ('bodyBatteryMostRecentValue', 'bodyBatteryHighestValue', 'bodyBatteryMostCharged'),
+    "summary_battery_lowest": ('bodyBatteryLowestValue', 'bodyBatteryLowest'),
+    "steps": ('totalSteps', 'steps'),
+    "calories": ('totalKilocalories', 'activeKilocalories', 'calories', 'caloriesBurned', 'totalCalories'),
+    "intensity_goal": ('intensityMinutesGoal', 'weeklyIntensityMinutesGoal'),
+    "active_calories": ('activeKilocalories', 'activeCalories'),
+    "bmr_calories": ('bmrKilocalories', 'restingCalories', 'bmrCalories'),
+    "resp_awake": ('avgWakingRespirationValue', 'averageRespirationValue'),
+    "resp_sleep": ('avgRespirationValue', 'averageRespirationValue'),
+    "spo2_avg": ('averageSpO2', 'avgSpO2'),
+    "spo2_min": ('lowestSpO2', 'minSpO2'),
+    "spo2_max": ('highestSpO2', 'maxSpO2'),
+    "vo2max_running": ('vo2MaxRunning', 'vo2Max'),
+    "floors": ('floorsAscended', 'floorsClimbed'),
+    "floors_goal": ('floorsAscendedGoal', 'floorsGoal'),
+    "distance": ('totalDistanceMeters', 'distanceInMeters'),
+}
+
+
+def _first_truthy(data: Dict[str, Any], keys: tuple) -> Any:
+    """
+    等价于 data.get(k1) or data.get(k2) or ...：返回第一个真值，
+    都不是真值时返回最后一个键的值
+    """
+    value = None
+    for key in keys:
+        value = data.get(key)
+        if value:
+            return value
+    return value
+
+
+def _first_present(data: Dict[str, Any], keys: tuple) -> Any:
+    """按顺序返回第一个不为None的字段值（0 是有效值，不会被跳过）"""
+    for key in keys:
+        value = data.get(key)
+        if value is not None:
+            return value
+    return None
+
+
+def _as_dict(value: Any) -> Dict[str, Any]:
+    """把子数据规范为字典：字典原样返回，列表取首个字典元素，其他情况返回空字典"""
+    if isinstance(value, dict):
+        return value
+    if isinstance(value, list) and value and isinstance(value[0], dict):
+        return value[0]
+    return {}
+
+
+def _first_hr_value(hr_data: Dict[str, Any]) -> Optional[Any]:
+    """取心率采样序列 heartRateValues 中第一个字典格式采样的 value"""
+    hr_values = hr_data.get('heartRateValues')
+    if isinstance(hr_values, list) and hr_values and isinstance(hr_values[0], dict):
+        return hr_values[0].get('value')
+    return None
+
+
+# 字典格式数值（如 {"value": 60}）中尝试的字段名
+_NUMERIC_DICT_KEYS_INT = ('value', 'amount', 'count', 'total', 'average', 'avg')
+_NUMERIC_DICT_KEYS_FLOAT = ('value', 'amount', 'average', 'avg')
+
+
+def _int_from_str(value: str) -> Optional[int]:
+    try:
+        return int(float(value))
+    except (ValueError, TypeError):
+        return None
+
+
+def _float_from_str(value: str) -> Optional[float]:
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _int_from_dict(value: dict) -> Optional[int]:
+    for key in _NUMERIC_DICT_KEYS_INT:
+        item = value.get(key)
+        if isinstance(item, (int, float)):
+            return int(item)
+    return None
+
+
+def _float_from_dict(value: dict) -> Optional[float]:
+    for key in _NUMERIC_DICT_KEYS_FLOAT:
+        item = value.get(key)
+        if isinstance(item, (int, float)):
+            return float(item)
+    return None
+
+
+def _int_fallback(value: Any) -> Optional[int]:
+    """未登记类型（int/float 子类等）走 isinstance 判断，其余返回None"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    return None
+
+
+def _float_fallback(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)):
+        return float(value)
+    return None
+
+
+def _return_none(_value: Any) -> None:
+    return None
+
+
+# 按 type(value) 分发的转换表，避免每个字段都走一串 isinstance
+_INT_DISPATCH = {
+    int: int,
+    float: int,
+    bool: int,
+    str: _int_from_str,
+    dict: _int_from_dict,
+    type(None): _return_none,
+}
+_FLOAT_DISPATCH = {
+    int: float,
+    float: float,
+    bool: float,
+    str: _float_from_str,
+    dict: _float_from_dict,
+    type(None): _return_none,
+}
+
+
+# 大于一天秒数的时长视为毫秒
+_MS_THRESHOLD = 86400
+
+
+def _secs_to_mins_batch(values: tuple) -> tuple:
+    """
+    睡眠时长批量转换（秒转分钟，处理毫秒）
+    
+    空值或非数值返回None，其余逐项转换为整数分钟
+    """
+    return tuple(
+        int((v / 1000 if v > _MS_THRESHOLD else v) // 60)
+        if v and isinstance(v, (int, float)) else None
+        for v in values
+    )
+
+
+def _is_empty_payload(raw_data: Any) -> bool:
+    """原始数据中没有任何有内容的字段（未佩戴设备或未来日期时Garmin常返回空结构）"""
+    if not isinstance(raw_data, dict):
+        return True
+    return all(
+        value is None or (isinstance(value, (dict, list, str)) and not value)
+        for value in raw_data.values()
+    )
+
+
+def _mean_stress(stress_items: list) -> Optional[float]:
+    """
+    计算全天压力采样的平均值
+    
+    Garmin 用 -1/-2 表示该时段无读数（未佩戴、活动中），不计入平均
+    """
+    values = (
+        item.get('stressLevelValue', item.get('value', 0))
+        for item in stress_items if isinstance(item, dict)
+    )
+    if NUMPY_AVAILABLE:
+        arr = np.fromiter(
+            (v if isinstance(v, (int, float)) else -1 for v in values), dtype=np.float64
+        )
+        arr = arr[arr >= 0]
+        return float(arr.mean()) if arr.size else None
+    valid = [v for v in values if isinstance(v, (int, float)) and v >= 0]
+    return sum(valid) / len(valid) if valid else None
+
+
+def _safe_int(value: Any) -> Optional[int]:
+    """安全地将值转换为整数，如果是列表等无法识别的类型则返回None"""
+    return _INT_DISPATCH.get(type(value), _int_fallback)(value)
+
+
+def _safe_float(value: Any) -> Optional[float]:
+    """安全地将值转换为浮点数，如果是列表等无法识别的类型则返回None"""
+    return _FLOAT_DISPATCH.get(type(value), _float_fallback)(value)
+
+
+# 直接从 summary 按候选键取值的字段: (GarminDataCreate字段, 候选键, 转换函数)
+_SUMMARY_FIELD_SPECS = (
+    ("intensity_minutes_goal", _FIELD_KEYS["intensity_goal"], _safe_int),
+    ("active_calories", _FIELD_KEYS["active_calories"], _safe_int),
+    ("bmr_calories", _FIELD_KEYS["bmr_calories"], _safe_int),
+    ("avg_respiration_awake", _FIELD_KEYS["resp_awake"], _safe_float),
+    ("spo2_avg", _FIELD_KEYS["spo2_avg"], _safe_float),
+    ("spo2_min", _FIELD_KEYS["spo2_min"], _safe_float),
+    ("spo2_max", _FIELD_KEYS["spo2_max"], _safe_float),
+    ("vo2max_running", _FIELD_KEYS["vo2max_running"], _safe_float),
+    ("vo2max_cycling", ('vo2MaxCycling',), _safe_float),
+    ("floors_climbed", _FIELD_KEYS["floors"], _safe_int),
+    ("floors_goal", _FIELD_KEYS["floors_goal"], _safe_int),
+    ("distance_meters", _FIELD_KEYS["distance"], _safe_float),
+)
+
+
+def _parse_summary_fields(summary: Dict[str, Any]) -> Dict[str, Any]:
+    """按 _SUMMARY_FIELD_SPECS 提取并转换 summary 中的简单字段"""
+    return {
+        field: convert(_first_present(summary, keys))
+        for field, keys, convert in _SUMMARY_FIELD_SPECS
+    }
+
+
+def parse_garmin_data(
+    raw_data: Dict[str, Any],
+    user_id: int,
+    record_date: date
+) -> GarminDataCreate:
+    """
+    将 get_all_daily_data 返回的原始数据解析为GarminDataCreate
+    
+    Args:
+        raw_data: 原始数据（可能包含summary、sleep、heart_rate等）
+        user_id: 用户ID
+        record_date: 记录日期
+        
+    Returns:
+        GarminDataCreate对象
+    """
+    # 没有任何数据时直接返回只含用户和日期的记录，跳过整套字段提取
+    if _is_empty_payload(raw_data):
+        return GarminDataCreate(user_id=user_id, record_date=record_date)
+    
+    # 调试：打印原始数据结构（仅前2000字符）；序列化整个payload开销不小，只在DEBUG开启时进行
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "解析Garmin数据，原始数据结构（前2000字符）:\n%s",
+            json_utils.dumps(raw_data, indent=True)[:2000]
+        )
+    
+    # 各子数据在这里统一规范为字典，后面直接按字典读取，不再逐处判断类型
+    # 从get_user_summary获取的数据在根级别（只读，无需复制）
+    summary = _as_dict(raw_data)
+    # 睡眠数据（可能来自get_sleep_data或summary）
+    sleep_data = _as_dict(summary.get('sleep'))
+    daily_sleep_dto = _as_dict(sleep_data.get('dailySleepDTO'))
+    
+    # 尝试多种方式获取睡眠分数
+    sleep_score = None
+    sleep_duration_seconds = 0
+    deep_sleep_seconds = 0
+    rem_sleep_seconds = 0
+    light_sleep_seconds = 0
+    awake_seconds = 0
+    nap_seconds = 0
+    avg_heart_rate_during_sleep = None
+    hrv = None  # HRV数据，优先从睡眠数据获取
+    
+    if sleep_data:
+        # Garmin睡眠数据结构:
+        # sleep_data = {
+        #   'dailySleepDTO': {
+        #     'sleepTimeSeconds': 29280,
+        #     'sleepScores': {'overall': {'value': 87}},
+        #     'deepSleepSeconds': 3720,
+        #     ...
+        #   },
+        #   'restingHeartRate': 51,
+        #   ...
+        # }
+        
+        # 打印睡眠数据的顶层键
+        logger.info("睡眠数据顶层键: %s", list(sleep_data.keys()))
+        
+        # 打印 dailySleepDTO 的键和睡眠分数相关字段
+        if daily_sleep_dto:
+            logger.info("dailySleepDTO 键: %s", list(daily_sleep_dto.keys()))
+            sleep_scores = daily_sleep_dto.get('sleepScores')
+            if sleep_scores:
+                logger.info("sleepScores 内容: %s", sleep_scores)
+        else:
+            logger.info("dailySleepDTO 为空")
+        
+        # 获取睡眠分数 - 正确的路径是 dailySleepDTO.sleepScores.overall.value
+        # dailySleepDTO 优先，命中第一个路径即返回
+        sleep_score = (
+            _first_path(daily_sleep_dto, _SLEEP_SCORE_PATHS) or
+            _first_path(sleep_data, _SLEEP_SCORE_PATHS)
+        )
+        
+        # 如果sleep_score是字典（如 {'value': 87, 'qualifierKey': 'GOOD'}），提取value
+        if isinstance(sleep_score, dict):
+            sleep_score = sleep_score.get('value')
+        
+        logger.debug("提取的睡眠分数: %s", sleep_score)
+        
+        # 睡眠时长（秒）- 从 dailySleepDTO 获取
+        sleep_duration_seconds = (
+            daily_sleep_dto.get('sleepTimeSeconds') or
+            sleep_data.get('sleepTimeSeconds') or
+            0
+        )
+        
+        # 睡眠阶段数据 - 从 dailySleepDTO 获取
+        deep_sleep_seconds = daily_sleep_dto.get('deepSleepSeconds', 0) or 0
+        rem_sleep_seconds = daily_sleep_dto.get('remSleepSeconds', 0) or 0
+        light_sleep_seconds = daily_sleep_dto.get('lightSleepSeconds', 0) or 0
+        awake_seconds = daily_sleep_dto.get('awakeSleepSeconds', 0) or 0
+        
+        # 小睡时长（秒）- 从 dailySleepDTO 获取
+        nap_seconds = daily_sleep_dto.get('napTimeSeconds', 0) or 0
+        
+        # 睡眠期间平均心率
+        avg_heart_rate_during_sleep = (
+            daily_sleep_dto.get('avgHeartRate') or
+            sleep_data.get('restingHeartRate')
+        )
+        
+        # HRV数据 - 从睡眠数据中获取
+        # avgOvernightHrv 是夜间平均HRV值
+        if hrv is None:
+            hrv = sleep_data.get('avgOvernightHrv')
+        
+        logger.info("解析睡眠数据: 分数=%s, 时长秒=%s, 深睡=%s, REM=%s, HRV=%s", sleep_score, sleep_duration_seconds, deep_sleep_seconds, rem_sleep_seconds, hrv)
+    else:
+        logger.warning("睡眠数据为空或格式不正确: type=%s, 值=%s", type(sleep_data), sleep_data)
+    
+    # 如果从sleep_data没有获取到，尝试从summary获取
+    if sleep_score is None:
+        score_val = _first_path(summary, _SUMMARY_SLEEP_SCORE_PATHS)
+        # 如果是字典，提取value
+        if isinstance(score_val, dict):
+            sleep_score = score_val.get('value')
+        else:
+            sleep_score = score_val
+    if sleep_duration_seconds == 0:
+        sleep_millis = summary.get('sleepTimeMillis')
+        sleep_duration_seconds = (
+            summary.get('sleepTimeSeconds') or
+            summary.get('sleepDurationSeconds') or
+            summary.get('sleepingSeconds') or
+            (sleep_millis / 1000 if sleep_millis else 0) or
+            summary.get('totalSleepTimeSeconds') or
+            0
+        )
+    if deep_sleep_seconds == 0:
+        deep_sleep_seconds = _first_truthy(summary, _FIELD_KEYS["summary_deep_sleep"]) or 0
+    if rem_sleep_seconds == 0:
+        rem_sleep_seconds = _first_truthy(summary, _FIELD_KEYS["summary_rem_sleep"]) or 0
+    if light_sleep_seconds == 0:
+        light_sleep_seconds = _first_truthy(summary, _FIELD_KEYS["summary_light_sleep"]) or 0
+    if awake_seconds == 0:
+        awake_seconds = _first_truthy(summary, _FIELD_KEYS["summary_awake_sleep"]) or 0
+    
+    # 处理心率数据（可能来自get_heart_rates或summary）
+    hr_data = _as_dict(_first_truthy(summary, _FIELD_KEYS["heart_rate_payload"]))
+    
+    avg_hr = None
+    resting_hr = None
+    max_hr = None
+    min_hr = None
+    
+    if hr_data:
+        # 从独立的heart_rate数据中提取（采样序列的首个值仅作为最后的兜底）
+        avg_hr = _first_truthy(hr_data, _FIELD_KEYS["hr_avg"]) or _first_hr_value(hr_data)
+        resting_hr = _first_truthy(hr_data, _FIELD_KEYS["hr_resting"])
+        max_hr = _first_truthy(hr_data, _FIELD_KEYS["hr_max"])
+        min_hr = _first_truthy(hr_data, _FIELD_KEYS["hr_min"])
+    
+    # 如果从hr_data没有获取到，尝试从summary获取
+    if avg_hr is None:
+        avg_hr = _first_truthy(summary, _FIELD_KEYS["summary_hr_avg"])
+    if resting_hr is None:
+        resting_hr = _first_truthy(summary, _FIELD_KEYS["hr_resting"])
+    if max_hr is None:
+        max_hr = _first_truthy(summary, _FIELD_KEYS["hr_max"])
+    if min_hr is None:
+        min_hr = _first_truthy(summary, _FIELD_KEYS["hr_min"])
+    
+    # 如果还没有获取到静息心率，尝试从睡眠数据获取
+    if resting_hr is None:
+        resting_hr = sleep_data.get('restingHeartRate')
+        if resting_hr:
+            logger.info("从睡眠数据获取静息心率: %s", resting_hr)
+    
+    # 如果还没有获取到平均心率，尝试从睡眠数据获取
+    if avg_hr is None:
+        avg_hr = daily_sleep_dto.get('avgHeartRate')
+        if avg_hr:
+            logger.info("从睡眠数据获取平均心率: %s", avg_hr)
+    
+    # HRV数据 - 如果从睡眠数据没有获取到，尝试从summary获取
+    if hrv is None:
+        hrv = summary.get('hrv') or _HRV_STATUS_HRV(summary) or summary.get('avgOvernightHrv')
+    
+    logger.debug("最终HRV值: %s", hrv)
+    
+    # 身体电量数据（可能来自get_body_battery或summary）
+    battery_data_raw = _first_truthy(summary, _FIELD_KEYS["battery_payload"])
+    
+    logger.info("身体电量原始数据类型: %s", type(battery_data_raw))
+    if battery_data_raw:
+        if isinstance(battery_data_raw, list):
+            logger.info("身体电量原始数据(列表)长度: %s", len(battery_data_raw))
+            if battery_data_raw:
+                sample = battery_data_raw[0] if len(battery_data_raw) > 0 else None
+                logger.info("身体电量第一个元素: %s", sample)
+        elif isinstance(battery_data_raw, dict):
+            logger.info("身体电量原始数据(字典)键: %s", list(battery_data_raw.keys()))
+    
+    # 如果battery_data是列表，可能需要从中提取统计值
+    battery_data = {}
+    charged = None
+    drained = None
+    most_charged = None
+    lowest = None
+    
+    if isinstance(battery_data_raw, list) and battery_data_raw:
+        # Garmin返回的是一个时间序列列表，每个元素包含 bodyBatteryLevel 等
+        # 需要遍历找到 charged/drained 或计算 most_charged/lowest
+        battery_levels = []
+        for item in battery_data_raw:
+            if isinstance(item, dict):
+                level = _first_truthy(item, _FIELD_KEYS["battery_level"])
+                if level is not None:
+                    battery_levels.append(level)
+                # 有些格式直接包含统计数据
+                if item.get('charged') is not None:
+                    charged = item.get('charged')
+                if item.get('drained') is not None:
+                    drained = item.get('drained')
+        
+        if battery_levels:
+            most_charged = max(battery_levels)
+            lowest = min(battery_levels)
+            # 估算充电和消耗（简化计算）
+            if charged is None and len(battery_levels) >= 2:
+                # 计算总充电量（上升的部分之和）
+                total_charged = 0
+                total_drained = 0
+                for i in range(1, len(battery_levels)):
+                    diff = battery_levels[i] - battery_levels[i-1]
+                    if diff > 0:
+                        total_charged += diff
+                    else:
+                        total_drained += abs(diff)
+                charged = total_charged if total_charged > 0 else None
+                drained = total_drained if total_drained > 0 else None
+        
+        logger.info("从列表计算: most_charged=%s, lowest=%s, charged=%s, drained=%s", most_charged, lowest, charged, drained)
+        
+    elif isinstance(battery_data_raw, dict):
+        battery_data = battery_data_raw
+        charged = _first_present(battery_data, _FIELD_KEYS["battery_charged"])
+        drained = _first_present(battery_data, _FIELD_KEYS["battery_drained"])
+        most_charged = _first_present(battery_data, _FIELD_KEYS["battery_most_charged"])
+        lowest = _first_present(battery_data, _FIELD_KEYS["battery_lowest"])
+    
+    # 如果还没有获取到，尝试从 summary 获取
+    if most_charged is None:
+        if charged is None:
+            charged = _first_present(summary, _FIELD_KEYS["summary_battery_charged"])
+        if drained is None:
+            drained = _first_present(summary, _FIELD_KEYS["summary_battery_drained"])
+        most_charged = _first_present(summary, _FIELD_KEYS["summary_battery_most_charged"])
+        lowest = _first_present(summary, _FIELD_KEYS["summary_battery_lowest"])
+    
+    logger.info("最终身体电量: charged=%s, drained=%s, most_charged=%s, lowest=%s", charged, drained, most_charged, lowest)
+    
+    # 压力数据（可能来自get_all_day_stress或summary）
+    stress_data_raw = summary.get('stress')
+    
+    stress_level = None
+    if isinstance(stress_data_raw, list) and stress_data_raw:
+        # get_all_day_stress返回的是数组，需要计算平均值
+        stress_level = _mean_stress(stress_data_raw)
+    elif isinstance(stress_data_raw, dict) and stress_data_raw:
+        # get_all_day_stress返回字典，包含avgStressLevel和maxStressLevel
+        stress_level = _first_present(stress_data_raw, _FIELD_KEYS["stress"])
+    
+    # 如果从stress数据中没有获取到，尝试从summary获取
+    if stress_level is None:
+        stress_level = _first_present(summary, _FIELD_KEYS["summary_stress"])
+    
+    logger.debug("提取的压力水平: %s (来源: %s)", stress_level, 'stress数据' if stress_data_raw else 'summary')
+    
+    # 活动数据（从summary获取）
+    # 步数：优先使用totalSteps
+    steps = _first_present(summary, _FIELD_KEYS["steps"])
+    if steps is None:
+        steps = _STEP_GOAL_STEPS(summary)
+    # 卡路里：优先使用totalKilocalories
+    calories = _first_present(summary, _FIELD_KEYS["calories"])
+    if calories is None:
+        calories = _CALORIE_GOAL_CALORIES(summary)
+    # 强度活动时间：只查一次，同时用于 active_minutes 推算和强度分钟字段
+    moderate_mins = _first_truthy(summary, _FIELD_KEYS["moderate_minutes"]) or 0
+    vigorous_mins = _first_truthy(summary, _FIELD_KEYS["vigorous_minutes"]) or 0
+    highly_active_seconds = summary.get('highlyActiveSeconds') or 0
+    active_minutes = summary.get('activeMinutes') or (highly_active_seconds // 60 if highly_active_seconds else 0) or (moderate_mins + vigorous_mins) or 0
+    
+    # 睡眠时间转换（秒转分钟，处理毫秒）
+    total_sleep_mins, deep_sleep_mins, rem_sleep_mins, light_sleep_mins, awake_mins, nap_mins = (
+        _secs_to_mins_batch((
+            sleep_duration_seconds, deep_sleep_seconds, rem_sleep_seconds,
+            light_sleep_seconds, awake_seconds, nap_seconds
+        ))
+    )
+    
+    # 解析新增字段
+    # HRV状态
+    hrv_status = sleep_data.get('hrvStatus')
+    if isinstance(hrv_status, dict):
+        hrv_status = _first_truthy(hrv_status, _FIELD_KEYS["hrv_status"])
+    # 7天平均HRV - 从weeklyAverages或直接值
+    hrv_7day_avg = _HRV_WEEKLY_AVG(sleep_data) or sleep_data.get('hrvWeeklyAverage')
+    
+    # 呼吸数据（睡眠期间优先取 dailySleepDTO）
+    avg_resp_sleep = _first_present(daily_sleep_dto, _FIELD_KEYS["resp_sleep"])
+    lowest_resp = daily_sleep_dto.get('lowestRespirationValue')
+    highest_resp = daily_sleep_dto.get('highestRespirationValue')
+    if lowest_resp is None:
+        lowest_resp = summary.get('lowestRespirationValue')
+    if highest_resp is None:
+        highest_resp = summary.get('highestRespirationValue')
+    
+    # 卡路里分类、清醒呼吸、血氧、VO2 Max、楼层和距离
+    summary_fields = _parse_summary_fields(summary)
+    
+    # 记录解析结果用于调试
+    logger.info("解析结果 - 睡眠分数: %s, 睡眠时长(秒): %s, 静息心率: %s, 平均心率: %s", sleep_score, sleep_duration_seconds, resting_hr, avg_hr)
+    
+    result = GarminDataCreate(
+        user_id=user_id,
+        record_date=record_date,
+        avg_heart_rate=_safe_int(avg_hr),
+        max_heart_rate=_safe_int(max_hr),
+        min_heart_rate=_safe_int(min_hr),
+        resting_heart_rate=_safe_int(resting_hr),
+        hrv=_safe_float(hrv),
+        hrv_status=hrv_status,
+        hrv_7day_avg=_safe_float(hrv_7day_avg),
+        sleep_score=_safe_int(sleep_score),
+        total_sleep_duration=total_sleep_mins,
+        deep_sleep_duration=deep_sleep_mins,
+        rem_sleep_duration=rem_sleep_mins,
+        light_sleep_duration=light_sleep_mins,
+        awake_duration=awake_mins,
+        nap_duration=nap_mins,
+        body_battery_charged=_safe_int(charged),
+        body_battery_drained=_safe_int(drained),
+        body_battery_most_charged=_safe_int(most_charged),
+        body_battery_lowest=_safe_int(lowest),
+        stress_level=_safe_int(stress_level),
+        steps=_safe_int(steps),
+        calories_burned=_safe_int(calories),
+        active_minutes=_safe_int(active_minutes),
+        moderate_intensity_minutes=_safe_int(moderate_mins),
+        vigorous_intensity_minutes=_safe_int(vigorous_mins),
+        avg_respiration_sleep=_safe_float(avg_resp_sleep),
+        lowest_respiration=_safe_float(lowest_resp),
+        highest_respiration=_safe_float(highest_resp),
+        **summary_fields,
+    )
+    
+    return result
@@ -1,23 +1,200 @@
 """Garmin数据收集服务"""
+import asyncio
+import logging
 import httpx
-from datetime import date, datetime
-from typing import Optional, List, Dict, Any
+from datetime import date, datetime, timedelta
+from typing import Optional, List, Dict, Any, Tuple
+from sqlalchemy import func, insert, select, tuple_, update
 from sqlalchemy.orm import Session
 from app.models.daily_health import GarminData
 from app.schemas.daily_health import GarminDataCreate
 from app.config import settings
+from app.utils.db_utils import on_conflict_insert
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_GARMIN_API_BASE_URL = "https://api.garmin.com"
+_HTTP_TIMEOUT = 10.0
+_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=100)
+
+# 进程内共享的 HTTP 客户端：复用连接池，避免每次请求重新建立 TCP+TLS 连接；
+# 服务对象按请求创建，所以客户端放在模块级，应用关闭时由 aclose_http_client 释放
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            base_url=_GARMIN_API_BASE_URL,
+            timeout=_HTTP_TIMEOUT,
+            limits=_HTTP_LIMITS,
+            http2=HTTP2_AVAILABLE,
+        )
+    return _http_client
+
+
+async def aclose_http_client():
+    """关闭共享的 HTTP 客户端（下次请求时会重新创建）"""
+    global _http_client
+    client, _http_client = _http_client, None
+    if client is not None:
+        await client.aclose()
+
+
+# Garmin API 字段 -> GarminDataCreate 字段（值原样使用）
+_DIRECT_FIELDS = (
+    ("averageHeartRate", "avg_heart_rate"),
+    ("maxHeartRate", "max_heart_rate"),
+    ("minHeartRate", "min_heart_rate"),
+    ("restingHeartRate", "resting_heart_rate"),
+    ("hrv", "hrv"),
+    ("sleepScore", "sleep_score"),
+    ("bodyBatteryCharged", "body_battery_charged"),
+    ("bodyBatteryDrained", "body_battery_drained"),
+    ("bodyBatteryMostCharged", "body_battery_most_charged"),
+    ("bodyBatteryLowest", "body_battery_lowest"),
+    ("stressLevel", "stress_level"),
+    ("steps", "steps"),
+    ("caloriesBurned", "calories_burned"),
+    ("activeMinutes", "active_minutes"),
+)
+
+# 睡眠时长字段：API 为秒，转换为分钟
+_SLEEP_SECONDS_FIELDS = (
+    ("sleepDurationSeconds", "total_sleep_duration"),
+    ("deepSleepSeconds", "deep_sleep_duration"),
+    ("remSleepSeconds", "rem_sleep_duration"),
+    ("lightSleepSeconds", "light_sleep_duration"),
+    ("awakeSleepSeconds", "awake_duration"),
+)
+
+
+# 批量 upsert 时每条语句最多写入的行数（每行四十余个参数），避免超出SQLite绑定参数上限
+_UPSERT_CHUNK_ROWS = 200
+_KEY_FIELDS = ("user_id", "record_date")
+
+
+def _dialect_insert(db: Session):
+    """
+    返回支持 ON CONFLICT 的方言 insert 构造函数
+
+    其他数据库、或旧库尚未建立 (user_id, record_date) 唯一索引时返回None
+    """
+    return on_conflict_insert(db, GarminData.__table__, _KEY_FIELDS)
+
+
+def _non_null_fields(garmin_data: GarminDataCreate) -> Dict[str, Any]:
+    """
+    显式设置且非空的字段（不含 user_id/record_date）
+
+    直接读取模型实例的字段字典，不用 model_dump 导出全部四十多个字段
+    """
+    values = garmin_data.__dict__
+    return {
+        key: values[key]
+        for key in garmin_data.model_fields_set
+        if key not in _KEY_FIELDS and values[key] is not None
+    }
+
+
+def _garmin_data_upsert(db: Session, garmin_data: GarminDataCreate) -> Optional[GarminData]:
+    """
+    按 (user_id, record_date) 唯一索引 upsert 一天的数据，已有记录只更新非空字段
+    
+    Returns:
+        写入后的记录；不能使用 ON CONFLICT 时返回None，由调用方回退到先查后写
+    """
+    dialect_insert = _dialect_insert(db)
+    if dialect_insert is None:
+        return None
+    
+    # 模型字段都没有默认值，未给出的列插入时即为 NULL
+    changes = _non_null_fields(garmin_data)
+    stmt = dialect_insert(GarminData).values(
+        user_id=garmin_data.user_id,
+        record_date=garmin_data.record_date,
+        **changes
+    )
+    set_ = {key: getattr(stmt.excluded, key) for key in changes}
+    set_["updated_at"] = func.now()
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "record_date"],
+        set_=set_
+    ).returning(GarminData)
+    return db.scalars(stmt, execution_options={"populate_existing": True}).one()
+
+
+def _garmin_data_upsert_batch(db: Session, rows: List[Dict[str, Any]]) -> bool:
+    """
+    多天数据按唯一索引批量 upsert（每块一条多行语句，不提交）
+    
+    各行字段不同，已有记录用 COALESCE(新值, 原值) 保留原值，效果等同于只更新非空字段
+    
+    Returns:
+        不能使用 ON CONFLICT 时返回False，由调用方回退
+    """
+    dialect_insert = _dialect_insert(db)
+    if dialect_insert is None:
+        return False
+    
+    for start in range(0, len(rows), _UPSERT_CHUNK_ROWS):
+        stmt = dialect_insert(GarminData).values(rows[start:start + _UPSERT_CHUNK_ROWS])
+        set_ = {
+            key: func.coalesce(getattr(stmt.excluded, key), getattr(GarminData, key))
+            for key in rows[0]
+            if key not in _KEY_FIELDS
+        }
+        set_["updated_at"] = func.now()
+        db.execute(stmt.on_conflict_do_update(index_elements=list(_KEY_FIELDS), set_=set_))
+    return True
+
+
+def _garmin_data_write_split(db: Session, rows: List[Dict[str, Any]]):
+    """
+    不支持 ON CONFLICT 时的批量写入（不提交）：一次查询已存在的 (用户, 日期)，
+    新记录一条批量 INSERT，已有记录逐条 UPDATE 非空字段，都不构造 ORM 对象
+    """
+    keys = [(row["user_id"], row["record_date"]) for row in rows]
+    existing = set(db.execute(
+        select(GarminData.user_id, GarminData.record_date)
+        .where(tuple_(GarminData.user_id, GarminData.record_date).in_(keys))
+    ).all())
+    
+    new_rows = [row for row, key in zip(rows, keys) if key not in existing]
+    if new_rows:
+        db.execute(insert(GarminData), new_rows)
+    for row, key in zip(rows, keys):
+        if key not in existing:
+            continue
+        changes = {k: v for k, v in row.items() if v is not None and k not in _KEY_FIELDS}
+        if changes:
+            db.execute(
+                update(GarminData)
+                .where(GarminData.user_id == key[0], GarminData.record_date == key[1])
+                .values(**changes, updated_at=func.now())
+            )
 
 
 class GarminService:
     """Garmin API服务"""
     
+    # sync_garmin_range 中同时进行的请求数上限（避免连接池排队超时和触发 Garmin 限流）
+    FETCH_CONCURRENCY = 8
+    
     def __init__(self):
         self.api_key = settings.garmin_api_key
         self.api_secret = settings.garmin_api_secret
         # Garmin Connect API (需要OAuth认证)
         # 注意：Garmin官方API需要开发者账号和OAuth流程
         # 这里提供框架，实际使用时需要实现完整的OAuth认证
-        self.base_url = "https://api.garmin.com"
+        self.base_url = _GARMIN_API_BASE_URL
         # 替代方案：可以使用Garmin Connect导出数据或第三方库
     
     async def fetch_daily_data(
@@ -42,21 +219,21 @@ class GarminService:
         }
         
         try:
-            async with httpx.AsyncClient() as client:
-                # 获取每日活动数据
-                activity_url = f"{self.base_url}/wellness-api/rest/dailySummary"
-                params = {
-                    "calendarDate": target_date.isoformat()
-                }
-                response = await client.get(activity_url, headers=headers, params=params)
-                
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    print(f"Garmin API错误: {response.status_code}")
-                    return None
-        except Exception as e:
-            print(f"获取Garmin数据失败: {str(e)}")
+            client = _get_http_client()
+            # 获取每日活动数据
+            params = {
+                "calendarDate": target_date.isoformat()
+            }
+            response = await client.get("/wellness-api/rest/dailySummary", headers=headers, params=params)
+            
+            if response.status_code == 200:
+                return response.json()
+            else:
+                logger.warning(f"Garmin API错误 (用户 {user_id}, {target_date}): {response.status_code}")
+                return None
+        except (httpx.HTTPError, ValueError) as e:
+            # 网络/超时错误，或响应不是合法 JSON
+            logger.warning(f"获取Garmin数据失败 (用户 {user_id}, {target_date}): {e}")
             return None
     
     def parse_garmin_data(
@@ -65,37 +242,30 @@ class GarminService:
         user_id: int,
         record_date: date
     ) -> GarminDataCreate:
-        """解析Garmin API返回的原始数据"""
-        return GarminDataCreate(
-            user_id=user_id,
-            record_date=record_date,
-            avg_heart_rate=raw_data.get("averageHeartRate"),
-            max_heart_rate=raw_data.get("maxHeartRate"),
-            min_heart_rate=raw_data.get("minHeartRate"),
-            resting_heart_rate=raw_data.get("restingHeartRate"),
-            hrv=raw_data.get("hrv"),
-            sleep_score=raw_data.get("sleepScore"),
-            total_sleep_duration=raw_data.get("sleepDurationSeconds", 0) // 60 if raw_data.get("sleepDurationSeconds") else None,
-            deep_sleep_duration=raw_data.get("deepSleepSeconds", 0) // 60 if raw_data.get("deepSleepSeconds") else None,
-            rem_sleep_duration=raw_data.get("remSleepSeconds", 0) // 60 if raw_data.get("remSleepSeconds") else None,
-            light_sleep_duration=raw_data.get("lightSleepSeconds", 0) // 60 if raw_data.get("lightSleepSeconds") else None,
-            awake_duration=raw_data.get("awakeSleepSeconds", 0) // 60 if raw_data.get("awakeSleepSeconds") else None,
-            body_battery_charged=raw_data.get("bodyBatteryCharged"),
-            body_battery_drained=raw_data.get("bodyBatteryDrained"),
-            body_battery_most_charged=raw_data.get("bodyBatteryMostCharged"),
-            body_battery_lowest=raw_data.get("bodyBatteryLowest"),
-            stress_level=raw_data.get("stressLevel"),
-            steps=raw_data.get("steps"),
-            calories_burned=raw_data.get("caloriesBurned"),
-            active_minutes=raw_data.get("activeMinutes"),
-        )
+        """
+        解析Garmin API返回的原始数据
+        
+        按预先定义的字段映射取值，再经 GarminDataCreate 校验（外部数据类型不可信）
+        """
+        fields = {"user_id": user_id, "record_date": record_date}
+        for src, dst in _DIRECT_FIELDS:
+            fields[dst] = raw_data.get(src)
+        for src, dst in _SLEEP_SECONDS_FIELDS:
+            seconds = raw_data.get(src)
+            fields[dst] = seconds // 60 if seconds else None
+        return GarminDataCreate(**fields)
     
     def save_garmin_data(
         self,
         db: Session,
         garmin_data: GarminDataCreate
     ) -> GarminData:
-        """保存Garmin数据到数据库"""
+        """保存Garmin数据到数据库（支持 ON CONFLICT 的数据库上单条语句完成插入或更新）"""
+        saved = _garmin_data_upsert(db, garmin_data)
+        if saved is not None:
+            db.commit()
+            return saved
+        
         # 检查是否已存在该日期的记录
         existing = db.query(GarminData).filter(
             GarminData.user_id == garmin_data.user_id,
@@ -104,9 +274,8 @@ class GarminService:
         
         if existing:
             # 更新现有记录
-            for key, value in garmin_data.model_dump(exclude={"user_id", "record_date"}).items():
-                if value is not None:
-                    setattr(existing, key, value)
+            for key, value in _non_null_fields(garmin_data).items():
+                setattr(existing, key, value)
             db.commit()
             db.refresh(existing)
             return existing
@@ -118,6 +287,44 @@ class GarminService:
             db.refresh(db_garmin)
             return db_garmin
     
+    def save_garmin_data_batch(
+        self,
+        db: Session,
+        garmin_data_list: List[GarminDataCreate]
+    ) -> List[GarminData]:
+        """
+        批量保存多天的Garmin数据（一次提交）
+        
+        已存在的记录按非空字段更新：支持 ON CONFLICT 的数据库上每块一条多行 upsert，
+        其他数据库一次查询已有日期后分别批量插入/更新
+        """
+        if not garmin_data_list:
+            return []
+        
+        user_ids = {item.user_id for item in garmin_data_list}
+        dates = {item.record_date for item in garmin_data_list}
+        # 同一天出现多次时以最后一条为准（一条 ON CONFLICT 语句不能两次更新同一行）
+        rows = list({
+            (item.user_id, item.record_date): item.model_dump()
+            for item in garmin_data_list
+        }.values())
+        
+        if not _garmin_data_upsert_batch(db, rows):
+            _garmin_data_write_split(db, rows)
+        db.commit()
+        
+        # 重新读取，返回带ID的记录（按输入顺序）
+        saved_rows = db.query(GarminData).filter(
+            GarminData.user_id.in_(user_ids),
+            GarminData.record_date.in_(dates)
+        ).all()
+        saved_map = {(row.user_id, row.record_date): row for row in saved_rows}
+        return [
+            saved_map[(item.user_id, item.record_date)]
+            for item in garmin_data_list
+            if (item.user_id, item.record_date) in saved_map
+        ]
+    
     async def sync_garmin_data(
         self,
         db: Session,
@@ -140,6 +347,46 @@ class GarminService:
         
         garmin_data = self.parse_garmin_data(raw_data, user_id, target_date)
         return self.save_garmin_data(db, garmin_data)
+    
+    async def sync_garmin_range(
+        self,
+        db: Session,
+        user_id: int,
+        start_date: date,
+        end_date: date,
+        access_token: Optional[str] = None
+    ) -> Tuple[List[GarminData], Dict[date, str]]:
+        """
+        同步日期范围内的Garmin数据
+        
+        各日期的请求经共享连接池并发发出（最多 FETCH_CONCURRENCY 个同时进行），
+        解析后一次批量保存（一次查询已有记录、一次提交）
+        
+        Returns:
+            (已保存的记录（按日期顺序，无数据的日期不在其中）, 获取或解析失败的日期 -> 错误信息)
+        """
+        semaphore = asyncio.Semaphore(self.FETCH_CONCURRENCY)
+        
+        async def fetch(target_date: date) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                return await self.fetch_daily_data(user_id, target_date, access_token)
+        
+        dates = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+        raws = await asyncio.gather(*(fetch(d) for d in dates), return_exceptions=True)
+        
+        parsed = []
+        failed = {}
+        for raw, d in zip(raws, dates):
+            if isinstance(raw, Exception):
+                logger.warning(f"获取Garmin数据失败 (用户 {user_id}, {d}): {raw}")
+                failed[d] = str(raw)
+            elif isinstance(raw, dict) and raw:
+                try:
+                    parsed.append(self.parse_garmin_data(raw, user_id, d))
+                except ValueError as e:
+                    logger.warning(f"解析Garmin数据失败 (用户 {user_id}, {d}): {e}")
+                    failed[d] = str(e)
+        return self.save_garmin_data_batch(db, parsed), failed
 
 
 class DataCollectionService:
@@ -159,4 +406,17 @@ class DataCollectionService:
         return await self.garmin_service.sync_garmin_data(
             db, user_id, target_date, access_token
         )
+    
+    async def sync_garmin_range(
+        self,
+        db: Session,
+        user_id: int,
+        start_date: date,
+        end_date: date,
+        access_token: Optional[str] = None
+    ) -> Tuple[List[GarminData], Dict[date, str]]:
+        """并发同步日期范围内的Garmin数据，返回 (已保存的记录, 失败的日期 -> 错误信息)"""
+        return await self.garmin_service.sync_garmin_range(
+            db, user_id, start_date, end_date, access_token
+        )
 
@@ -3,12 +3,36 @@ import json
 import csv
 from typing import List, Dict, Any, Optional
 from datetime import date
+from pydantic import TypeAdapter
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from app.models.medical_exam import MedicalExam, MedicalExamItem
 from app.models.user import User
 from app.schemas.medical_exam import MedicalExamCreate, MedicalExamItemCreate
 from app.models.medical_exam import ExamType, BodySystem
 
+# 体检项目列表的校验器：整个列表一次交给 pydantic-core 校验/导出，不逐项构造模型
+_ITEMS_ADAPTER = TypeAdapter(List[MedicalExamItemCreate])
+
+
+def _validate_items(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """校验体检项目（外部数据）并导出为可直接批量写入的字段字典"""
+    return _ITEMS_ADAPTER.dump_python(_ITEMS_ADAPTER.validate_python(items))
+
+
+def _cell(row: tuple, columns: Dict[str, int], name: str) -> Any:
+    """按表头列名取单元格的值，缺少该列或该行较短时返回None"""
+    index = columns.get(name)
+    if index is None or index >= len(row):
+        return None
+    return row[index]
+
+
+def _cell_text(row: tuple, columns: Dict[str, int], name: str) -> Optional[str]:
+    """文本列：Excel 中数字格式的代码/范围等转为字符串"""
+    value = _cell(row, columns, name)
+    return None if value is None else str(value)
+
 
 class MedicalExamImportService:
     """体检数据导入服务"""
@@ -23,6 +47,18 @@ class MedicalExamImportService:
         exam_data = json_data.get("exam", {})
         items_data = json_data.get("items", [])
         
+        # JSON 来自外部调用方，需要校验
+        item_rows = _validate_items(items_data)
+        return MedicalExamImportService._persist(db, user_id, exam_data, item_rows)
+    
+    @staticmethod
+    def _persist(
+        db: Session,
+        user_id: int,
+        exam_data: Dict[str, Any],
+        item_rows: List[Dict[str, Any]]
+    ) -> MedicalExam:
+        """创建体检记录并批量写入体检项目（item_rows 为已整理好的项目字段字典）"""
         # 创建体检记录
         exam_create = MedicalExamCreate(
             user_id=user_id,
@@ -36,22 +72,17 @@ class MedicalExamImportService:
             items=[]
         )
         
-        # 创建体检项目
-        for item_data in items_data:
-            exam_create.items.append(MedicalExamItemCreate(**item_data))
-        
         # 保存到数据库
         db_exam = MedicalExam(**exam_create.model_dump(exclude={"items"}))
         db.add(db_exam)
         db.flush()
         
-        # 保存体检项目
-        for item_create in exam_create.items:
-            db_item = MedicalExamItem(
-                exam_id=db_exam.id,
-                **item_create.model_dump()
+        # 保存体检项目：一条多行 INSERT 批量写入，不逐个走 ORM 工作单元
+        if item_rows:
+            db.execute(
+                insert(MedicalExamItem),
+                [{"exam_id": db_exam.id, **row} for row in item_rows]
             )
-            db.add(db_item)
         
         db.commit()
         db.refresh(db_exam)
@@ -64,29 +95,25 @@ class MedicalExamImportService:
         csv_file_path: str,
         exam_info: Dict[str, Any]
     ) -> MedicalExam:
-        """从CSV格式导入体检数据"""
-        items = []
-        
+        """从CSV格式导入体检数据（逐行读取，整批校验后批量写入，不再经 JSON 往返）"""
         with open(csv_file_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                items.append(MedicalExamItemCreate(
-                    item_name=row.get("item_name", ""),
-                    item_code=row.get("item_code"),
-                    value=float(row["value"]) if row.get("value") else None,
-                    unit=row.get("unit"),
-                    reference_range=row.get("reference_range"),
-                    result=row.get("result"),
-                    is_abnormal=row.get("is_abnormal", "normal"),
-                    notes=row.get("notes")
-                ))
-        
-        exam_data = {
-            "exam": exam_info,
-            "items": [item.model_dump() for item in items]
-        }
+            item_rows = [
+                {
+                    "item_name": row.get("item_name", ""),
+                    "item_code": row.get("item_code"),
+                    "value": float(value) if (value := row.get("value")) else None,
+                    "unit": row.get("unit"),
+                    "reference_range": row.get("reference_range"),
+                    "result": row.get("result"),
+                    "is_abnormal": row.get("is_abnormal", "normal"),
+                    "notes": row.get("notes"),
+                }
+                for row in csv.DictReader(f)
+            ]
         
-        return MedicalExamImportService.import_from_json(db, user_id, exam_data)
+        # CSV 由用户上传，需要校验
+        item_rows = _validate_items(item_rows)
+        return MedicalExamImportService._persist(db, user_id, exam_info, item_rows)
     
     @staticmethod
     def import_from_excel(
@@ -98,32 +125,41 @@ class MedicalExamImportService:
         """
         从Excel格式导入体检数据
         
-        注意：需要安装 pandas 和 openpyxl
+        以只读模式逐行读取第一个工作表（首行为表头），不构建 DataFrame
+        
+        注意：需要安装 openpyxl
         """
         try:
-            import pandas as pd
+            from openpyxl import load_workbook
         except ImportError:
-            raise ImportError("需要安装pandas和openpyxl: pip install pandas openpyxl")
-        
-        df = pd.read_excel(excel_file_path)
-        items = []
+            raise ImportError("需要安装openpyxl: pip install openpyxl")
         
-        for _, row in df.iterrows():
-            items.append(MedicalExamItemCreate(
-                item_name=row.get("item_name", ""),
-                item_code=row.get("item_code"),
-                value=float(row["value"]) if pd.notna(row.get("value")) else None,
-                unit=row.get("unit"),
-                reference_range=row.get("reference_range"),
-                result=row.get("result"),
-                is_abnormal=row.get("is_abnormal", "normal"),
-                notes=row.get("notes")
-            ))
-        
-        exam_data = {
-            "exam": exam_info,
-            "items": [item.model_dump() for item in items]
-        }
+        workbook = load_workbook(excel_file_path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, None) or ()
+            columns = {name: i for i, name in enumerate(header) if name is not None}
+            
+            item_rows = []
+            for row in rows:
+                # 跳过空行
+                if all(cell is None for cell in row):
+                    continue
+                value = _cell(row, columns, "value")
+                item_rows.append({
+                    "item_name": _cell_text(row, columns, "item_name") or "",
+                    "item_code": _cell_text(row, columns, "item_code"),
+                    "value": float(value) if value not in (None, "") else None,
+                    "unit": _cell_text(row, columns, "unit"),
+                    "reference_range": _cell_text(row, columns, "reference_range"),
+                    "result": _cell_text(row, columns, "result"),
+                    "is_abnormal": _cell_text(row, columns, "is_abnormal") or "normal",
+                    "notes": _cell_text(row, columns, "notes"),
+                })
+        finally:
+            workbook.close()
         
-        return MedicalExamImportService.import_from_json(db, user_id, exam_data)
+        # Excel 由用户上传，需要校验
+        item_rows = _validate_items(item_rows)
+        return MedicalExamImportService._persist(db, user_id, exam_info, item_rows)
 
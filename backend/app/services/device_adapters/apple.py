@@ -24,13 +24,29 @@ Apple Health 适配器
 - 通过 Apple Health Records API
 """
 
+import hashlib
+import io
+import mmap
+import os
+import pickle
+import threading
+from array import array
 import xml.etree.ElementTree as ET
 import logging
 from datetime import date, datetime, time, timedelta
-from typing import Optional, List, Dict, Any
-from collections import defaultdict
+from typing import Optional, List, Dict, Any, IO, Mapping, Union
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
 import json
 
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+from app.config import settings
 from .base import (
     DeviceAdapter,
     DeviceType,
@@ -42,6 +58,26 @@ from .base import (
 
 logger = logging.getLogger(__name__)
 
+try:
+    from lxml import etree as lxml_etree
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+# 流式解析时每次读入的字节数
+_XML_CHUNK_SIZE = 1 << 20
+# 多进程解析：小于该大小的文件直接在当前进程解析（进程启动和结果回传的开销不划算）
+_PARALLEL_MIN_BYTES = 64 << 20
+# 导出文件中顶层元素（Record/Workout/...）各占一行、缩进一个空格，分片在这些位置切开
+_TOP_LEVEL_BOUNDARY = b"\n <"
+_LXML_ERRORS = (lxml_etree.XMLSyntaxError,) if LXML_AVAILABLE else ()
+
+# 解析结果缓存（按文件内容摘要）：同一份导出重复上传时跳过整个解析；
+# 结果以 pickle 字节保存，命中时反序列化出新对象，调用方修改结果不会污染缓存
+_PARSE_CACHE_MAXSIZE = 4
+_parsed_cache: "OrderedDict[str, bytes]" = OrderedDict()
+_parsed_cache_lock = threading.Lock()
+
 
 class AppleHealthAdapter(DeviceAdapter):
     """Apple Health 适配器"""
@@ -64,9 +100,8 @@ class AppleHealthAdapter(DeviceAdapter):
         # 如果 kwargs 中有 imported_data，优先使用
         self.imported_data = kwargs.get("imported_data") or imported_data or {}
     
-    @property
-    def device_type(self) -> DeviceType:
-        return DeviceType.APPLE
+    device_type: DeviceType = DeviceType.APPLE
+    _SOURCE = DeviceType.APPLE.value
     
     @property
     def display_name(self) -> str:
@@ -125,16 +160,10 @@ class AppleHealthAdapter(DeviceAdapter):
         # 构建规范化数据
         return NormalizedHealthData(
             record_date=target_date,
-            source=DeviceType.APPLE.value,
+            source=self._SOURCE,
             
             # 睡眠数据
-            sleep_score=self._calculate_sleep_score(day_data.get("sleep", [])),
-            total_sleep_minutes=self._calculate_total_sleep(day_data.get("sleep", [])),
-            deep_sleep_minutes=self._calculate_deep_sleep(day_data.get("sleep", [])),
-            rem_sleep_minutes=self._calculate_rem_sleep(day_data.get("sleep", [])),
-            light_sleep_minutes=self._calculate_light_sleep(day_data.get("sleep", [])),
-            sleep_start_time=self._get_sleep_start_time(day_data.get("sleep", [])),
-            sleep_end_time=self._get_sleep_end_time(day_data.get("sleep", [])),
+            **self._summarize_sleep(day_data.get("sleep", [])),
             
             # 心率数据
             resting_heart_rate=day_data.get("resting_heart_rate"),
@@ -172,13 +201,13 @@ class AppleHealthAdapter(DeviceAdapter):
             return []
         
         samples = []
-        for hr_data in day_data.get("heart_rate_samples", []):
+        for raw_timestamp, heart_rate in _iter_samples(day_data.get("heart_rate_samples")):
             try:
-                timestamp = datetime.fromisoformat(hr_data["timestamp"].replace("Z", "+00:00"))
+                timestamp = datetime.fromisoformat(raw_timestamp.replace("Z", "+00:00"))
                 samples.append(HeartRateSample(
                     timestamp=timestamp,
-                    heart_rate=hr_data["value"],
-                    source=DeviceType.APPLE.value
+                    heart_rate=heart_rate,
+                    source=self._SOURCE
                 ))
             except Exception as e:
                 logger.warning(f"解析心率采样数据失败: {e}")
@@ -205,7 +234,7 @@ class AppleHealthAdapter(DeviceAdapter):
                             calories=workout.get("calories"),
                             avg_heart_rate=workout.get("avg_heart_rate"),
                             max_heart_rate=workout.get("max_heart_rate"),
-                            source=DeviceType.APPLE.value,
+                            source=self._SOURCE,
                             external_id=workout.get("id"),
                             raw_data=workout
                         ))
@@ -217,207 +246,54 @@ class AppleHealthAdapter(DeviceAdapter):
         return workouts
     
     @staticmethod
-    def parse_health_xml(xml_content: str) -> Dict[str, Any]:
+    def parse_health_xml(source: Union[str, bytes, os.PathLike, IO[bytes]]) -> Dict[str, Any]:
         """
         解析 Apple Health 导出的 XML 文件
         
+        流式解析：按块读入，解析器在遇到 Record/Workout 标签时直接回调处理函数，
+        不构建元素树，内存占用与导出文件大小（常达数百MB）无关
+        
+        结果按文件内容的 blake2b 摘要缓存在内存中（配置 apple_health_cache_dir 时同时保存到磁盘），
+        同一份导出再次导入时只需计算摘要；不可回退读取位置的文件对象不缓存
+        
         Args:
-            xml_content: XML 文件内容
+            source: XML 文件路径、二进制文件对象，或 XML 内容（str/bytes）
             
         Returns:
             按日期组织的数据字典：
             {
                 "2024-01-01": {
                     "steps": 10000,
-                    "heart_rate_samples": [...],
+                    "heart_rate_samples": {"timestamps": [...], "values": [...]},
                     "sleep": [...],
                     ...
                 }
             }
         """
-        try:
-            root = ET.fromstring(xml_content)
-        except ET.ParseError as e:
-            logger.error(f"XML 解析失败: {e}")
-            raise ValueError(f"无效的 XML 文件: {e}")
-        
-        # 按日期组织数据
-        daily_data = defaultdict(lambda: {
-            "steps": 0,
-            "heart_rate_samples": [],
-            "sleep": [],
-            "workouts": [],
-            "calories_active": 0,
-            "calories_total": 0,
-            "distance_meters": 0.0,
-            "spo2_samples": [],
-            "respiration_samples": [],
-            "hrv_samples": []
-        })
+        if isinstance(source, bytes):
+            source = io.BytesIO(source)
+        elif isinstance(source, str) and source.lstrip().startswith("<"):
+            source = io.BytesIO(source.encode("utf-8"))
         
-        # 解析记录
-        for record in root.findall(".//Record"):
-            record_type = record.get("type")
-            value = record.get("value")
-            start_date = record.get("startDate")
-            end_date = record.get("endDate")
-            
-            if not start_date:
-                continue
-            
-            try:
-                # 解析日期
-                start_dt = datetime.fromisoformat(start_date.replace("Z", "+00:00"))
-                date_key = start_dt.date().isoformat()
-                
-                if record_type == "HKQuantityTypeIdentifierStepCount":
-                    # 步数（累加）
-                    if value:
-                        daily_data[date_key]["steps"] += int(float(value))
-                
-                elif record_type == "HKQuantityTypeIdentifierHeartRate":
-                    # 心率采样
-                    if value:
-                        daily_data[date_key]["heart_rate_samples"].append({
-                            "timestamp": start_date,
-                            "value": int(float(value))
-                        })
-                
-                elif record_type == "HKQuantityTypeIdentifierActiveEnergyBurned":
-                    # 活动卡路里（累加）
-                    if value:
-                        daily_data[date_key]["calories_active"] += float(value)
-                
-                elif record_type == "HKQuantityTypeIdentifierBasalEnergyBurned":
-                    # 基础代谢卡路里（累加）
-                    if value:
-                        daily_data[date_key]["calories_total"] += float(value)
-                
-                elif record_type == "HKQuantityTypeIdentifierDistanceWalkingRunning":
-                    # 步行/跑步距离（累加）
-                    if value:
-                        daily_data[date_key]["distance_meters"] += float(value) * 1000  # 转换为米
-                
-                elif record_type == "HKCategoryTypeIdentifierSleepAnalysis":
-                    # 睡眠分析
-                    sleep_value = record.get("value")
-                    if sleep_value and end_date:
-                        end_dt = datetime.fromisoformat(end_date.replace("Z", "+00:00"))
-                        duration_minutes = int((end_dt - start_dt).total_seconds() / 60)
-                        
-                        daily_data[date_key]["sleep"].append({
-                            "type": sleep_value,  # "ASLEEP", "AWAKE", "INBED"
-                            "start": start_date,
-                            "end": end_date,
-                            "duration_minutes": duration_minutes
-                        })
-                
-                elif record_type == "HKQuantityTypeIdentifierOxygenSaturation":
-                    # 血氧饱和度
-                    if value:
-                        daily_data[date_key]["spo2_samples"].append({
-                            "timestamp": start_date,
-                            "value": float(value) * 100  # 转换为百分比
-                        })
-                
-                elif record_type == "HKQuantityTypeIdentifierRespiratoryRate":
-                    # 呼吸频率
-                    if value:
-                        daily_data[date_key]["respiration_samples"].append({
-                            "timestamp": start_date,
-                            "value": float(value)
-                        })
-                
-                elif record_type == "HKQuantityTypeIdentifierHeartRateVariabilitySDNN":
-                    # HRV (SDNN)
-                    if value:
-                        daily_data[date_key]["hrv_samples"].append({
-                            "timestamp": start_date,
-                            "value": float(value) * 1000  # 转换为毫秒
-                        })
-            
-            except Exception as e:
-                logger.warning(f"解析记录失败 (type={record_type}): {e}")
-                continue
-        
-        # 解析运动记录
-        for workout in root.findall(".//Workout"):
-            workout_type = workout.get("workoutActivityType")
-            start_date = workout.get("startDate")
-            
-            if not start_date:
-                continue
-            
-            try:
-                start_dt = datetime.fromisoformat(start_date.replace("Z", "+00:00"))
-                date_key = start_dt.date().isoformat()
-                
-                end_date = workout.get("endDate")
-                duration = 0
-                if end_date:
-                    end_dt = datetime.fromisoformat(end_date.replace("Z", "+00:00"))
-                    duration = int((end_dt - start_dt).total_seconds())
-                
-                # 提取运动数据
-                total_energy = workout.find(".//MetadataEntry[@key='HKTotalEnergyBurned']")
-                total_distance = workout.find(".//MetadataEntry[@key='HKTotalDistance']")
-                
-                daily_data[date_key]["workouts"].append({
-                    "id": workout.get("sourceName", ""),
-                    "type": AppleHealthAdapter._map_workout_type(workout_type),
-                    "start": start_date,
-                    "end": end_date,
-                    "duration": duration,
-                    "calories": float(total_energy.get("value")) if total_energy is not None else None,
-                    "distance": float(total_distance.get("value")) * 1000 if total_distance is not None else None,  # 转换为米
-                })
-            
-            except Exception as e:
-                logger.warning(f"解析运动记录失败: {e}")
-                continue
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, "rb") as f:
+                return _parse_cached(f)
+        return _parse_cached(source)
+    
+    @staticmethod
+    def parse_health_xml_parallel(path: Union[str, os.PathLike], workers: Optional[int] = None) -> Dict[str, Any]:
+        """
+        多进程解析 Apple Health 导出文件（适合数百MB以上的导出）
         
-        # 聚合每日数据
-        result = {}
-        for date_key, data in daily_data.items():
-            # 计算心率统计
-            hr_samples = data["heart_rate_samples"]
-            if hr_samples:
-                hr_values = [s["value"] for s in hr_samples]
-                data["avg_heart_rate"] = int(sum(hr_values) / len(hr_values))
-                data["max_heart_rate"] = max(hr_values)
-                data["min_heart_rate"] = min(hr_values)
-                # 静息心率通常是最小值或早上的平均值
-                morning_hrs = [s["value"] for s in hr_samples 
-                              if datetime.fromisoformat(s["timestamp"].replace("Z", "+00:00")).hour < 8]
-                data["resting_heart_rate"] = int(sum(morning_hrs) / len(morning_hrs)) if morning_hrs else min(hr_values)
-            
-            # 计算血氧统计
-            spo2_samples = data["spo2_samples"]
-            if spo2_samples:
-                spo2_values = [s["value"] for s in spo2_samples]
-                data["spo2_avg"] = sum(spo2_values) / len(spo2_values)
-                data["spo2_min"] = min(spo2_values)
-            
-            # 计算呼吸频率统计
-            resp_samples = data["respiration_samples"]
-            if resp_samples:
-                resp_values = [s["value"] for s in resp_samples]
-                data["respiration_rate_avg"] = sum(resp_values) / len(resp_values)
-            
-            # 计算 HRV 平均值
-            hrv_samples = data["hrv_samples"]
-            if hrv_samples:
-                hrv_values = [s["value"] for s in hrv_samples]
-                data["hrv"] = sum(hrv_values) / len(hrv_values)
-            
-            # 计算活动分钟数（粗略估算）
-            if data["steps"] > 0:
-                # 假设每分钟至少 60 步才算活动
-                data["active_minutes"] = min(data["steps"] // 60, 1440)  # 最多 24 小时
-            
-            result[date_key] = dict(data)
+        按顶层元素的行边界把文件切成若干分片，各进程分别解析得到每日的原始数据，
+        再按文件顺序合并后统一聚合，结果与 parse_health_xml 相同（同样使用解析结果缓存）
         
-        return result
+        Args:
+            path: XML 文件路径
+            workers: 进程数，默认为 CPU 核数
+        """
+        with open(path, "rb") as f:
+            return _parse_cached(f, lambda stream: _parse_file_parallel(path, workers or os.cpu_count() or 1))
     
     @staticmethod
     def _map_workout_type(activity_type: str) -> str:
@@ -435,85 +311,586 @@ class AppleHealthAdapter(DeviceAdapter):
         }
         return workout_map.get(activity_type, "other")
     
-    def _calculate_sleep_score(self, sleep_records: List[Dict]) -> Optional[int]:
-        """计算睡眠评分（简化算法）"""
-        if not sleep_records:
-            return None
-        
-        total_sleep = self._calculate_total_sleep(sleep_records)
-        if total_sleep < 360:  # 少于 6 小时
-            return 50
-        elif total_sleep < 420:  # 6-7 小时
-            return 70
-        elif total_sleep < 540:  # 7-9 小时
-            return 90
-        else:  # 超过 9 小时
-            return 80
-    
-    def _calculate_total_sleep(self, sleep_records: List[Dict]) -> Optional[int]:
-        """计算总睡眠时长（分钟）"""
-        if not sleep_records:
-            return None
+    def _summarize_sleep(self, sleep_records: List[Dict]) -> Dict[str, Any]:
+        """
+        遍历一次睡眠记录，得到睡眠评分、各阶段时长和入睡/起床时间
         
+        Apple Health 的睡眠分析通常只有 ASLEEP/AWAKE/INBED，只统计 ASLEEP；
+        深睡、REM 不直接提供，按总睡眠的 17%、20% 估算，其余算浅睡
+        """
         total = 0
+        earliest_start = None
+        latest_end = None
         for record in sleep_records:
-            if record.get("type") == "ASLEEP":
-                total += record.get("duration_minutes", 0)
-        return total if total > 0 else None
-    
-    def _calculate_deep_sleep(self, sleep_records: List[Dict]) -> Optional[int]:
-        """计算深睡时长（Apple Health 不直接提供，估算）"""
-        # Apple Health 的睡眠分析通常只有 ASLEEP/AWAKE/INBED
-        # 深睡通常占总睡眠的 15-20%
-        total = self._calculate_total_sleep(sleep_records)
-        if total:
-            return int(total * 0.17)  # 估算 17%
+            if record.get("type") != "ASLEEP":
+                continue
+            total += record.get("duration_minutes", 0)
+            start = record.get("start", "")
+            end = record.get("end", "")
+            if earliest_start is None or start < earliest_start:
+                earliest_start = start
+            if latest_end is None or end > latest_end:
+                latest_end = end
+        
+        summary = {
+            "sleep_score": None,
+            "total_sleep_minutes": None,
+            "deep_sleep_minutes": None,
+            "rem_sleep_minutes": None,
+            "light_sleep_minutes": None,
+            "sleep_start_time": _parse_time(earliest_start),
+            "sleep_end_time": _parse_time(latest_end),
+        }
+        if total > 0:
+            deep = int(total * 0.17)  # 深睡通常占总睡眠的 15-20%
+            rem = int(total * 0.20)
+            summary.update(
+                sleep_score=_sleep_score(total),
+                total_sleep_minutes=total,
+                deep_sleep_minutes=deep,
+                rem_sleep_minutes=rem,
+                light_sleep_minutes=total - deep - rem,
+            )
+        return summary
+
+
+def _iter_samples(samples: Any):
+    """
+    逐个产出 (时间戳, 值)
+
+    兼容按列存储的 {"timestamps": [...], "values": [...]} 和旧版导入保存的 [{"timestamp", "value"}, ...]
+    """
+    if not samples:
+        return
+    if isinstance(samples, dict):
+        yield from zip(samples.get("timestamps", []), samples.get("values", []))
+        return
+    for sample in samples:
+        yield sample.get("timestamp"), sample.get("value")
+
+
+def _sleep_score(total_sleep: int) -> int:
+    """按总睡眠时长（分钟）计算睡眠评分（简化算法）"""
+    if total_sleep < 360:  # 少于 6 小时
+        return 50
+    elif total_sleep < 420:  # 6-7 小时
+        return 70
+    elif total_sleep < 540:  # 7-9 小时
+        return 90
+    else:  # 超过 9 小时
+        return 80
+
+
+def _parse_time(timestamp: Optional[str]) -> Optional[time]:
+    """从 Apple Health 时间戳中取出时刻，无法解析时返回 None"""
+    if not timestamp:
         return None
-    
-    def _calculate_rem_sleep(self, sleep_records: List[Dict]) -> Optional[int]:
-        """计算 REM 睡眠时长（估算）"""
-        total = self._calculate_total_sleep(sleep_records)
-        if total:
-            return int(total * 0.20)  # 估算 20%
+    try:
+        return datetime.fromisoformat(timestamp.replace("Z", "+00:00")).time()
+    except ValueError:
         return None
+
+
+# 采样类数据：(结果中的键, 解析时的列前缀)
+_SAMPLE_SERIES = (
+    ("heart_rate_samples", "hr"),
+    ("spo2_samples", "spo2"),
+    ("respiration_samples", "respiration"),
+    ("hrv_samples", "hrv"),
+)
+
+
+def _new_day_bucket() -> Dict[str, Any]:
+    """
+    单日数据的初始结构
+
+    采样按列存储（结构数组）：时间戳列表 + 紧凑数值数组（心率 uint16，其余 float64），
+    不为每个采样点创建字典；hr_hours 记录心率采样的小时，用于计算静息心率
+    """
+    return {
+        "steps": 0,
+        "hr_timestamps": [],
+        "hr_values": array("H"),
+        "hr_hours": array("B"),
+        "sleep": [],
+        "workouts": [],
+        "calories_active": 0,
+        "calories_total": 0,
+        "distance_meters": 0.0,
+        "spo2_timestamps": [],
+        "spo2_values": array("d"),
+        "respiration_timestamps": [],
+        "respiration_values": array("d"),
+        "hrv_timestamps": [],
+        "hrv_values": array("d")
+    }
+
+
+def _add_steps(bucket: Dict[str, Any], value: str, start_date: str, end_date: Optional[str]):
+    # 步数（累加）
+    bucket["steps"] += int(float(value))
+
+
+def _add_heart_rate(bucket: Dict[str, Any], value: str, start_date: str, end_date: Optional[str]):
+    # 心率采样；同时记下小时，聚合时计算静息心率无需再解析时间
+    heart_rate = int(float(value))
+    hour = int(start_date[11:13])
+    # 先写数值列：超出 uint16 范围的异常值在这里被拒绝，各列长度保持一致
+    bucket["hr_values"].append(heart_rate)
+    bucket["hr_hours"].append(hour)
+    bucket["hr_timestamps"].append(start_date)
+
+
+def _add_active_energy(bucket: Dict[str, Any], value: str, start_date: str, end_date: Optional[str]):
+    # 活动卡路里（累加）
+    bucket["calories_active"] += float(value)
+
+
+def _add_basal_energy(bucket: Dict[str, Any], value: str, start_date: str, end_date: Optional[str]):
+    # 基础代谢卡路里（累加）
+    bucket["calories_total"] += float(value)
+
+
+def _add_distance(bucket: Dict[str, Any], value: str, start_date: str, end_date: Optional[str]):
+    # 步行/跑步距离（累加）
+    bucket["distance_meters"] += float(value) * 1000  # 转换为米
+
+
+def _add_sleep(bucket: Dict[str, Any], value: str, start_date: str, end_date: Optional[str]):
+    # 睡眠分析
+    if not end_date:
+        return
+    start_dt = datetime.fromisoformat(start_date.replace("Z", "+00:00"))
+    end_dt = datetime.fromisoformat(end_date.replace("Z", "+00:00"))
+    duration_minutes = int((end_dt - start_dt).total_seconds() / 60)
     
-    def _calculate_light_sleep(self, sleep_records: List[Dict]) -> Optional[int]:
-        """计算浅睡时长（估算）"""
-        total = self._calculate_total_sleep(sleep_records)
-        deep = self._calculate_deep_sleep(sleep_records) or 0
-        rem = self._calculate_rem_sleep(sleep_records) or 0
-        if total:
-            return total - deep - rem
-        return None
+    bucket["sleep"].append({
+        "type": value,  # "ASLEEP", "AWAKE", "INBED"
+        "start": start_date,
+        "end": end_date,
+        "duration_minutes": duration_minutes
+    })
+
+
+def _add_spo2(bucket: Dict[str, Any], value: str, start_date: str, end_date: Optional[str]):
+    # 血氧饱和度
+    bucket["spo2_values"].append(float(value) * 100)  # 转换为百分比
+    bucket["spo2_timestamps"].append(start_date)
+
+
+def _add_respiration(bucket: Dict[str, Any], value: str, start_date: str, end_date: Optional[str]):
+    # 呼吸频率
+    bucket["respiration_values"].append(float(value))
+    bucket["respiration_timestamps"].append(start_date)
+
+
+def _add_hrv(bucket: Dict[str, Any], value: str, start_date: str, end_date: Optional[str]):
+    # HRV (SDNN)
+    bucket["hrv_values"].append(float(value) * 1000)  # 转换为毫秒
+    bucket["hrv_timestamps"].append(start_date)
+
+
+# HealthKit 记录类型 -> 处理函数，处理函数参数: (当日数据, value, startDate, endDate)
+_RECORD_HANDLERS = {
+    "HKQuantityTypeIdentifierStepCount": _add_steps,
+    "HKQuantityTypeIdentifierHeartRate": _add_heart_rate,
+    "HKQuantityTypeIdentifierActiveEnergyBurned": _add_active_energy,
+    "HKQuantityTypeIdentifierBasalEnergyBurned": _add_basal_energy,
+    "HKQuantityTypeIdentifierDistanceWalkingRunning": _add_distance,
+    "HKCategoryTypeIdentifierSleepAnalysis": _add_sleep,
+    "HKQuantityTypeIdentifierOxygenSaturation": _add_spo2,
+    "HKQuantityTypeIdentifierRespiratoryRate": _add_respiration,
+    "HKQuantityTypeIdentifierHeartRateVariabilitySDNN": _add_hrv,
+}
+
+
+def _handle_record(record: Mapping[str, str], daily_data: Dict[str, Dict[str, Any]]):
+    """把一条 Record（属性字典）累加到对应日期的数据中；不关心的类型不解析日期，直接跳过"""
+    record_type = record.get("type")
+    handler = _RECORD_HANDLERS.get(record_type)
+    value = record.get("value")
+    start_date = record.get("startDate")
+    if handler is None or not value or not start_date:
+        return
     
-    def _get_sleep_start_time(self, sleep_records: List[Dict]) -> Optional[time]:
-        """获取入睡时间"""
-        if not sleep_records:
-            return None
+    try:
+        # startDate 以本地日期开头（如 "2024-01-01 07:00:00 +0800"），日期键直接取前10位，只做格式校验
+        date_key = start_date[:10]
+        date.fromisoformat(date_key)
+        handler(daily_data[date_key], value, start_date, record.get("endDate"))
+    except Exception as e:
+        logger.warning(f"解析记录失败 (type={record_type}): {e}")
+
+
+def _handle_workout(
+    workout: Mapping[str, str],
+    metadata: Mapping[str, str],
+    daily_data: Dict[str, Dict[str, Any]]
+):
+    """把一条 Workout（属性字典及其 MetadataEntry 键值）加入对应日期的运动记录"""
+    workout_type = workout.get("workoutActivityType")
+    start_date = workout.get("startDate")
+    
+    if not start_date:
+        return
+    
+    try:
+        start_dt = datetime.fromisoformat(start_date.replace("Z", "+00:00"))
+        date_key = start_dt.date().isoformat()
         
-        asleep_records = [r for r in sleep_records if r.get("type") == "ASLEEP"]
-        if not asleep_records:
-            return None
+        end_date = workout.get("endDate")
+        duration = 0
+        if end_date:
+            end_dt = datetime.fromisoformat(end_date.replace("Z", "+00:00"))
+            duration = int((end_dt - start_dt).total_seconds())
         
-        earliest = min(asleep_records, key=lambda x: x.get("start", ""))
-        try:
-            dt = datetime.fromisoformat(earliest["start"].replace("Z", "+00:00"))
-            return dt.time()
-        except:
-            return None
-    
-    def _get_sleep_end_time(self, sleep_records: List[Dict]) -> Optional[time]:
-        """获取起床时间"""
-        if not sleep_records:
-            return None
+        # 提取运动数据
+        total_energy = metadata.get("HKTotalEnergyBurned")
+        total_distance = metadata.get("HKTotalDistance")
         
-        asleep_records = [r for r in sleep_records if r.get("type") == "ASLEEP"]
-        if not asleep_records:
+        daily_data[date_key]["workouts"].append({
+            "id": workout.get("sourceName", ""),
+            "type": AppleHealthAdapter._map_workout_type(workout_type),
+            "start": start_date,
+            "end": end_date,
+            "duration": duration,
+            "calories": float(total_energy) if total_energy is not None else None,
+            "distance": float(total_distance) * 1000 if total_distance is not None else None,  # 转换为米
+        })
+    
+    except Exception as e:
+        logger.warning(f"解析运动记录失败: {e}")
+
+
+def _content_digest(stream: IO[bytes]) -> Optional[str]:
+    """按块计算剩余内容的摘要，并把读取位置复原；不可回退的流返回 None"""
+    try:
+        if not stream.seekable():
             return None
+        start = stream.tell()
+    except (AttributeError, OSError):
+        return None
+    digest = hashlib.blake2b(digest_size=16)
+    while True:
+        chunk = stream.read(_XML_CHUNK_SIZE)
+        if not chunk:
+            break
+        digest.update(chunk)
+    stream.seek(start)
+    return digest.hexdigest()
+
+
+def _disk_cache_path(digest: str) -> Optional[str]:
+    if not settings.apple_health_cache_dir:
+        return None
+    return os.path.join(settings.apple_health_cache_dir, f"{digest}.pkl")
+
+
+def _remember(digest: str, payload: bytes):
+    with _parsed_cache_lock:
+        _parsed_cache[digest] = payload
+        _parsed_cache.move_to_end(digest)
+        while len(_parsed_cache) > _PARSE_CACHE_MAXSIZE:
+            _parsed_cache.popitem(last=False)
+
+
+def _cache_get(digest: str) -> Optional[bytes]:
+    """先查内存，再查磁盘（命中后放回内存）"""
+    with _parsed_cache_lock:
+        payload = _parsed_cache.get(digest)
+        if payload is not None:
+            _parsed_cache.move_to_end(digest)
+            return payload
+    
+    path = _disk_cache_path(digest)
+    if path is None:
+        return None
+    try:
+        with open(path, "rb") as f:
+            payload = f.read()
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        logger.warning(f"读取 Apple Health 解析缓存失败: {e}")
+        return None
+    _remember(digest, payload)
+    return payload
+
+
+def _cache_put(digest: str, payload: bytes):
+    _remember(digest, payload)
+    path = _disk_cache_path(digest)
+    if path is None:
+        return
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先写临时文件再替换，避免并发导入读到写了一半的缓存
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"保存 Apple Health 解析缓存失败: {e}")
+
+
+def clear_parse_cache(disk: bool = False):
+    """清空 parse_health_xml 的内存缓存；disk=True 时同时删除磁盘上的缓存文件"""
+    with _parsed_cache_lock:
+        _parsed_cache.clear()
+    cache_dir = settings.apple_health_cache_dir
+    if not disk or not cache_dir or not os.path.isdir(cache_dir):
+        return
+    for name in os.listdir(cache_dir):
+        if name.endswith(".pkl"):
+            os.remove(os.path.join(cache_dir, name))
+
+
+def _parse_cached(stream: IO[bytes], parse=None) -> Dict[str, Any]:
+    """按内容摘要查缓存，未命中时解析（默认 _parse_stream）并写入缓存"""
+    digest = _content_digest(stream)
+    if digest is not None:
+        payload = _cache_get(digest)
+        if payload is not None:
+            logger.info(f"Apple Health 导出内容未变化，使用缓存的解析结果 ({digest})")
+            return pickle.loads(payload)
+    
+    result = (parse or _parse_stream)(stream)
+    if digest is not None:
+        _cache_put(digest, pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+    return result
+
+
+def _new_parser(target: "_HealthTarget"):
+    # 解析器以 SAX 方式回调 target，不构建元素树；安装了 lxml 时使用 libxml2，否则使用标准库 expat
+    if LXML_AVAILABLE:
+        return lxml_etree.XMLParser(target=target, huge_tree=True)
+    return ET.XMLParser(target=target)
+
+
+def _parse_stream(stream: IO[bytes]) -> Dict[str, Any]:
+    """流式解析并聚合每日数据"""
+    parser = _new_parser(_HealthTarget())
+    try:
+        _feed(parser, stream)
+        daily_data = parser.close()
+    except (ET.ParseError, *_LXML_ERRORS) as e:
+        logger.error(f"XML 解析失败: {e}")
+        raise ValueError(f"无效的 XML 文件: {e}")
+    
+    return _aggregate_days(daily_data)
+
+
+def _aggregate_days(daily_data: Mapping[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """聚合每日数据"""
+    result = {}
+    for date_key, data in daily_data.items():
+        _aggregate_day(data)
+        result[date_key] = dict(data)
+    return result
+
+
+def _find_boundary(mm: mmap.mmap, start: int, end: int) -> int:
+    """从 start 起找下一个顶层元素开始标签所在行（跳过 " </Record>" 这类结束标签），找不到返回 -1"""
+    while True:
+        cut = mm.find(_TOP_LEVEL_BOUNDARY, start, end)
+        tag_start = cut + len(_TOP_LEVEL_BOUNDARY)
+        if cut < 0 or mm[tag_start:tag_start + 1] != b"/":
+            return cut
+        start = cut + 1
+
+
+def _shard_ranges(path: Union[str, os.PathLike], shards: int) -> List[tuple]:
+    """
+    把 <HealthData> 根元素内部的内容按顶层元素边界切成最多 shards 段，返回 [(起始偏移, 结束偏移), ...]
+
+    找不到根元素或切分点时返回空列表（由调用方整体解析）
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        root = mm.find(b"<HealthData")
+        body_end = mm.rfind(b"</HealthData>")
+        if root < 0 or body_end < 0:
+            return []
+        body_start = mm.find(b">", root) + 1
         
-        latest = max(asleep_records, key=lambda x: x.get("end", ""))
+        cuts = [body_start]
+        step = (body_end - body_start) // shards
+        for i in range(1, shards):
+            cut = _find_boundary(mm, max(body_start + i * step, cuts[-1] + 1), body_end)
+            if cut < 0:
+                break
+            cuts.append(cut)
+        cuts.append(body_end)
+    return list(zip(cuts, cuts[1:]))
+
+
+def _parse_shard(path: Union[str, os.PathLike], start: int, end: int) -> Dict[str, Dict[str, Any]]:
+    """在子进程中解析文件的一段（包一层根元素），返回未聚合的每日数据"""
+    parser = _new_parser(_HealthTarget())
+    try:
+        parser.feed(b"<HealthData>")
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                chunk = f.read(min(_XML_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                parser.feed(chunk)
+                remaining -= len(chunk)
+        parser.feed(b"</HealthData>")
+        return dict(parser.close())
+    except (ET.ParseError, *_LXML_ERRORS) as e:
+        raise ValueError(f"无效的 XML 文件: {e}")
+
+
+def _merge_day_buckets(target: Dict[str, Any], bucket: Dict[str, Any]):
+    """把同一天后一分片的原始数据并入前一分片：计数累加，采样列表/数组按顺序追加"""
+    for key, value in bucket.items():
+        if isinstance(value, (list, array)):
+            target[key].extend(value)
+        else:
+            target[key] += value
+
+
+def _parse_file_parallel(path: Union[str, os.PathLike], workers: int) -> Dict[str, Any]:
+    ranges = _shard_ranges(path, workers) if workers > 1 and os.path.getsize(path) >= _PARALLEL_MIN_BYTES else []
+    if len(ranges) < 2:
+        with open(path, "rb") as f:
+            return _parse_stream(f)
+    
+    logger.info(f"Apple Health 导出分 {len(ranges)} 片并行解析")
+    with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+        futures = [executor.submit(_parse_shard, path, start, end) for start, end in ranges]
         try:
-            dt = datetime.fromisoformat(latest["end"].replace("Z", "+00:00"))
-            return dt.time()
-        except:
-            return None
+            shard_results = [future.result() for future in futures]
+        except ValueError as e:
+            logger.error(f"XML 解析失败: {e}")
+            raise
+    
+    daily_data: Dict[str, Dict[str, Any]] = {}
+    for shard in shard_results:
+        for date_key, bucket in shard.items():
+            if date_key in daily_data:
+                _merge_day_buckets(daily_data[date_key], bucket)
+            else:
+                daily_data[date_key] = bucket
+    return _aggregate_days(daily_data)
+
+
+def _feed(parser: Any, stream: IO[bytes]):
+    """按块把文件内容喂给解析器"""
+    while True:
+        chunk = stream.read(_XML_CHUNK_SIZE)
+        if not chunk:
+            break
+        parser.feed(chunk)
+
+
+class _HealthTarget:
+    """
+    XMLParser 的 target：Record 在开始标签处直接处理；
+    Workout 收集其内部的 MetadataEntry，在结束标签处处理
+    """
+    
+    def __init__(self):
+        self.daily_data: Dict[str, Dict[str, Any]] = defaultdict(_new_day_bucket)
+        self._workout: Optional[Dict[str, str]] = None
+        self._workout_metadata: Dict[str, str] = {}
+    
+    def start(self, tag: str, attrib: Mapping[str, str]):
+        if tag == "Record":
+            _handle_record(attrib, self.daily_data)
+        elif tag == "Workout":
+            self._workout = dict(attrib)
+            self._workout_metadata = {}
+        elif tag == "MetadataEntry" and self._workout is not None:
+            # 与 find(".//MetadataEntry[@key=...]") 一致：同名键取第一个
+            self._workout_metadata.setdefault(attrib.get("key"), attrib.get("value"))
+    
+    def end(self, tag: str):
+        if tag == "Workout" and self._workout is not None:
+            _handle_workout(self._workout, self._workout_metadata, self.daily_data)
+            self._workout = None
+    
+    def data(self, data: str):
+        pass
+    
+    def close(self) -> Dict[str, Dict[str, Any]]:
+        return self.daily_data
+
+
+_NUMPY_DTYPES = {"B": "uint8", "H": "uint16", "d": "float64"}
+
+
+def _as_ndarray(values: array):
+    """零拷贝地把 array.array 视为 NumPy 数组（typecode 与 dtype 一一对应）"""
+    return np.frombuffer(values, dtype=_NUMPY_DTYPES[values.typecode])
+
+
+def _morning_mean(hr_values: array, hr_hours: array) -> Optional[float]:
+    """早上8点前心率采样的平均值，没有早间采样时返回 None"""
+    if NUMPY_AVAILABLE:
+        morning = _as_ndarray(hr_values)[_as_ndarray(hr_hours) < 8]
+        return float(morning.mean()) if morning.size else None
+    morning = [value for value, hour in zip(hr_values, hr_hours) if hour < 8]
+    return sum(morning) / len(morning) if morning else None
+
+
+def _mean(values: array) -> float:
+    if NUMPY_AVAILABLE:
+        return float(_as_ndarray(values).mean())
+    return sum(values) / len(values)
+
+
+def _min(values: array):
+    return _as_ndarray(values).min().item() if NUMPY_AVAILABLE else min(values)
+
+
+def _max(values: array):
+    return _as_ndarray(values).max().item() if NUMPY_AVAILABLE else max(values)
+
+
+def _aggregate_day(data: Dict[str, Any]):
+    """
+    根据当天的采样计算心率、血氧、呼吸、HRV 统计和活动分钟数（原地写入）
+
+    解析时的列在这里转换为结果中的采样：{"timestamps": [...], "values": [...]}
+    """
+    hr_values = data["hr_values"]
+    hr_hours = data.pop("hr_hours")
+    spo2_values = data["spo2_values"]
+    resp_values = data["respiration_values"]
+    hrv_values = data["hrv_values"]
+
+    # 计算心率统计
+    if hr_values:
+        data["avg_heart_rate"] = int(_mean(hr_values))
+        data["max_heart_rate"] = _max(hr_values)
+        data["min_heart_rate"] = _min(hr_values)
+        # 静息心率通常是最小值或早上的平均值
+        morning_mean = _morning_mean(hr_values, hr_hours)
+        data["resting_heart_rate"] = int(morning_mean) if morning_mean is not None else data["min_heart_rate"]
+    
+    # 计算血氧统计
+    if spo2_values:
+        data["spo2_avg"] = _mean(spo2_values)
+        data["spo2_min"] = _min(spo2_values)
+    
+    # 计算呼吸频率统计
+    if resp_values:
+        data["respiration_rate_avg"] = _mean(resp_values)
+    
+    # 计算 HRV 平均值
+    if hrv_values:
+        data["hrv"] = _mean(hrv_values)
+    
+    for key, prefix in _SAMPLE_SERIES:
+        data[key] = {
+            "timestamps": data.pop(f"{prefix}_timestamps"),
+            "values": data.pop(f"{prefix}_values").tolist(),
+        }
+    
+    # 计算活动分钟数（粗略估算）
+    if data["steps"] > 0:
+        # 假设每分钟至少 60 步才算活动
+        data["active_minutes"] = min(data["steps"] // 60, 1440)  # 最多 24 小时
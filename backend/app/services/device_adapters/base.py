@@ -4,11 +4,12 @@
 定义所有设备适配器的统一接口，实现插件化架构
 """
 
+import asyncio
 from abc import ABC, abstractmethod
-from dataclasses import dataclass, field
-from datetime import date, datetime, time
+from dataclasses import dataclass, fields
+from datetime import date, datetime, time, timedelta
 from enum import Enum
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
@@ -83,38 +84,39 @@ class NormalizedHealthData:
     respiration_rate_avg: Optional[float] = None  # 平均呼吸频率 (次/分钟)
     
     # ===== 原始数据 =====
-    raw_data: Optional[Dict[str, Any]] = field(default_factory=dict)  # 完整原始数据（JSON）
+    raw_data: Optional[Dict[str, Any]] = None   # 完整原始数据（JSON，适配器按需填充）
     
-    def to_dict(self) -> Dict[str, Any]:
-        """转换为字典"""
-        return {
-            "record_date": self.record_date.isoformat() if self.record_date else None,
-            "source": self.source,
-            "sleep_score": self.sleep_score,
-            "total_sleep_minutes": self.total_sleep_minutes,
-            "deep_sleep_minutes": self.deep_sleep_minutes,
-            "rem_sleep_minutes": self.rem_sleep_minutes,
-            "light_sleep_minutes": self.light_sleep_minutes,
-            "awake_minutes": self.awake_minutes,
-            "resting_heart_rate": self.resting_heart_rate,
-            "avg_heart_rate": self.avg_heart_rate,
-            "max_heart_rate": self.max_heart_rate,
-            "min_heart_rate": self.min_heart_rate,
-            "hrv": self.hrv,
-            "hrv_status": self.hrv_status,
-            "steps": self.steps,
-            "distance_meters": self.distance_meters,
-            "floors_climbed": self.floors_climbed,
-            "active_minutes": self.active_minutes,
-            "calories_total": self.calories_total,
-            "calories_active": self.calories_active,
-            "stress_level": self.stress_level,
-            "body_battery_high": self.body_battery_high,
-            "body_battery_low": self.body_battery_low,
-            "spo2_avg": self.spo2_avg,
-            "spo2_min": self.spo2_min,
-            "respiration_rate_avg": self.respiration_rate_avg,
-        }
+    # to_dict 在类定义之后按字段生成，见 _build_to_dict
+
+
+# to_dict 输出的字段（不含入睡/起床时间与原始数据）
+_ND_FIELDS = tuple(
+    f.name for f in fields(NormalizedHealthData)
+    if f.name not in ("sleep_start_time", "sleep_end_time", "raw_data")
+)
+
+
+def _build_to_dict(names: tuple):
+    """
+    按字段生成 to_dict
+    
+    与 dataclasses 生成 __init__ 的方式相同：把字段展开成一个字典字面量再 exec，
+    新增字段自动包含，调用时没有逐字段循环
+    """
+    items = ", ".join(
+        f"{name!r}: (self.{name}.isoformat() if self.{name} else None)"
+        if name == "record_date" else f"{name!r}: self.{name}"
+        for name in names
+    )
+    namespace: Dict[str, Any] = {}
+    exec(f"def to_dict(self):\n    return {{{items}}}\n", namespace)
+    to_dict = namespace["to_dict"]
+    to_dict.__doc__ = "转换为字典"
+    to_dict.__qualname__ = "NormalizedHealthData.to_dict"
+    return to_dict
+
+
+NormalizedHealthData.to_dict = _build_to_dict(_ND_FIELDS)
 
 
 @dataclass
@@ -125,7 +127,7 @@ class HeartRateSample:
     source: str = "unknown"
 
 
-@dataclass 
+@dataclass
 class WorkoutData:
     """运动训练数据"""
     workout_date: date
@@ -147,6 +149,9 @@ class DeviceAdapter(ABC):
     所有设备（Garmin、华为、Apple等）必须实现此接口
     """
     
+    # fetch_range 默认实现中同时进行的单日请求数上限（避免触发设备 API 限流）
+    FETCH_CONCURRENCY = 8
+    
     @property
     @abstractmethod
     def device_type(self) -> DeviceType:
@@ -208,6 +213,43 @@ class DeviceAdapter(ABC):
         """
         pass
     
+    async def fetch_range(
+        self, 
+        start_date: date, 
+        end_date: date
+    ) -> Tuple[List[NormalizedHealthData], List[date]]:
+        """
+        获取日期区间内每天的健康数据
+        
+        默认并发调用 fetch_daily_data（最多 FETCH_CONCURRENCY 个同时进行），
+        单日获取失败时记录日志并计入失败日期；支持区间查询的设备可重写
+        
+        Args:
+            start_date: 开始日期
+            end_date: 结束日期（包含）
+            
+        Returns:
+            (有数据的日期的规范化数据列表（按日期升序）, 获取失败的日期列表)
+        """
+        semaphore = asyncio.Semaphore(self.FETCH_CONCURRENCY)
+        
+        async def fetch(target_date: date) -> Optional[NormalizedHealthData]:
+            async with semaphore:
+                return await self.fetch_daily_data(target_date)
+        
+        days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+        results = await asyncio.gather(*(fetch(d) for d in days), return_exceptions=True)
+        
+        daily_data = []
+        failed_dates = []
+        for target_date, data in zip(days, results):
+            if isinstance(data, Exception):
+                logger.warning(f"获取 {target_date} 数据失败: {data}")
+                failed_dates.append(target_date)
+            elif data:
+                daily_data.append(data)
+        return daily_data, failed_dates
+    
     async def fetch_heart_rate_samples(
         self, 
         target_date: date
@@ -240,6 +282,12 @@ class DeviceAdapter(ABC):
         """
         return []
     
+    async def close(self) -> None:
+        """
+        释放适配器持有的资源（如 HTTP 会话，可选实现）
+        """
+        return None
+    
     async def refresh_token(self) -> bool:
         """
         刷新 OAuth Token（OAuth2 设备需要实现）
@@ -19,12 +19,18 @@ API 文档：https://developer.huawei.com/consumer/cn/doc/development/HMSCore-Gu
 """
 
 import os
-import aiohttp
+import time
+import asyncio
+import hashlib
+import httpx
 import logging
+from collections import OrderedDict
 from datetime import date, datetime, timedelta
-from typing import Optional, List, Dict, Any
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, Tuple
 from urllib.parse import urlencode
 
+from app.utils import json_utils
 from .base import (
     DeviceAdapter, 
     DeviceType, 
@@ -36,6 +42,116 @@ from .base import (
 
 logger = logging.getLogger(__name__)
 
+try:
+    import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_HTTP_TIMEOUT = 15.0
+_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=32, keepalive_expiry=60)
+
+# 进程内共享的 HTTP 客户端：适配器按用户/请求创建，共享客户端让 DNS 解析、
+# TCP+TLS 连接在所有用户间复用；应用关闭时由 aclose_http_client 释放
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=_HTTP_TIMEOUT,
+            limits=_HTTP_LIMITS,
+            http2=HTTP2_AVAILABLE,
+        )
+    return _http_client
+
+
+async def aclose_http_client():
+    """关闭共享的 HTTP 客户端（下次请求时会重新创建）"""
+    global _http_client
+    client, _http_client = _http_client, None
+    if client is not None:
+        await client.aclose()
+
+
+# 日数据缓存：(账号, 日期) -> (写入时间, 数据)；当天数据短 TTL，历史日期长 TTL
+_DAILY_CACHE_MAXSIZE = 512
+_DAILY_CACHE_TODAY_TTL = 60
+_DAILY_CACHE_PAST_TTL = 86400
+_daily_cache: "OrderedDict[Tuple[str, date], Tuple[float, NormalizedHealthData]]" = OrderedDict()
+
+
+def _daily_cache_get(key: Tuple[str, date], target_date: date) -> Optional[NormalizedHealthData]:
+    entry = _daily_cache.get(key)
+    if entry is None:
+        return None
+    ttl = _DAILY_CACHE_TODAY_TTL if target_date >= date.today() else _DAILY_CACHE_PAST_TTL
+    if time.time() - entry[0] >= ttl:
+        _daily_cache.pop(key, None)
+        return None
+    _daily_cache.move_to_end(key)
+    return entry[1]
+
+
+def _daily_cache_put(key: Tuple[str, date], data: NormalizedHealthData):
+    _daily_cache[key] = (time.time(), data)
+    _daily_cache.move_to_end(key)
+    while len(_daily_cache) > _DAILY_CACHE_MAXSIZE:
+        _daily_cache.popitem(last=False)
+
+
+def clear_daily_cache():
+    """清空日数据缓存"""
+    _daily_cache.clear()
+
+
+def _seconds_to_minutes(seconds: Any) -> Optional[int]:
+    """秒转整分钟（接口偶尔返回浮点数，统一取整）"""
+    return None if seconds is None else int(seconds) // 60
+
+
+def _error_message(body: bytes) -> str:
+    """错误响应的简短描述：较小的 JSON 取 message 字段，其他内容（如 HTML 错误页）只截取开头"""
+    if len(body) <= 512:
+        try:
+            result = json_utils.loads(body)
+            if isinstance(result, dict) and result.get("message"):
+                return str(result["message"])
+        except ValueError:
+            pass
+    return body[:200].decode(errors="replace")
+
+
+def _item_date(item: Dict[str, Any], time_key: str, prefer_time: bool = False) -> Optional[date]:
+    """
+    日汇总数据所属日期
+    
+    优先取 date 字段（20240101 / "2024-01-01"），没有时按 time_key 指定的毫秒时间戳换算；
+    prefer_time=True 时优先用时间戳（睡眠按醒来的 endTime 归属，date 可能是入睡的前一天）
+    """
+    ts = item.get(time_key)
+    if prefer_time and ts:
+        return datetime.fromtimestamp(ts / 1000).date()
+    value = item.get("date")
+    if value:
+        value = str(value)
+        try:
+            if len(value) == 8 and value.isdigit():
+                return date(int(value[:4]), int(value[4:6]), int(value[6:]))
+            return date.fromisoformat(value[:10])
+        except ValueError:
+            return None
+    if ts:
+        return datetime.fromtimestamp(ts / 1000).date()
+    return None
+
+
+@lru_cache(maxsize=128)
+def _date_to_ts(d: date) -> int:
+    """日期（本地零点）转毫秒时间戳，同一天的多次查询复用结果"""
+    return int(datetime.combine(d, datetime.min.time()).timestamp() * 1000)
+
 
 class HuaweiHealthAdapter(DeviceAdapter):
     """
@@ -71,6 +187,42 @@ class HuaweiHealthAdapter(DeviceAdapter):
         "https://www.huawei.com/healthkit/oxygen.read",      # 血氧
         "https://www.huawei.com/healthkit/stress.read",      # 压力
     ]
+    _OAUTH_SCOPE_STR = " ".join(OAUTH_SCOPES)
+    
+    # 日汇总接口：数据类型 -> (路径, {华为字段: 输出字段}, 缺省值)
+    _ENDPOINTS = {
+        "steps": ("step/daily", {
+            "step": "steps",
+            "distance": "distance",  # 米
+        }, 0),
+        "heart_rate": ("heartrate/daily", {
+            "restingHeartRate": "resting",
+            "avgHeartRate": "avg",
+            "maxHeartRate": "max",
+            "minHeartRate": "min",
+        }, None),
+        # 华为返回的是秒，原样保留，规范化时再换算为分钟
+        "sleep": ("sleep/daily", {
+            "totalSleepTime": "total_seconds",
+            "deepSleepTime": "deep_seconds",
+            "lightSleepTime": "light_seconds",
+            "remSleepTime": "rem_seconds",
+            "awakeTime": "awake_seconds",
+        }, 0),
+        "calories": ("calories/daily", {
+            "totalCalories": "total",
+            "activeCalories": "active",
+        }, 0),
+        "stress": ("stress/daily", {
+            "avgStress": "avg_stress",
+            "maxStress": "max_stress",
+        }, None),
+        "spo2": ("oxygen/daily", {
+            "avgOxygen": "avg",
+            "minOxygen": "min",
+            "maxOxygen": "max",
+        }, None),
+    }
     
     def __init__(
         self, 
@@ -95,6 +247,10 @@ class HuaweiHealthAdapter(DeviceAdapter):
         self.access_token = access_token
         self.refresh_token = refresh_token
         self.is_cn = is_cn
+        self._client: Optional[httpx.AsyncClient] = None
+        self._auth_headers: Optional[Dict[str, str]] = None
+        self._auth_headers_token: Optional[str] = None
+        self._refresh_lock = asyncio.Lock()
         
         # 根据区域选择 API 地址
         if is_cn:
@@ -105,10 +261,17 @@ class HuaweiHealthAdapter(DeviceAdapter):
             self.auth_url = self.HUAWEI_AUTH_URL_GLOBAL
             self.token_url = self.HUAWEI_TOKEN_URL_GLOBAL
             self.api_base = self.HUAWEI_API_BASE_GLOBAL
+        
+        # 授权 URL 中除 redirect_uri、state 外的参数固定，预先编码
+        self._oauth_url_prefix = f"{self.auth_url}?" + urlencode({
+            "response_type": "code",
+            "client_id": self.client_id,
+            "scope": self._OAUTH_SCOPE_STR,
+            "access_type": "offline",  # 获取 refresh_token
+        })
     
-    @property
-    def device_type(self) -> DeviceType:
-        return DeviceType.HUAWEI
+    device_type: DeviceType = DeviceType.HUAWEI
+    _SOURCE = DeviceType.HUAWEI.value
     
     @property
     def display_name(self) -> str:
@@ -132,15 +295,7 @@ class HuaweiHealthAdapter(DeviceAdapter):
         Returns:
             完整的授权 URL
         """
-        params = {
-            "response_type": "code",
-            "client_id": self.client_id,
-            "redirect_uri": redirect_uri,
-            "scope": " ".join(self.OAUTH_SCOPES),
-            "state": state,
-            "access_type": "offline",  # 获取 refresh_token
-        }
-        return f"{self.auth_url}?{urlencode(params)}"
+        return f"{self._oauth_url_prefix}&{urlencode({'redirect_uri': redirect_uri, 'state': state})}"
     
     async def exchange_code_for_token(
         self, 
@@ -162,31 +317,30 @@ class HuaweiHealthAdapter(DeviceAdapter):
                 "token_type": "Bearer"
             }
         """
-        async with aiohttp.ClientSession() as session:
-            data = {
-                "grant_type": "authorization_code",
-                "code": code,
-                "client_id": self.client_id,
-                "client_secret": self.client_secret,
-                "redirect_uri": redirect_uri,
-            }
-            
-            async with session.post(
-                self.token_url, 
-                data=data,
-                headers={"Content-Type": "application/x-www-form-urlencoded"}
-            ) as resp:
-                result = await resp.json()
-                
-                if "error" in result:
-                    logger.error(f"华为 Token 换取失败: {result}")
-                    raise Exception(f"Token换取失败: {result.get('error_description', result.get('error'))}")
-                
-                # 保存 Token
-                self.access_token = result.get("access_token")
-                self.refresh_token = result.get("refresh_token")
-                
-                return result
+        data = {
+            "grant_type": "authorization_code",
+            "code": code,
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+            "redirect_uri": redirect_uri,
+        }
+        
+        resp = await self._get_client().post(
+            self.token_url, 
+            data=data,
+            headers={"Content-Type": "application/x-www-form-urlencoded"}
+        )
+        result = json_utils.loads(resp.content)
+        
+        if "error" in result:
+            logger.error(f"华为 Token 换取失败: {result}")
+            raise Exception(f"Token换取失败: {result.get('error_description', result.get('error'))}")
+        
+        # 保存 Token
+        self.access_token = result.get("access_token")
+        self.refresh_token = result.get("refresh_token")
+        
+        return result
     
     async def refresh_token(self) -> bool:
         """
@@ -195,37 +349,44 @@ class HuaweiHealthAdapter(DeviceAdapter):
         Returns:
             刷新是否成功
         """
+        return await self._refresh_access_token()
+    
+    async def _refresh_access_token(self) -> bool:
+        """
+        刷新 Access Token 的实现
+        
+        实例属性 refresh_token 会遮蔽同名方法，类内部统一调用此方法
+        """
         if not self.refresh_token:
             logger.warning("无 refresh_token，无法刷新")
             return False
         
         try:
-            async with aiohttp.ClientSession() as session:
-                data = {
-                    "grant_type": "refresh_token",
-                    "refresh_token": self.refresh_token,
-                    "client_id": self.client_id,
-                    "client_secret": self.client_secret,
-                }
-                
-                async with session.post(
-                    self.token_url,
-                    data=data,
-                    headers={"Content-Type": "application/x-www-form-urlencoded"}
-                ) as resp:
-                    result = await resp.json()
-                    
-                    if "error" in result:
-                        logger.error(f"华为 Token 刷新失败: {result}")
-                        return False
-                    
-                    self.access_token = result.get("access_token")
-                    if result.get("refresh_token"):
-                        self.refresh_token = result.get("refresh_token")
-                    
-                    logger.info("华为 Token 刷新成功")
-                    return True
-                    
+            data = {
+                "grant_type": "refresh_token",
+                "refresh_token": self.refresh_token,
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+            }
+            
+            resp = await self._get_client().post(
+                self.token_url,
+                data=data,
+                headers={"Content-Type": "application/x-www-form-urlencoded"}
+            )
+            result = json_utils.loads(resp.content)
+            
+            if "error" in result:
+                logger.error(f"华为 Token 刷新失败: {result}")
+                return False
+            
+            self.access_token = result.get("access_token")
+            if result.get("refresh_token"):
+                self.refresh_token = result.get("refresh_token")
+            
+            logger.info("华为 Token 刷新成功")
+            return True
+            
         except Exception as e:
             logger.error(f"华为 Token 刷新异常: {e}")
             return False
@@ -258,32 +419,26 @@ class HuaweiHealthAdapter(DeviceAdapter):
         try:
             # 尝试获取今日步数来验证连接
             today = date.today()
-            headers = self._get_auth_headers()
             
-            async with aiohttp.ClientSession() as session:
-                # 使用步数 API 测试连接
-                url = f"{self.api_base}/healthkit/v1/data/step/daily"
-                params = {
-                    "startTime": self._date_to_timestamp(today),
-                    "endTime": self._date_to_timestamp(today + timedelta(days=1)),
-                }
+            # 使用步数 API 测试连接（Token 过期时刷新后重试一次）
+            url = f"{self.api_base}/healthkit/v1/data/step/daily"
+            params = {
+                "startTime": self._date_to_timestamp(today),
+                "endTime": self._date_to_timestamp(today + timedelta(days=1)),
+            }
+            status, body = await self._authorized_get(url, params)
+            
+            if status == 401:
+                return {"success": False, "message": "Token 已过期，请重新授权"}
+            
+            if status == 200:
+                return {"success": True, "message": "连接成功"}
+            
+            return {
+                "success": False, 
+                "message": f"连接失败({status}): {_error_message(body)}"
+            }
                 
-                async with session.get(url, headers=headers, params=params) as resp:
-                    if resp.status == 401:
-                        # Token 过期，尝试刷新
-                        if await self.refresh_token():
-                            return await self.test_connection()
-                        return {"success": False, "message": "Token 已过期，请重新授权"}
-                    
-                    if resp.status == 200:
-                        return {"success": True, "message": "连接成功"}
-                    
-                    result = await resp.json()
-                    return {
-                        "success": False, 
-                        "message": f"连接失败: {result.get('message', resp.status)}"
-                    }
-                    
         except Exception as e:
             logger.error(f"华为连接测试失败: {e}")
             return {"success": False, "message": f"连接异常: {str(e)}"}
@@ -294,302 +449,244 @@ class HuaweiHealthAdapter(DeviceAdapter):
             raise ValueError("未认证，请先完成 OAuth 授权")
         
         try:
-            # 并行获取各项数据
-            steps_data = await self._fetch_steps(target_date)
-            heart_rate_data = await self._fetch_heart_rate(target_date)
-            sleep_data = await self._fetch_sleep(target_date)
-            calories_data = await self._fetch_calories(target_date)
-            stress_data = await self._fetch_stress(target_date)
-            spo2_data = await self._fetch_spo2(target_date)
-            
-            # 规范化数据
-            return NormalizedHealthData(
-                record_date=target_date,
-                source=self.device_type.value,
-                
-                # 步数与距离
-                steps=steps_data.get("steps"),
-                distance_meters=steps_data.get("distance"),
-                
-                # 心率
-                resting_heart_rate=heart_rate_data.get("resting"),
-                avg_heart_rate=heart_rate_data.get("avg"),
-                max_heart_rate=heart_rate_data.get("max"),
-                min_heart_rate=heart_rate_data.get("min"),
-                
-                # 睡眠
-                total_sleep_minutes=sleep_data.get("total_minutes"),
-                deep_sleep_minutes=sleep_data.get("deep_minutes"),
-                light_sleep_minutes=sleep_data.get("light_minutes"),
-                rem_sleep_minutes=sleep_data.get("rem_minutes"),
-                awake_minutes=sleep_data.get("awake_minutes"),
-                
-                # 卡路里
-                calories_total=calories_data.get("total"),
-                calories_active=calories_data.get("active"),
-                
-                # 压力
-                stress_level=stress_data.get("avg_stress"),
-                
-                # 血氧
-                spo2_avg=spo2_data.get("avg"),
-                spo2_min=spo2_data.get("min"),
-                
-                # 原始数据
-                raw_data={
-                    "steps": steps_data,
-                    "heart_rate": heart_rate_data,
-                    "sleep": sleep_data,
-                    "calories": calories_data,
-                    "stress": stress_data,
-                    "spo2": spo2_data,
-                }
-            )
-            
+            return (await self.fetch_range(target_date, target_date))[0][0]
         except Exception as e:
             logger.error(f"华为健康数据获取失败 ({target_date}): {e}")
             return None
     
+    async def fetch_range(
+        self, start_date: date, end_date: date
+    ) -> Tuple[List[NormalizedHealthData], List[date]]:
+        """
+        获取日期区间内每天的健康数据
+        
+        每类数据对整个区间只请求一次（接口按天返回多条），
+        同步一周数据只需 6 次请求而不是 6×7 次；单项失败按无数据处理，不计入失败日期
+        """
+        if not self.access_token:
+            raise ValueError("未认证，请先完成 OAuth 授权")
+        
+        days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+        account_key = self._account_key()
+        cached = [_daily_cache_get((account_key, d), d) for d in days]
+        if all(item is not None for item in cached):
+            return cached, []
+        
+        start_ts = self._date_to_timestamp(start_date)
+        end_ts = self._date_to_timestamp(end_date + timedelta(days=1))
+        # 睡眠数据从前一天晚上开始查询
+        sleep_start_ts = self._date_to_timestamp(start_date - timedelta(days=1))
+        
+        # 并行获取各项数据，单项失败按无数据处理
+        kinds = tuple(self._ENDPOINTS)
+        results = await asyncio.gather(
+            *(
+                self._fetch(kind, sleep_start_ts if kind == "sleep" else start_ts, end_ts, start_date, end_date)
+                for kind in kinds
+            ),
+            return_exceptions=True,
+        )
+        complete = all(isinstance(r, dict) for r in results)
+        by_kind = {kind: r if isinstance(r, dict) else {} for kind, r in zip(kinds, results)}
+        
+        normalized = [
+            self._normalize(d, {kind: by_kind[kind].get(d, {}) for kind in kinds})
+            for d in days
+        ]
+        # 只缓存各项均请求成功的结果，避免把 Token 过期等临时失败缓存下来
+        if complete:
+            for item in normalized:
+                _daily_cache_put((account_key, item.record_date), item)
+        return normalized, []
+    
+    def _normalize(self, target_date: date, metrics: Dict[str, Dict[str, Any]]) -> NormalizedHealthData:
+        """将某一天的各项数据转换为规范化格式"""
+        steps_data = metrics["steps"]
+        heart_rate_data = metrics["heart_rate"]
+        sleep_data = metrics["sleep"]
+        calories_data = metrics["calories"]
+        stress_data = metrics["stress"]
+        spo2_data = metrics["spo2"]
+        
+        return NormalizedHealthData(
+            record_date=target_date,
+            source=self._SOURCE,
+            
+            # 步数与距离
+            steps=steps_data.get("steps"),
+            distance_meters=steps_data.get("distance"),
+            
+            # 心率
+            resting_heart_rate=heart_rate_data.get("resting"),
+            avg_heart_rate=heart_rate_data.get("avg"),
+            max_heart_rate=heart_rate_data.get("max"),
+            min_heart_rate=heart_rate_data.get("min"),
+            
+            # 睡眠
+            total_sleep_minutes=_seconds_to_minutes(sleep_data.get("total_seconds")),
+            deep_sleep_minutes=_seconds_to_minutes(sleep_data.get("deep_seconds")),
+            light_sleep_minutes=_seconds_to_minutes(sleep_data.get("light_seconds")),
+            rem_sleep_minutes=_seconds_to_minutes(sleep_data.get("rem_seconds")),
+            awake_minutes=_seconds_to_minutes(sleep_data.get("awake_seconds")),
+            
+            # 卡路里
+            calories_total=calories_data.get("total"),
+            calories_active=calories_data.get("active"),
+            
+            # 压力
+            stress_level=stress_data.get("avg_stress"),
+            
+            # 血氧
+            spo2_avg=spo2_data.get("avg"),
+            spo2_min=spo2_data.get("min"),
+            
+            # 原始数据
+            raw_data=metrics,
+        )
+    
     async def fetch_heart_rate_samples(self, target_date: date) -> List[HeartRateSample]:
         """获取心率采样数据"""
         if not self.access_token:
             return []
         
         try:
-            headers = self._get_auth_headers()
             start_ts = self._date_to_timestamp(target_date)
             end_ts = self._date_to_timestamp(target_date + timedelta(days=1))
             
-            async with aiohttp.ClientSession() as session:
-                url = f"{self.api_base}/healthkit/v1/data/heartrate/detail"
-                params = {
-                    "startTime": start_ts,
-                    "endTime": end_ts,
-                }
+            url = f"{self.api_base}/healthkit/v1/data/heartrate/detail"
+            params = {
+                "startTime": start_ts,
+                "endTime": end_ts,
+            }
+            
+            status, body = await self._authorized_get(url, params)
+            if status != 200:
+                return []
+            
+            result = json_utils.loads(body)
+            # 先过滤无效点，再一次性构建采样列表（单个时间戳异常由外层捕获）
+            points = [
+                (item["timestamp"], item["heartRate"])
+                for item in result.get("data", ())
+                if item.get("timestamp") and item.get("heartRate")
+            ]
+            from_ts = datetime.fromtimestamp
+            source = self._SOURCE
+            return [HeartRateSample(from_ts(ts / 1000), hr, source) for ts, hr in points]
                 
-                async with session.get(url, headers=headers, params=params) as resp:
-                    if resp.status != 200:
-                        return []
-                    
-                    result = await resp.json()
-                    samples = []
-                    
-                    for item in result.get("data", []):
-                        try:
-                            ts = item.get("timestamp", 0)
-                            hr = item.get("heartRate", 0)
-                            if ts and hr:
-                                samples.append(HeartRateSample(
-                                    timestamp=datetime.fromtimestamp(ts / 1000),
-                                    heart_rate=hr,
-                                    source=self.device_type.value
-                                ))
-                        except Exception:
-                            continue
-                    
-                    return samples
-                    
         except Exception as e:
             logger.error(f"华为心率采样获取失败: {e}")
             return []
     
+    async def close(self) -> None:
+        """关闭实例自带的 HTTP 客户端（共享客户端在应用关闭时由 aclose_http_client 释放）"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+    
     # ===== 私有方法 =====
     
+    def _get_client(self) -> httpx.AsyncClient:
+        """
+        获取 HTTP 客户端（未单独指定时使用进程内共享的客户端）
+        
+        安装了 h2 时走 HTTP/2，并行的各项数据请求在同一个连接上多路复用
+        """
+        if self._client is not None:
+            return self._client
+        return _get_http_client()
+    
     def _get_auth_headers(self) -> Dict[str, str]:
-        """获取认证请求头"""
-        return {
-            "Authorization": f"Bearer {self.access_token}",
-            "Content-Type": "application/json",
-        }
+        """获取认证请求头（按 access_token 缓存，Token 变化时重建）"""
+        if self._auth_headers is None or self._auth_headers_token != self.access_token:
+            self._auth_headers = {
+                "Authorization": f"Bearer {self.access_token}",
+                "Content-Type": "application/json",
+            }
+            self._auth_headers_token = self.access_token
+        return self._auth_headers
+    
+    def _account_key(self) -> str:
+        """当前授权账号的缓存键（refresh_token 在 access_token 刷新后仍保持不变）"""
+        token = self.refresh_token or self.access_token or ""
+        return hashlib.sha256(token.encode()).hexdigest()[:32]
     
     def _date_to_timestamp(self, d: date) -> int:
         """日期转毫秒时间戳"""
-        return int(datetime.combine(d, datetime.min.time()).timestamp() * 1000)
+        return _date_to_ts(d)
     
-    async def _fetch_steps(self, target_date: date) -> Dict[str, Any]:
-        """获取步数数据"""
-        try:
-            headers = self._get_auth_headers()
-            start_ts = self._date_to_timestamp(target_date)
-            end_ts = self._date_to_timestamp(target_date + timedelta(days=1))
-            
-            async with aiohttp.ClientSession() as session:
-                url = f"{self.api_base}/healthkit/v1/data/step/daily"
-                params = {"startTime": start_ts, "endTime": end_ts}
-                
-                async with session.get(url, headers=headers, params=params) as resp:
-                    if resp.status != 200:
-                        return {}
-                    
-                    result = await resp.json()
-                    data = result.get("data", [])
-                    
-                    if data:
-                        item = data[0]
-                        return {
-                            "steps": item.get("step", 0),
-                            "distance": item.get("distance", 0),  # 米
-                        }
-                    return {}
-                    
-        except Exception as e:
-            logger.warning(f"华为步数获取失败: {e}")
-            return {}
+    async def _authorized_get(self, url: str, params: Dict[str, Any]) -> Tuple[int, bytes]:
+        """
+        发送带认证的 GET 请求，返回 (状态码, 响应体)
+        
+        遇到 401 时刷新 Token 并重试一次；并发请求同时 401 时只刷新一次
+        """
+        client = self._get_client()
+        for attempt in range(2):
+            token = self.access_token
+            resp = await client.get(url, headers=self._get_auth_headers(), params=params)
+            status, body = resp.status_code, resp.content
+            if status != 401 or attempt or not await self._refresh_after_unauthorized(token):
+                break
+        return status, body
     
-    async def _fetch_heart_rate(self, target_date: date) -> Dict[str, Any]:
-        """获取心率数据"""
-        try:
-            headers = self._get_auth_headers()
-            start_ts = self._date_to_timestamp(target_date)
-            end_ts = self._date_to_timestamp(target_date + timedelta(days=1))
-            
-            async with aiohttp.ClientSession() as session:
-                url = f"{self.api_base}/healthkit/v1/data/heartrate/daily"
-                params = {"startTime": start_ts, "endTime": end_ts}
-                
-                async with session.get(url, headers=headers, params=params) as resp:
-                    if resp.status != 200:
-                        return {}
-                    
-                    result = await resp.json()
-                    data = result.get("data", [])
-                    
-                    if data:
-                        item = data[0]
-                        return {
-                            "resting": item.get("restingHeartRate"),
-                            "avg": item.get("avgHeartRate"),
-                            "max": item.get("maxHeartRate"),
-                            "min": item.get("minHeartRate"),
-                        }
-                    return {}
-                    
-        except Exception as e:
-            logger.warning(f"华为心率获取失败: {e}")
-            return {}
+    async def _refresh_after_unauthorized(self, stale_token: Optional[str]) -> bool:
+        """收到 401 后刷新 Token；若其他请求已完成刷新则直接重试"""
+        async with self._refresh_lock:
+            if self.access_token != stale_token:
+                return True
+            return await self._refresh_access_token()
     
-    async def _fetch_sleep(self, target_date: date) -> Dict[str, Any]:
-        """获取睡眠数据"""
-        try:
-            headers = self._get_auth_headers()
-            # 睡眠数据查询前一天晚上到当天早上
-            start_ts = self._date_to_timestamp(target_date - timedelta(days=1))
-            end_ts = self._date_to_timestamp(target_date + timedelta(days=1))
+    async def _fetch(
+        self,
+        kind: str,
+        start_ts: int,
+        end_ts: int,
+        start_date: date,
+        end_date: date
+    ) -> Optional[Dict[date, Dict[str, Any]]]:
+        """
+        获取某一类日汇总数据
+        
+        Args:
+            kind: _ENDPOINTS 中的数据类型
+            start_ts: 开始时间（毫秒时间戳）
+            end_ts: 结束时间（毫秒时间戳）
+            start_date: 查询的首日
+            end_date: 查询的末日
             
-            async with aiohttp.ClientSession() as session:
-                url = f"{self.api_base}/healthkit/v1/data/sleep/daily"
-                params = {"startTime": start_ts, "endTime": end_ts}
-                
-                async with session.get(url, headers=headers, params=params) as resp:
-                    if resp.status != 200:
-                        return {}
-                    
-                    result = await resp.json()
-                    data = result.get("data", [])
-                    
-                    if data:
-                        item = data[0]
-                        # 华为返回的是秒，转换为分钟
-                        return {
-                            "total_minutes": item.get("totalSleepTime", 0) // 60,
-                            "deep_minutes": item.get("deepSleepTime", 0) // 60,
-                            "light_minutes": item.get("lightSleepTime", 0) // 60,
-                            "rem_minutes": item.get("remSleepTime", 0) // 60,
-                            "awake_minutes": item.get("awakeTime", 0) // 60,
-                        }
-                    return {}
-                    
-        except Exception as e:
-            logger.warning(f"华为睡眠获取失败: {e}")
-            return {}
-    
-    async def _fetch_calories(self, target_date: date) -> Dict[str, Any]:
-        """获取卡路里数据"""
+        Returns:
+            {日期: 按字段映射重命名后的数据}，无数据时返回空字典，请求失败时返回 None
+        """
+        path, field_map, default = self._ENDPOINTS[kind]
         try:
-            headers = self._get_auth_headers()
-            start_ts = self._date_to_timestamp(target_date)
-            end_ts = self._date_to_timestamp(target_date + timedelta(days=1))
+            url = f"{self.api_base}/healthkit/v1/data/{path}"
+            params = {"startTime": start_ts, "endTime": end_ts}
             
-            async with aiohttp.ClientSession() as session:
-                url = f"{self.api_base}/healthkit/v1/data/calories/daily"
-                params = {"startTime": start_ts, "endTime": end_ts}
-                
-                async with session.get(url, headers=headers, params=params) as resp:
-                    if resp.status != 200:
-                        return {}
-                    
-                    result = await resp.json()
-                    data = result.get("data", [])
-                    
-                    if data:
-                        item = data[0]
-                        return {
-                            "total": item.get("totalCalories", 0),
-                            "active": item.get("activeCalories", 0),
-                        }
-                    return {}
-                    
-        except Exception as e:
-            logger.warning(f"华为卡路里获取失败: {e}")
-            return {}
-    
-    async def _fetch_stress(self, target_date: date) -> Dict[str, Any]:
-        """获取压力数据"""
-        try:
-            headers = self._get_auth_headers()
-            start_ts = self._date_to_timestamp(target_date)
-            end_ts = self._date_to_timestamp(target_date + timedelta(days=1))
+            status, body = await self._authorized_get(url, params)
+            if status != 200:
+                return None
             
-            async with aiohttp.ClientSession() as session:
-                url = f"{self.api_base}/healthkit/v1/data/stress/daily"
-                params = {"startTime": start_ts, "endTime": end_ts}
-                
-                async with session.get(url, headers=headers, params=params) as resp:
-                    if resp.status != 200:
-                        return {}
-                    
-                    result = await resp.json()
-                    data = result.get("data", [])
-                    
-                    if data:
-                        item = data[0]
-                        return {
-                            "avg_stress": item.get("avgStress"),
-                            "max_stress": item.get("maxStress"),
-                        }
-                    return {}
-                    
-        except Exception as e:
-            logger.warning(f"华为压力获取失败: {e}")
-            return {}
-    
-    async def _fetch_spo2(self, target_date: date) -> Dict[str, Any]:
-        """获取血氧数据"""
-        try:
-            headers = self._get_auth_headers()
-            start_ts = self._date_to_timestamp(target_date)
-            end_ts = self._date_to_timestamp(target_date + timedelta(days=1))
+            data = json_utils.loads(body).get("data")
+            if not data:
+                return {}
+            
+            by_date: Dict[date, Dict[str, Any]] = {}
+            # 睡眠归到醒来的那天（与按 [目标日-1, 目标日+1] 查询的单日同步一致）
+            is_sleep = kind == "sleep"
+            time_key = "endTime" if is_sleep else "startTime"
+            pairs = tuple(field_map.items())
+            for item in data:
+                day = _item_date(item, time_key, prefer_time=is_sleep)
+                if day is None and start_date == end_date:
+                    # 无日期字段时，单日查询的结果归属于该日
+                    day = start_date
+                if day is None or day in by_date:
+                    continue
+                get = item.get
+                by_date[day] = {out_key: get(in_key, default) for in_key, out_key in pairs}
+            return by_date
             
-            async with aiohttp.ClientSession() as session:
-                url = f"{self.api_base}/healthkit/v1/data/oxygen/daily"
-                params = {"startTime": start_ts, "endTime": end_ts}
-                
-                async with session.get(url, headers=headers, params=params) as resp:
-                    if resp.status != 200:
-                        return {}
-                    
-                    result = await resp.json()
-                    data = result.get("data", [])
-                    
-                    if data:
-                        item = data[0]
-                        return {
-                            "avg": item.get("avgOxygen"),
-                            "min": item.get("minOxygen"),
-                            "max": item.get("maxOxygen"),
-                        }
-                    return {}
-                    
         except Exception as e:
-            logger.warning(f"华为血氧获取失败: {e}")
-            return {}
+            logger.warning(f"华为{kind}数据获取失败: {e}")
+            return None
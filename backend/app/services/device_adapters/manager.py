@@ -7,6 +7,7 @@
 - 数据同步
 """
 
+import asyncio
 import logging
 from datetime import date, datetime, timedelta
 from typing import Dict, List, Type, Optional, Any
@@ -167,6 +168,7 @@ class DeviceManager:
                 "message": f"用户未绑定 {device_type} 设备"
             }
         
+        adapter = None
         try:
             # 创建适配器
             adapter = cls.create_adapter_from_credential(credential)
@@ -176,15 +178,23 @@ class DeviceManager:
             failed = 0
             today = date.today()
             
-            for i in range(days):
-                target_date = today - timedelta(days=i)
+            start_date = today - timedelta(days=days - 1)
+            
+            # 整个区间一次获取（支持区间查询的设备只需少量请求）
+            try:
+                daily_data, failed_dates = await adapter.fetch_range(start_date, today)
+                failed = len(failed_dates)
+            except Exception as e:
+                logger.warning(f"获取 {start_date} ~ {today} 数据失败: {e}")
+                daily_data = []
+                failed = days
+            
+            for data in daily_data:
                 try:
-                    data = await adapter.fetch_daily_data(target_date)
-                    if data:
-                        cls._save_health_data(db, user_id, data)
-                        synced += 1
+                    cls._save_health_data(db, user_id, data)
+                    synced += 1
                 except Exception as e:
-                    logger.warning(f"同步 {target_date} 失败: {e}")
+                    logger.warning(f"同步 {data.record_date} 失败: {e}")
                     failed += 1
             
             # 更新同步时间
@@ -207,6 +217,9 @@ class DeviceManager:
                 "success": False,
                 "message": f"同步失败: {str(e)}"
             }
+        finally:
+            if adapter is not None:
+                await adapter.close()
     
     @classmethod
     async def sync_all_devices(
@@ -232,11 +245,20 @@ class DeviceManager:
             DeviceCredential.sync_enabled == True
         ).all()
         
+        # 各设备并发同步：耗时主要在网络请求上，数据库写入发生在两次 await
+        # 之间，单线程事件循环下不会与其他设备的写入交错，可共用同一会话
+        outcomes = await asyncio.gather(
+            *(cls.sync_device_data(db, user_id, cred.device_type, days) for cred in credentials),
+            return_exceptions=True,
+        )
+        
         results = []
-        for cred in credentials:
-            result = await cls.sync_device_data(db, user_id, cred.device_type, days)
-            result["device"] = cred.device_type
-            results.append(result)
+        for cred, outcome in zip(credentials, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.error(f"设备同步异常 ({cred.device_type}): {outcome}")
+                outcome = {"success": False, "message": f"同步失败: {outcome}"}
+            outcome["device"] = cred.device_type
+            results.append(outcome)
         
         return results
     
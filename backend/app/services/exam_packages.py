@@ -2,8 +2,16 @@
 
 用于标准化体检项目的分类和识别
 """
+from collections import defaultdict
+from functools import lru_cache
 from typing import Dict, List, Any
 
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
 # ========== 体检套餐定义 ==========
 EXAM_PACKAGES: Dict[str, Dict[str, Any]] = {
     # 生化全套
@@ -308,9 +316,41 @@ ITEM_LABELS: Dict[str, str] = {
 }
 
 
+# 匹配用的映射（键统一小写），模糊匹配时按键长度降序查找，最长的名称优先命中，
+# 避免 "CD3+T细胞" 先被 "CD3" 匹配
+_MAPPING_LOWER: Dict[str, str] = {key.lower(): code for key, code in ITEM_NAME_MAPPING.items()}
+_MAPPING_KEYS = tuple(sorted(_MAPPING_LOWER, key=len, reverse=True))
+
+
+def _build_automaton():
+    """
+    用所有标准名称构建 Aho-Corasick 自动机（需安装 pyahocorasick）
+    
+    一次扫描即可找出名称中包含的全部标准名称；值为键在 _MAPPING_KEYS 中的位置，
+    位置最小的即最长（长度相同时按映射表顺序）的匹配，与逐个查找的结果一致
+    """
+    automaton = ahocorasick.Automaton()
+    for index, key in enumerate(_MAPPING_KEYS):
+        automaton.add_word(key, index)
+    automaton.make_automaton()
+    return automaton
+
+
+_AUTOMATON = _build_automaton() if AHOCORASICK_AVAILABLE else None
+
+
+def _longest_contained_key(lower_name: str):
+    """名称中包含的最长标准名称，没有时返回 None"""
+    if _AUTOMATON is not None:
+        best = min((index for _, index in _AUTOMATON.iter(lower_name)), default=None)
+        return None if best is None else _MAPPING_KEYS[best]
+    return next((key for key in _MAPPING_KEYS if key in lower_name), None)
+
+
+@lru_cache(maxsize=4096)
 def normalize_item_name(name: str) -> tuple[str, str]:
     """
-    标准化检测项目名称
+    标准化检测项目名称（忽略大小写，结果缓存，同一报告/多份报告中的重复名称直接命中）
     
     Args:
         name: 原始项目名称
@@ -320,21 +360,24 @@ def normalize_item_name(name: str) -> tuple[str, str]:
     """
     # 清理名称
     clean_name = name.strip()
+    if not clean_name:
+        return "", clean_name
+    lower_name = clean_name.lower()
     
     # 尝试直接匹配
-    if clean_name in ITEM_NAME_MAPPING:
-        code = ITEM_NAME_MAPPING[clean_name]
-        label = ITEM_LABELS.get(code, clean_name)
-        return code, label
+    code = _MAPPING_LOWER.get(lower_name)
     
-    # 尝试模糊匹配（包含关系）
-    for key, code in ITEM_NAME_MAPPING.items():
-        if key in clean_name or clean_name in key:
-            label = ITEM_LABELS.get(code, clean_name)
-            return code, label
+    # 尝试模糊匹配：先找名称中包含的最长标准名称，再找包含该名称的标准名称
+    if code is None:
+        key = _longest_contained_key(lower_name)
+        code = _MAPPING_LOWER[key] if key is not None else None
+    if code is None:
+        code = next((mapped for key, mapped in _MAPPING_LOWER.items() if lower_name in key), None)
     
     # 无法匹配，返回原始名称
-    return "", clean_name
+    if code is None:
+        return "", clean_name
+    return code, ITEM_LABELS.get(code, clean_name)
 
 
 def get_package_items(package_key: str) -> List[Dict[str, str]]:
@@ -363,6 +406,24 @@ def get_package_items(package_key: str) -> List[Dict[str, str]]:
     return items
 
 
+# 套餐识别用的索引：套餐项目集合、套餐顺序，以及 项目 -> 包含该项目的套餐
+_PKG_ITEM_SETS: Dict[str, frozenset] = {
+    pkg_key: frozenset(pkg_info["items"]) for pkg_key, pkg_info in EXAM_PACKAGES.items()
+}
+_PKG_ORDER: Dict[str, int] = {pkg_key: index for index, pkg_key in enumerate(EXAM_PACKAGES)}
+
+
+def _build_item_index() -> Dict[str, List[str]]:
+    index: Dict[str, List[str]] = defaultdict(list)
+    for pkg_key, pkg_items in _PKG_ITEM_SETS.items():
+        for item in pkg_items:
+            index[item].append(pkg_key)
+    return dict(index)
+
+
+_ITEM_TO_PKGS = _build_item_index()
+
+
 def identify_package(items: List[str]) -> List[str]:
     """
     根据项目列表识别可能的套餐
@@ -373,14 +434,15 @@ def identify_package(items: List[str]) -> List[str]:
     Returns:
         匹配的套餐代码列表
     """
-    matched_packages = []
     item_set = set(items)
+    # 只检查与列表至少有一个共同项目的套餐
+    candidates = {pkg_key for item in item_set for pkg_key in _ITEM_TO_PKGS.get(item, ())}
     
-    for pkg_key, pkg_info in EXAM_PACKAGES.items():
-        pkg_items = set(pkg_info["items"])
+    matched_packages = []
+    for pkg_key in sorted(candidates, key=_PKG_ORDER.__getitem__):
+        pkg_items = _PKG_ITEM_SETS[pkg_key]
         # 如果套餐中的项目有50%以上在列表中，认为匹配
-        overlap = len(pkg_items & item_set)
-        if overlap >= len(pkg_items) * 0.5:
+        if len(pkg_items & item_set) * 2 >= len(pkg_items):
             matched_packages.append(pkg_key)
     
     return matched_packages
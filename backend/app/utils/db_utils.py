@@ -0,0 +1,59 @@
+"""数据库工具：INSERT ... ON CONFLICT（upsert）的可用性检测"""
+import threading
+import weakref
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import Table, inspect
+from sqlalchemy.orm import Session
+
+# 引擎 -> {(表名, 索引列): 是否存在唯一索引}
+# create_all 不会给已存在的表补建索引，旧库在执行 scripts/ 下的建索引脚本之前
+# 没有 upsert 所需的唯一索引，此时 ON CONFLICT 语句会直接报错
+_unique_index_cache: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_unique_index_lock = threading.Lock()
+
+
+def _has_unique_index(db: Session, table: Table, columns: Sequence[str]) -> bool:
+    """表上是否存在恰好覆盖这些列的唯一索引或唯一约束"""
+    inspector = inspect(db.connection())
+    wanted = set(columns)
+    for index in inspector.get_indexes(table.name, schema=table.schema):
+        if index.get("unique") and set(index["column_names"]) == wanted:
+            return True
+    return any(
+        set(constraint["column_names"]) == wanted
+        for constraint in inspector.get_unique_constraints(table.name, schema=table.schema)
+    )
+
+
+def on_conflict_insert(db: Session, table: Table, index_columns: Sequence[str]) -> Optional[Callable]:
+    """
+    返回支持 ON CONFLICT 的方言 insert 构造函数
+
+    数据库方言不支持、或表上缺少 index_columns 对应的唯一索引时返回None，由调用方回退到
+    不依赖唯一索引的写法。索引检查结果按引擎缓存，补建索引后重启进程即改用 upsert
+    """
+    bind = db.get_bind()
+    dialect = bind.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+
+    key: Tuple[str, Tuple[str, ...]] = (table.name, tuple(index_columns))
+    with _unique_index_lock:
+        known: Dict[tuple, bool] = _unique_index_cache.setdefault(bind.engine, {})
+        found = known.get(key)
+    if found is None:
+        found = _has_unique_index(db, table, index_columns)
+        with _unique_index_lock:
+            known[key] = found
+    return dialect_insert if found else None
+
+
+def clear_unique_index_cache():
+    """清空唯一索引检查结果（建索引脚本执行后、或测试中重建表结构后使用）"""
+    with _unique_index_lock:
+        _unique_index_cache.clear()
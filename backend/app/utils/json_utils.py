@@ -0,0 +1,35 @@
+"""JSON工具模块 - 优先使用 orjson（可选依赖），未安装时回退到标准库 json"""
+import json
+from typing import Any
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def dumps(obj: Any, indent: bool = False, sort_keys: bool = False) -> str:
+    """
+    序列化为JSON字符串
+
+    无法直接序列化的对象（datetime、Decimal 等）按 str() 处理，与 json.dumps(default=str) 一致；
+    sort_keys=True 时输出与字典插入顺序无关，可用于计算内容指纹
+    """
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=str, option=option).decode()
+    return json.dumps(
+        obj, indent=2 if indent else None, default=str, ensure_ascii=False, sort_keys=sort_keys
+    )
+
+
+def loads(data: Any) -> Any:
+    """反序列化JSON（支持 str / bytes）"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
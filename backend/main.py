@@ -4,6 +4,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.database import engine, Base
 from app.api.main import api_router
 from app.scheduler import start_scheduler
+from app.services.data_collection.garmin_service import aclose_http_client
+from app.services.device_adapters.huawei import aclose_http_client as aclose_huawei_http_client
 import logging
 
 # 设置日志
@@ -30,6 +32,12 @@ async def startup_event():
     start_scheduler(app, interval_minutes=120)
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await aclose_http_client()
+    await aclose_huawei_http_client()
+
+
 # 配置CORS
 app.add_middleware(
     CORSMiddleware,
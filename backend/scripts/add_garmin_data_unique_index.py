@@ -0,0 +1,49 @@
+"""为 Garmin 每日数据表添加 (user_id, record_date) 唯一索引"""
+import sys
+import os
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.database import engine, SessionLocal
+
+
+def add_garmin_data_unique_index():
+    """清理重复记录后创建唯一索引（Garmin数据保存的 upsert 依赖该索引）"""
+    db = SessionLocal()
+
+    try:
+        # 同一用户同一天只保留最新的一条
+        result = db.execute(text("""
+            DELETE FROM garmin_data
+            WHERE id NOT IN (
+                SELECT MAX(id) FROM garmin_data
+                GROUP BY user_id, record_date
+            )
+        """))
+        if result.rowcount:
+            print(f"删除了 {result.rowcount} 条重复的Garmin每日数据")
+
+        db.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_garmin_user_date "
+            "ON garmin_data (user_id, record_date)"
+        ))
+        db.commit()
+        print("✅ uq_garmin_user_date 索引已就绪")
+
+    except Exception as e:
+        print(f"❌ 错误: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("添加Garmin每日数据唯一索引")
+    print("=" * 50)
+    add_garmin_data_unique_index()
+    print("=" * 50)
+    print("完成!")
@@ -0,0 +1,49 @@
+"""为心率采样表添加 (user_id, record_date, sample_time) 唯一索引"""
+import sys
+import os
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.database import engine, SessionLocal
+
+
+def add_hr_sample_unique_index():
+    """清理重复采样点后创建唯一索引（心率同步的 upsert 依赖该索引）"""
+    db = SessionLocal()
+
+    try:
+        # 同一用户同一天同一时间只保留最新的一条
+        result = db.execute(text("""
+            DELETE FROM heart_rate_samples
+            WHERE id NOT IN (
+                SELECT MAX(id) FROM heart_rate_samples
+                GROUP BY user_id, record_date, sample_time
+            )
+        """))
+        if result.rowcount:
+            print(f"删除了 {result.rowcount} 条重复的心率采样")
+
+        db.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_hr_user_date_time "
+            "ON heart_rate_samples (user_id, record_date, sample_time)"
+        ))
+        db.commit()
+        print("✅ uq_hr_user_date_time 索引已就绪")
+
+    except Exception as e:
+        print(f"❌ 错误: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("添加心率采样唯一索引")
+    print("=" * 50)
+    add_hr_sample_unique_index()
+    print("=" * 50)
+    print("完成!")
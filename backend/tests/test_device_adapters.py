@@ -0,0 +1,325 @@
+"""设备适配器测试"""
+import asyncio
+import httpx
+import pytest
+from datetime import date, time
+
+from app.config import settings
+from app.services.device_adapters import apple, huawei
+from app.services.device_adapters.apple import AppleHealthAdapter
+from app.services.device_adapters.huawei import HuaweiHealthAdapter
+
+
+SAMPLE_HEALTH_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<HealthData locale="zh_CN">
+ <ExportDate value="2024-01-03 10:00:00 +0800"/>
+ <Record type="HKQuantityTypeIdentifierStepCount" startDate="2024-01-01 07:00:00 +0800" endDate="2024-01-01 07:10:00 +0800" value="1200"/>
+ <Record type="HKQuantityTypeIdentifierStepCount" startDate="2024-01-01 12:00:00 +0800" endDate="2024-01-01 12:10:00 +0800" value="3000"/>
+ <Record type="HKQuantityTypeIdentifierHeartRate" startDate="2024-01-01 06:00:00 +0800" endDate="2024-01-01 06:00:00 +0800" value="55">
+  <MetadataEntry key="HKMetadataKeyHeartRateMotionContext" value="1"/>
+ </Record>
+ <Record type="HKQuantityTypeIdentifierHeartRate" startDate="2024-01-01 14:00:00 +0800" endDate="2024-01-01 14:00:00 +0800" value="90"/>
+ <Record type="HKQuantityTypeIdentifierDistanceWalkingRunning" startDate="2024-01-01 14:00:00 +0800" endDate="2024-01-01 14:10:00 +0800" value="1.5"/>
+ <Record type="HKCategoryTypeIdentifierSleepAnalysis" startDate="2024-01-02 00:00:00 +0800" endDate="2024-01-02 07:30:00 +0800" value="ASLEEP"/>
+ <Record type="HKQuantityTypeIdentifierOxygenSaturation" startDate="2024-01-02 03:00:00 +0800" endDate="2024-01-02 03:00:00 +0800" value="0.97"/>
+ <Record type="HKQuantityTypeIdentifierOxygenSaturation" startDate="2024-01-02 04:00:00 +0800" endDate="2024-01-02 04:00:00 +0800" value="0.95"/>
+ <Record type="HKQuantityTypeIdentifierHeartRateVariabilitySDNN" startDate="2024-01-02 03:00:00 +0800" endDate="2024-01-02 03:00:00 +0800" value="0.045"/>
+ <Correlation type="HKCorrelationTypeIdentifierBloodPressure" startDate="2024-01-02 08:00:00 +0800" endDate="2024-01-02 08:00:00 +0800">
+  <Record type="HKQuantityTypeIdentifierStepCount" startDate="2024-01-02 08:00:00 +0800" endDate="2024-01-02 08:00:00 +0800" value="10"/>
+ </Correlation>
+ <Record type="HKQuantityTypeIdentifierStepCount" startDate="2024-01-02 09:00:00 +0800" endDate="2024-01-02 09:10:00 +0800" value="abc"/>
+ <Workout workoutActivityType="1" sourceName="Watch" startDate="2024-01-02 18:00:00 +0800" endDate="2024-01-02 18:30:00 +0800">
+  <MetadataEntry key="HKTotalEnergyBurned" value="250"/>
+  <MetadataEntry key="HKTotalDistance" value="5.2"/>
+ </Workout>
+</HealthData>
+"""
+
+
+@pytest.fixture(autouse=True)
+def _clear_apple_parse_cache():
+    apple.clear_parse_cache()
+    yield
+    apple.clear_parse_cache()
+
+
+def test_parse_health_xml_aggregates_records_and_workouts():
+    """测试 Apple Health 导出解析：按日累加、统计心率/血氧，嵌套记录和运动元数据都能读到"""
+    data = AppleHealthAdapter.parse_health_xml(SAMPLE_HEALTH_XML)
+
+    day1 = data["2024-01-01"]
+    assert day1["steps"] == 4200
+    assert day1["distance_meters"] == 1500.0
+    assert (day1["avg_heart_rate"], day1["max_heart_rate"], day1["min_heart_rate"]) == (72, 90, 55)
+    assert day1["resting_heart_rate"] == 55
+    assert type(day1["max_heart_rate"]) is int
+    assert not any(key.endswith("_values") for key in day1)
+
+    day2 = data["2024-01-02"]
+    assert day2["steps"] == 10
+    assert day2["sleep"][0]["duration_minutes"] == 450
+    assert round(day2["spo2_avg"], 1) == 96.0 and round(day2["spo2_min"], 1) == 95.0
+    assert round(day2["hrv"], 1) == 45.0
+    assert day2["workouts"] == [{
+        "id": "Watch",
+        "type": "running",
+        "start": "2024-01-02 18:00:00 +0800",
+        "end": "2024-01-02 18:30:00 +0800",
+        "duration": 1800,
+        "calories": 250.0,
+        "distance": 5200.0,
+    }]
+
+
+def test_parse_health_xml_accepts_path_and_file(tmp_path):
+    """测试可传入文件路径或二进制文件对象，结果与传入内容一致"""
+    path = tmp_path / "export.xml"
+    path.write_text(SAMPLE_HEALTH_XML, encoding="utf-8")
+    expected = AppleHealthAdapter.parse_health_xml(SAMPLE_HEALTH_XML)
+
+    apple.clear_parse_cache()
+    assert AppleHealthAdapter.parse_health_xml(str(path)) == expected
+    apple.clear_parse_cache()
+    with open(path, "rb") as f:
+        assert AppleHealthAdapter.parse_health_xml(f) == expected
+
+
+def test_parse_health_xml_parallel_matches_sequential(tmp_path, monkeypatch):
+    """测试多进程分片解析与顺序解析结果一致（同一天的数据跨分片合并）"""
+    monkeypatch.setattr(apple, "_PARALLEL_MIN_BYTES", 0)
+    path = tmp_path / "export.xml"
+    path.write_text(SAMPLE_HEALTH_XML, encoding="utf-8")
+    expected = AppleHealthAdapter.parse_health_xml(SAMPLE_HEALTH_XML)
+
+    assert len(apple._shard_ranges(path, 3)) == 3
+    apple.clear_parse_cache()
+    assert AppleHealthAdapter.parse_health_xml_parallel(path, workers=3) == expected
+
+
+def test_parse_health_xml_rejects_invalid_xml():
+    with pytest.raises(ValueError):
+        AppleHealthAdapter.parse_health_xml("<HealthData><Record></HealthData>")
+
+
+def test_parse_health_xml_reuses_result_for_same_content(monkeypatch):
+    """测试同一内容第二次解析直接命中缓存，且调用方修改返回值不影响缓存"""
+    first = AppleHealthAdapter.parse_health_xml(SAMPLE_HEALTH_XML)
+    first["2024-01-01"]["steps"] = 0
+
+    def fail_parse(stream):
+        raise AssertionError("不应重新解析")
+
+    monkeypatch.setattr(apple, "_parse_stream", fail_parse)
+    second = AppleHealthAdapter.parse_health_xml(SAMPLE_HEALTH_XML.encode("utf-8"))
+    assert second["2024-01-01"]["steps"] == 4200
+
+
+def test_parse_health_xml_disk_cache(tmp_path, monkeypatch):
+    """测试配置了磁盘缓存目录时，内存缓存清空后仍可从磁盘读取"""
+    monkeypatch.setattr(settings, "apple_health_cache_dir", str(tmp_path))
+    expected = AppleHealthAdapter.parse_health_xml(SAMPLE_HEALTH_XML)
+    assert len(list(tmp_path.glob("*.pkl"))) == 1
+
+    apple.clear_parse_cache()
+    monkeypatch.setattr(apple, "_parse_stream", lambda stream: pytest.fail("不应重新解析"))
+    assert AppleHealthAdapter.parse_health_xml(SAMPLE_HEALTH_XML) == expected
+
+    apple.clear_parse_cache(disk=True)
+    assert not list(tmp_path.glob("*.pkl"))
+
+
+async def test_apple_adapter_fetch_daily_data_from_imported():
+    adapter = AppleHealthAdapter(imported_data=AppleHealthAdapter.parse_health_xml(SAMPLE_HEALTH_XML))
+    result = await adapter.fetch_daily_data(date(2024, 1, 2))
+    assert result.total_sleep_minutes == 450
+    assert (result.deep_sleep_minutes, result.rem_sleep_minutes, result.light_sleep_minutes) == (76, 90, 284)
+    assert result.sleep_score == 90
+    assert (result.sleep_start_time, result.sleep_end_time) == (time(0, 0), time(7, 30))
+    assert await adapter.fetch_daily_data(date(2024, 1, 5)) is None
+
+
+async def test_apple_adapter_heart_rate_samples_columnar_and_legacy():
+    """测试心率采样按列存储，且兼容旧版导入保存的逐条字典格式"""
+    data = AppleHealthAdapter.parse_health_xml(SAMPLE_HEALTH_XML)
+    assert data["2024-01-01"]["heart_rate_samples"] == {
+        "timestamps": ["2024-01-01 06:00:00 +0800", "2024-01-01 14:00:00 +0800"],
+        "values": [55, 90],
+    }
+    samples = await AppleHealthAdapter(imported_data=data).fetch_heart_rate_samples(date(2024, 1, 1))
+    assert [(s.timestamp.hour, s.heart_rate) for s in samples] == [(6, 55), (14, 90)]
+
+    legacy = {"2024-01-01": {"heart_rate_samples": [{"timestamp": "2024-01-01T06:00:00+08:00", "value": 55}]}}
+    samples = await AppleHealthAdapter(imported_data=legacy).fetch_heart_rate_samples(date(2024, 1, 1))
+    assert [(s.timestamp.hour, s.heart_rate) for s in samples] == [(6, 55)]
+
+
+async def test_apple_adapter_fetch_range_skips_days_without_data():
+    """测试默认的区间获取逐日调用 fetch_daily_data，并跳过无数据的日期"""
+    adapter = AppleHealthAdapter(imported_data=AppleHealthAdapter.parse_health_xml(SAMPLE_HEALTH_XML))
+    results, failed = await adapter.fetch_range(date(2023, 12, 31), date(2024, 1, 3))
+    assert [r.record_date for r in results] == [date(2024, 1, 1), date(2024, 1, 2)]
+    assert failed == []
+
+
+def _huawei_adapter(handler, **kwargs):
+    """创建请求走 MockTransport 的华为适配器"""
+    huawei.clear_daily_cache()
+    adapter = HuaweiHealthAdapter(client_id="cid", client_secret="secret", **kwargs)
+    adapter._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return adapter
+
+
+async def test_huawei_fetch_range_one_request_per_metric():
+    """测试区间同步每类数据只请求一次，并按日期拆分到每一天"""
+    requests = []
+
+    def handler(request):
+        requests.append(request.url.path)
+        if request.url.path.endswith("/step/daily"):
+            return httpx.Response(200, json={"data": [
+                {"date": 20240101, "step": 100, "distance": 80},
+                {"date": 20240102, "step": 200, "distance": 160},
+            ]})
+        if request.url.path.endswith("/sleep/daily"):
+            return httpx.Response(200, json={"data": [{"date": "2024-01-02", "totalSleepTime": 3630.5}]})
+        return httpx.Response(200, json={"data": []})
+
+    adapter = _huawei_adapter(handler, access_token="token-a")
+    results, failed = await adapter.fetch_range(date(2024, 1, 1), date(2024, 1, 3))
+    await adapter.close()
+
+    assert len(requests) == 6
+    assert failed == []
+    assert [(r.record_date, r.steps, r.total_sleep_minutes) for r in results] == [
+        (date(2024, 1, 1), 100, None),
+        (date(2024, 1, 2), 200, 60),
+        (date(2024, 1, 3), None, None),
+    ]
+    # 睡眠时长在原始数据中保留秒，规范化时取整为分钟
+    assert results[1].raw_data["sleep"]["total_seconds"] == 3630.5
+    assert type(results[1].total_sleep_minutes) is int
+
+
+async def test_huawei_sleep_belongs_to_wake_up_day():
+    """测试睡眠按醒来时间（endTime）归属日期，即使 date 字段是入睡的前一天"""
+    from datetime import datetime
+
+    end_ms = int(datetime(2024, 1, 2, 7, 0).timestamp() * 1000)
+
+    def handler(request):
+        if request.url.path.endswith("/sleep/daily"):
+            return httpx.Response(200, json={"data": [
+                {"date": 20240101, "endTime": end_ms, "totalSleepTime": 27000},
+            ]})
+        return httpx.Response(200, json={"data": []})
+
+    adapter = _huawei_adapter(handler, access_token="token-a")
+    data = await adapter.fetch_daily_data(date(2024, 1, 2))
+    results, _ = await adapter.fetch_range(date(2024, 1, 1), date(2024, 1, 2))
+    await adapter.close()
+
+    assert data.total_sleep_minutes == 450
+    assert [r.total_sleep_minutes for r in results] == [None, 450]
+
+
+async def test_huawei_refreshes_token_once_on_401():
+    """测试 401 时刷新 Token 后只重试一次"""
+    calls = []
+
+    def handler(request):
+        if request.method == "POST":
+            calls.append("refresh")
+            return httpx.Response(200, json={"access_token": "fresh"})
+        calls.append(request.headers["Authorization"])
+        if request.headers["Authorization"] == "Bearer fresh":
+            return httpx.Response(200, json={"data": []})
+        return httpx.Response(401, json={})
+
+    adapter = _huawei_adapter(handler, access_token="stale", refresh_token="refresh-token")
+    assert (await adapter.test_connection())["success"] is True
+    assert calls == ["Bearer stale", "refresh", "Bearer fresh"]
+
+    adapter.access_token = "revoked"
+    adapter._client = httpx.AsyncClient(transport=httpx.MockTransport(
+        lambda request: httpx.Response(401 if request.method == "GET" else 200, json={"access_token": "revoked"})
+    ))
+    result = await adapter.test_connection()
+    await adapter.close()
+    assert result == {"success": False, "message": "Token 已过期，请重新授权"}
+
+
+async def test_huawei_adapters_share_http_client():
+    """测试不同适配器实例共用进程内的 HTTP 客户端，关闭后重新创建"""
+    first = HuaweiHealthAdapter(access_token="a")._get_client()
+    assert HuaweiHealthAdapter(access_token="b")._get_client() is first
+
+    await huawei.aclose_http_client()
+    assert first.is_closed
+    assert HuaweiHealthAdapter(access_token="a")._get_client() is not first
+    await huawei.aclose_http_client()
+
+
+async def test_huawei_connection_error_message():
+    """测试连接失败时取 JSON 错误信息，HTML 错误页只截取开头而不解析"""
+    adapter = _huawei_adapter(lambda request: httpx.Response(403, json={"message": "scope denied"}), access_token="t")
+    assert (await adapter.test_connection())["message"] == "连接失败(403): scope denied"
+    await adapter.close()
+
+    page = "<html>" + "x" * 5000 + "</html>"
+    adapter = _huawei_adapter(lambda request: httpx.Response(502, text=page), access_token="t")
+    result = await adapter.test_connection()
+    await adapter.close()
+    assert result["success"] is False
+    assert result["message"] == f"连接失败(502): {page[:200]}"
+
+
+async def test_fetch_range_default_runs_days_concurrently(monkeypatch):
+    """测试默认区间获取并发请求各天（不超过并发上限），失败的日期单独返回"""
+    in_flight = []
+    peak = []
+
+    async def fake_fetch(target_date):
+        in_flight.append(target_date)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0)
+        in_flight.remove(target_date)
+        if target_date.day == 2:
+            raise RuntimeError("boom")
+        return await AppleHealthAdapter.fetch_daily_data(adapter, target_date)
+
+    adapter = AppleHealthAdapter(imported_data=AppleHealthAdapter.parse_health_xml(SAMPLE_HEALTH_XML))
+    monkeypatch.setattr(adapter, "fetch_daily_data", fake_fetch)
+    monkeypatch.setattr(adapter, "FETCH_CONCURRENCY", 2)
+
+    results, failed = await adapter.fetch_range(date(2023, 12, 31), date(2024, 1, 3))
+    assert [r.record_date for r in results] == [date(2024, 1, 1)]
+    assert failed == [date(2024, 1, 2)]
+    assert max(peak) == 2
+
+
+async def test_sync_all_devices_runs_devices_concurrently(monkeypatch):
+    """测试多设备并发同步，单个设备异常不影响其他设备的结果"""
+    from types import SimpleNamespace
+    from app.services.device_adapters.manager import DeviceManager
+
+    credentials = [SimpleNamespace(device_type="garmin"), SimpleNamespace(device_type="huawei")]
+    query = SimpleNamespace(filter=lambda *args: SimpleNamespace(all=lambda: credentials))
+    db = SimpleNamespace(query=lambda model: query)
+    started = []
+
+    async def fake_sync(db, user_id, device_type, days=7):
+        started.append(device_type)
+        await asyncio.sleep(0)
+        # 两个设备均已开始后才返回，说明是并发执行
+        assert len(started) == 2
+        if device_type == "huawei":
+            raise RuntimeError("boom")
+        return {"success": True, "synced_days": days}
+
+    monkeypatch.setattr(DeviceManager, "sync_device_data", fake_sync)
+
+    results = await DeviceManager.sync_all_devices(db, user_id=1, days=3)
+    assert results == [
+        {"success": True, "synced_days": 3, "device": "garmin"},
+        {"success": False, "message": "同步失败: boom", "device": "huawei"},
+    ]
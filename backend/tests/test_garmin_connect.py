@@ -0,0 +1,1022 @@
+"""Garmin Connect服务测试（不依赖garminconnect库）"""
+import asyncio
+import pytest
+from collections import OrderedDict
+from datetime import date
+from app.services.data_collection import garmin_connect, garmin_parser
+from app.services.data_collection.garmin_connect import _with_retry, _extract_status
+
+
+class _FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class _FakeHTTPError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"{status_code} Error")
+        self.response = _FakeResponse(status_code, headers)
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    """记录退避时长而不真正等待"""
+    delays = []
+    monkeypatch.setattr(garmin_connect.time, "sleep", delays.append)
+    return delays
+
+
+def test_extract_status_from_response_and_message():
+    """测试从异常中提取状态码"""
+    assert _extract_status(_FakeHTTPError(429)) == 429
+    assert _extract_status(Exception("503 Server Error: Service Unavailable")) == 503
+    assert _extract_status(Exception("连接超时")) is None
+
+
+def test_with_retry_retries_on_rate_limit(no_sleep):
+    """测试429时退避重试并遵循Retry-After"""
+    calls = []
+
+    def flaky(arg):
+        calls.append(arg)
+        if len(calls) < 3:
+            raise _FakeHTTPError(429, {"Retry-After": "2"})
+        return {"ok": arg}
+
+    assert _with_retry(flaky, "2024-01-01") == {"ok": "2024-01-01"}
+    assert len(calls) == 3
+    assert len(no_sleep) == 2
+    assert all(d >= 2 for d in no_sleep)
+
+
+def test_with_retry_does_not_retry_other_errors(no_sleep):
+    """测试非限流错误直接抛出"""
+    def broken():
+        raise ValueError("bad payload")
+
+    with pytest.raises(ValueError):
+        _with_retry(broken)
+    assert no_sleep == []
+
+
+def test_with_retry_gives_up_after_max_attempts(no_sleep):
+    """测试超过最大重试次数后抛出原异常"""
+    def always_busy():
+        raise _FakeHTTPError(503)
+
+    with pytest.raises(_FakeHTTPError):
+        _with_retry(always_busy)
+    assert len(no_sleep) == garmin_connect._RETRY_MAX_ATTEMPTS - 1
+
+
+class _FakeGarmin:
+    """模拟garminconnect.Garmin客户端"""
+    login_error = None
+    login_calls = 0
+
+    def __init__(self, email, password, is_cn=False, **kwargs):
+        self.email = email
+
+    def login(self):
+        type(self).login_calls += 1
+        if type(self).login_error:
+            raise type(self).login_error
+
+    def get_heart_rates(self, date_str):
+        return {"calendarDate": date_str}
+
+    def get_all_day_stress(self, date_str):
+        raise ValueError("boom")
+
+
+@pytest.fixture
+def fake_garmin(monkeypatch):
+    """替换Garmin客户端并清空登录熔断状态"""
+    _FakeGarmin.login_error = None
+    _FakeGarmin.login_calls = 0
+    monkeypatch.setattr(garmin_connect, "GARMINCONNECT_AVAILABLE", True)
+    monkeypatch.setattr(garmin_connect, "Garmin", _FakeGarmin, raising=False)
+    monkeypatch.setattr(garmin_connect, "_auth_failures", {})
+    monkeypatch.setattr(garmin_connect, "get_response_cache", lambda: None)
+    monkeypatch.setattr(garmin_connect.settings, "garmin_token_dir", None)
+    return _FakeGarmin
+
+
+def test_auth_circuit_breaker_blocks_repeated_logins(fake_garmin):
+    """测试连续认证失败后进入冷却期，不再请求Garmin"""
+    fake_garmin.login_error = Exception("401 Unauthorized")
+    service = garmin_connect.GarminConnectService("tester@example.com", "wrong", user_id=1)
+
+    with pytest.raises(garmin_connect.GarminAuthenticationError):
+        service._ensure_authenticated()
+    with pytest.raises(garmin_connect.GarminAuthenticationError, match="重试"):
+        service._ensure_authenticated()
+    assert fake_garmin.login_calls == 1
+
+
+def test_auth_circuit_breaker_resets_on_success(fake_garmin):
+    """测试冷却期结束后登录成功会清除失败记录"""
+    key = garmin_connect._auth_account_key("tester@example.com", False)
+    garmin_connect._auth_failures[key] = (3, 0.0)
+    service = garmin_connect.GarminConnectService("tester@example.com", "secret", user_id=1)
+
+    service._ensure_authenticated()
+    assert service._authenticated
+    assert key not in garmin_connect._auth_failures
+
+
+async def test_async_getters_run_in_thread(fake_garmin, monkeypatch):
+    """测试异步包装方法返回同步方法的结果"""
+    service = garmin_connect.GarminConnectService("tester@example.com", "secret", user_id=1)
+    monkeypatch.setattr(service, "get_heart_rates", lambda d: {"date": d.isoformat()})
+    result = await service.aget_heart_rates(date(2024, 1, 1))
+    assert result == {"date": "2024-01-01"}
+
+
+class _FakeMFAClient:
+    def __init__(self):
+        self.resumed_with = None
+
+    def resume_login(self, client_state, mfa_code):
+        self.resumed_with = (client_state, mfa_code)
+
+
+def test_mfa_session_keeps_latest_per_owner(monkeypatch):
+    """测试同一账号重复发起MFA只保留最新会话"""
+    monkeypatch.setattr(garmin_connect, "_mfa_sessions", {})
+    first = garmin_connect._store_mfa_session(_FakeMFAClient(), {"s": 1}, "a@b.com", False, 1)
+    second = garmin_connect._store_mfa_session(_FakeMFAClient(), {"s": 2}, "A@b.com", False, 1)
+
+    assert first not in garmin_connect._mfa_sessions
+    assert garmin_connect._mfa_sessions[second]["client_state"] == {"s": 2}
+
+
+def test_resume_login_with_mfa_uses_server_side_session(fake_garmin, monkeypatch):
+    """测试通过session_id完成MFA验证并复用客户端"""
+    monkeypatch.setattr(garmin_connect, "_mfa_sessions", {})
+    mfa_client = _FakeMFAClient()
+    session_id = garmin_connect._store_mfa_session(mfa_client, {"s": 1}, "tester@example.com", False, 1)
+    service = garmin_connect.GarminConnectService("tester@example.com", "secret", user_id=1)
+
+    result = service.resume_login_with_mfa(session_id, "123456")
+
+    assert result["success"]
+    assert mfa_client.resumed_with == ({"s": 1}, "123456")
+    assert service.client is mfa_client
+    assert session_id not in garmin_connect._mfa_sessions
+
+
+def test_getters_dispatch_to_client_methods(fake_garmin):
+    """测试表驱动的getter调用对应客户端方法，非认证错误返回None"""
+    service = garmin_connect.GarminConnectService("tester@example.com", "secret", user_id=1)
+
+    assert service.get_heart_rates(date(2024, 1, 2)) == {"calendarDate": "2024-01-02"}
+    assert service.get_heart_rates("2024-01-03") == {"calendarDate": "2024-01-03"}
+    assert service.get_stress_data(date(2024, 1, 2)) is None
+
+
+def test_get_all_daily_data_fans_out_after_single_login(fake_garmin):
+    """测试汇总接口登录一次后并发请求各接口，单个接口失败不影响其他数据"""
+    service = garmin_connect.GarminConnectService("tester@example.com", "secret", user_id=1)
+
+    result = service.get_all_daily_data(date(2024, 1, 1))
+
+    assert result == {"heart_rate": {"calendarDate": "2024-01-01"}}
+    assert fake_garmin.login_calls == 1
+
+
+def test_compile_path_resolves_nested_keys():
+    data = {"a": {"b": {"c": 1, "d": {"e": 2}}}, "x": "n/a"}
+    assert garmin_parser._compile_path(("a", "b", "c"))(data) == 1
+    assert garmin_parser._compile_path(("a", "b", "d", "e"))(data) == 2
+    assert garmin_parser._compile_path(("x", "y"))(data) is None
+    assert garmin_parser._compile_path(("a", "missing", "c"))(data) is None
+    assert garmin_parser._compile_path(("a",))(None) is None
+    assert garmin_parser._compile_path(("a", "b")) is garmin_parser._compile_path(("a", "b"))
+
+
+def test_first_path_returns_first_populated_value():
+    """测试睡眠分数路径按优先级取第一个非空值"""
+    paths = garmin_parser._SLEEP_SCORE_PATHS
+    assert garmin_parser._first_path({"sleepScores": {"overall": {"value": 87}}, "sleepScore": 70}, paths) == 87
+    assert garmin_parser._first_path({"sleepScores": {"overall": None}, "sleepScore": 70}, paths) == 70
+    assert garmin_parser._first_path({"sleepScores": "n/a", "overallSleepScore": 65}, paths) == 65
+    assert garmin_parser._first_path({"sleepScore": 0}, paths) is None
+    assert garmin_parser._first_path(None, paths) is None
+
+
+SAMPLE_RAW_DATA = {
+    "totalSteps": 8500,
+    "totalKilocalories": 2300,
+    "activeKilocalories": 450,
+    "bmrKilocalories": 1850,
+    "moderateIntensityMinutes": 20,
+    "vigorousIntensityMinutes": 10,
+    "intensityMinutesGoal": 150,
+    "averageSpO2": 96,
+    "lowestSpO2": 90,
+    "avgWakingRespirationValue": 14.5,
+    "floorsAscended": 12,
+    "totalDistanceMeters": 6543.2,
+    "bodyBatteryChargedValue": 60,
+    "bodyBatteryDrainedValue": 55,
+    "sleep": {
+        "dailySleepDTO": {
+            "sleepTimeSeconds": 27000,
+            "deepSleepSeconds": 5400,
+            "remSleepSeconds": 6000,
+            "lightSleepSeconds": 15600,
+            "awakeSleepSeconds": 600,
+            "napTimeSeconds": 1800,
+            "avgHeartRate": 55,
+            "sleepScores": {"overall": {"value": 82, "qualifierKey": "GOOD"}},
+            "avgRespirationValue": 13.0,
+        },
+        "restingHeartRate": 50,
+        "avgOvernightHrv": 45.0,
+        "hrvStatus": {"status": "BALANCED"},
+    },
+    "heart_rate": {
+        "restingHeartRate": 52,
+        "maxHeartRate": 150,
+        "minHeartRate": 48,
+        "heartRateValues": [[1704067200000, 60], [1704068100000, 62]],
+    },
+    "body_battery": [
+        {"bodyBatteryLevel": 30},
+        {"bodyBatteryLevel": 80},
+        {"bodyBatteryLevel": 50},
+    ],
+    "stress": [{"stressLevelValue": 20}, {"stressLevelValue": 40}],
+}
+
+
+def test_parse_to_garmin_data_create(fake_garmin):
+    """测试Garmin原始数据解析"""
+    service = garmin_connect.GarminConnectService("tester@example.com", "secret", user_id=1)
+    result = service.parse_to_garmin_data_create(SAMPLE_RAW_DATA, 1, date(2024, 1, 1))
+
+    assert result.sleep_score == 82
+    assert result.total_sleep_duration == 450
+    assert result.deep_sleep_duration == 90
+    assert result.rem_sleep_duration == 100
+    assert result.light_sleep_duration == 260
+    assert result.awake_duration == 10
+    assert result.nap_duration == 30
+    assert result.hrv == 45.0
+    assert result.hrv_status == "BALANCED"
+    assert result.resting_heart_rate == 52
+    assert result.max_heart_rate == 150
+    assert result.min_heart_rate == 48
+    assert result.avg_heart_rate == 55
+    assert result.body_battery_most_charged == 80
+    assert result.body_battery_lowest == 30
+    assert result.body_battery_charged == 50
+    assert result.body_battery_drained == 30
+    assert result.stress_level == 30
+    assert result.steps == 8500
+    assert result.calories_burned == 2300
+    assert result.active_calories == 450
+    assert result.bmr_calories == 1850
+    assert result.active_minutes == 30
+    assert result.moderate_intensity_minutes == 20
+    assert result.vigorous_intensity_minutes == 10
+    assert result.intensity_minutes_goal == 150
+    assert result.spo2_avg == 96.0
+    assert result.spo2_min == 90.0
+    assert result.avg_respiration_awake == 14.5
+    assert result.avg_respiration_sleep == 13.0
+    assert result.floors_climbed == 12
+    assert result.distance_meters == 6543.2
+
+
+def test_parse_to_garmin_data_create_summary_fallbacks(fake_garmin):
+    """测试独立接口无数据时回退到summary字段"""
+    service = garmin_connect.GarminConnectService("tester@example.com", "secret", user_id=1)
+    raw_data = {
+        "sleepScores": {"overall": {"value": 75}},
+        "sleepTimeSeconds": 25200,
+        "restingHeartRate": 58,
+        "averageStressLevel": 33,
+        "bodyBatteryHighestValue": 90,
+        "bodyBatteryLowestValue": 15,
+        "highlyActiveSeconds": 1500,
+    }
+    result = service.parse_to_garmin_data_create(raw_data, 1, date(2024, 1, 1))
+
+    assert result.sleep_score == 75
+    assert result.total_sleep_duration == 420
+    assert result.resting_heart_rate == 58
+    assert result.stress_level == 33
+    assert result.body_battery_most_charged == 90
+    assert result.body_battery_lowest == 15
+    assert result.active_minutes == 25
+    assert result.avg_heart_rate is None
+
+
+def test_safe_numeric_conversions():
+    assert garmin_parser._safe_int(61.9) == 61
+    assert garmin_parser._safe_int("72.5") == 72
+    assert garmin_parser._safe_int({"total": 5, "value": "x"}) == 5
+    assert garmin_parser._safe_int(True) == 1
+    assert garmin_parser._safe_int([1]) is None
+    assert garmin_parser._safe_int("n/a") is None
+    assert garmin_parser._safe_float(3) == 3.0
+    assert garmin_parser._safe_float({"count": 3}) is None
+    assert garmin_parser._safe_float(None) is None
+
+
+def test_secs_to_mins_batch_handles_milliseconds_and_empty():
+    assert garmin_parser._secs_to_mins_batch((3600, 90_000_000, 0, None, "x", 59.9)) == (
+        60, 1500, None, None, None, 0
+    )
+
+
+def test_compact_payload_drops_unused_time_series():
+    sleep = {"dailySleepDTO": {"sleepTimeSeconds": 3600}, "sleepLevels": [{}] * 100}
+    stress = {"avgStressLevel": 30, "stressValuesArray": [[0, 20]] * 100}
+
+    assert garmin_connect._compact_payload("sleep", sleep) == {"dailySleepDTO": {"sleepTimeSeconds": 3600}}
+    assert garmin_connect._compact_payload("stress", stress) == {"avgStressLevel": 30}
+    assert garmin_connect._compact_payload("stress", [1, 2]) == [1, 2]
+
+
+def test_parse_empty_payload_returns_minimal_record(fake_garmin):
+    """测试各子数据都为空时直接返回只含用户和日期的记录"""
+    service = garmin_connect.GarminConnectService("tester@example.com", "secret", user_id=1)
+    result = service.parse_to_garmin_data_create(
+        {"sleep": {}, "stress": [], "body_battery": None}, 1, date(2024, 1, 1)
+    )
+
+    assert result.user_id == 1
+    assert result.record_date == date(2024, 1, 1)
+    assert result.steps is None and result.active_minutes is None
+    assert not garmin_parser._is_empty_payload({"totalSteps": 0})
+
+
+def test_log_payload_shape_lists_first_keys_only_at_debug(caplog):
+    data = {f"k{i}": i for i in range(50)}
+    with caplog.at_level("INFO", logger=garmin_connect.logger.name):
+        garmin_connect._log_payload_shape("get_user_summary", data)
+    assert not caplog.records
+
+    with caplog.at_level("DEBUG", logger=garmin_connect.logger.name):
+        garmin_connect._log_payload_shape("get_user_summary", data)
+        garmin_connect._log_payload_shape("get_stress_data", [1, 2, 3])
+    assert str([f"k{i}" for i in range(20)]) in caplog.records[0].getMessage()
+    assert "长度: 3" in caplog.records[1].getMessage()
+
+
+def test_first_truthy_matches_or_chain():
+    data = {"a": 0, "b": None, "c": 7}
+    assert garmin_parser._first_truthy(data, ("a", "c")) == 7
+    assert garmin_parser._first_truthy(data, ("b", "a")) == 0
+    assert garmin_parser._first_truthy(data, ("missing",)) is None
+
+
+def test_as_dict_normalizes_sub_payloads():
+    assert garmin_parser._as_dict({"a": 1}) == {"a": 1}
+    assert garmin_parser._as_dict([{"a": 1}, {"a": 2}]) == {"a": 1}
+    assert garmin_parser._as_dict([1, 2]) == {}
+    assert garmin_parser._as_dict([]) == {}
+    assert garmin_parser._as_dict(None) == {}
+
+
+def test_mean_stress_skips_no_reading_sentinels(monkeypatch):
+    items = [{"stressLevelValue": 20}, {"stressLevelValue": -1}, {"value": 40}, {"stressLevelValue": -2}, "bad"]
+    assert garmin_parser._mean_stress(items) == 30.0
+    assert garmin_parser._mean_stress([{"stressLevelValue": -1}]) is None
+
+    monkeypatch.setattr(garmin_parser, "NUMPY_AVAILABLE", False)
+    assert garmin_parser._mean_stress(items) == 30.0
+
+
+def test_first_hr_value_only_reads_dict_samples():
+    """测试心率采样兜底值只读取字典格式的首个采样"""
+    assert garmin_parser._first_hr_value({"heartRateValues": [{"value": 61}, {"value": 70}]}) == 61
+    assert garmin_parser._first_hr_value({"heartRateValues": [[1704067200000, 60]]}) is None
+    assert garmin_parser._first_hr_value({}) is None
+
+
+def test_sync_date_range_saves_in_batch(fake_garmin, no_sleep, db, monkeypatch):
+    """测试日期范围同步：批量写入新记录并更新已有记录"""
+    from app.models.daily_health import GarminData, HeartRateSample
+
+    db.add(GarminData(user_id=1, record_date=date(2024, 1, 1), steps=100, stress_level=10))
+    db.commit()
+
+    service = garmin_connect.GarminConnectService("tester@example.com", "secret", user_id=1)
+    payloads = {
+        date(2024, 1, 1): SAMPLE_RAW_DATA,
+        date(2024, 1, 2): SAMPLE_RAW_DATA,
+        date(2024, 1, 3): {},
+    }
+    monkeypatch.setattr(service, "get_all_daily_data", lambda d, force_refresh=False: payloads[d])
+
+    result = service.sync_date_range(db, 1, date(2024, 1, 1), date(2024, 1, 3), force_refresh=True)
+
+    assert result["success_count"] == 2
+    assert result["errors"] == [{"date": "2024-01-03", "status": "no_data"}]
+    rows = db.query(GarminData).order_by(GarminData.record_date).all()
+    assert [r.record_date for r in rows] == [date(2024, 1, 1), date(2024, 1, 2)]
+    assert all(r.steps == 8500 for r in rows)
+    assert [r["data_id"] for r in result["results"]] == [r.id for r in rows]
+    assert db.query(HeartRateSample).count() > 0
+
+
+def test_sync_skips_finalized_rows_already_in_db(fake_garmin, no_sleep, db, monkeypatch):
+    """测试已定稿且已入库的日期不再请求接口（force_refresh 时仍重新获取）"""
+    from app.models.daily_health import GarminData
+
+    existing = GarminData(user_id=1, record_date=date(2024, 1, 1), steps=100)
+    db.add(existing)
+    db.commit()
+
+    service = garmin_connect.GarminConnectService("tester@example.com", "secret", user_id=1)
+    fetched = []
+    refreshed = []
+    monkeypatch.setattr(
+        service, "get_all_daily_data",
+        lambda d, force_refresh=False: fetched.append(d) or refreshed.append(force_refresh) or SAMPLE_RAW_DATA
+    )
+
+    assert service.sync_daily_data(db, 1, date(2024, 1, 1)).id == existing.id
+    assert fetched == []
+
+    result = service.sync_date_range(db, 1, date(2024, 1, 1), date(2024, 1, 2))
+    assert fetched == [date(2024, 1, 2)]
+    assert (result["success_count"], result["skipped_count"]) == (1, 1)
+    assert result["results"][0] == {"date": "2024-01-01", "status": "skipped", "data_id": existing.id}
+
+    service.sync_daily_data(db, 1, date(2024, 1, 1), force_refresh=True)
+    assert fetched[-1] == date(2024, 1, 1)
+    assert refreshed == [False, True]
+
+
+async def test_async_sync_date_range_matches_sync_version(fake_garmin, no_sleep, monkeypatch):
+    """测试异步日期范围同步：并发获取后批量写入，统计结果与同步版本一致"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.database import Base
+    from app.models.daily_health import GarminData
+
+    # 写库在工作线程中执行，内存库需要跨线程共享同一连接
+    engine = create_engine(
+        "sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    service = garmin_connect.GarminConnectService("tester@example.com", "secret", user_id=1)
+    payloads = {date(2024, 1, 1): SAMPLE_RAW_DATA, date(2024, 1, 2): {}}
+
+    def fetch(target_date, force_refresh=False):
+        if target_date == date(2024, 1, 3):
+            raise RuntimeError("boom")
+        return payloads[target_date]
+
+    monkeypatch.setattr(service, "get_all_daily_data", fetch)
+
+    result = await service.async_sync_date_range(db, 1, date(2024, 1, 1), date(2024, 1, 3))
+
+    assert result["success_count"] == 1
+    assert result["errors"] == [
+        {"date": "2024-01-02", "status": "no_data"},
+        {"date": "2024-01-03", "status": "error", "error": "boom"},
+    ]
+    assert db.query(GarminData).one().steps == 8500
+    db.close()
+
+
+async def test_async_context_manager_logs_in_once_and_releases(fake_garmin):
+    """测试异步上下文管理器进入时登录、退出时释放客户端"""
+    async with garmin_connect.GarminConnectService("tester@example.com", "secret", user_id=1) as service:
+        assert service._authenticated
+        service._ensure_authenticated()
+    assert fake_garmin.login_calls == 1
+    assert service.client is None
+    assert not service._authenticated
+
+
+def test_get_service_reuses_instance_per_account(fake_garmin, monkeypatch):
+    """测试服务缓存：同账号同用户复用实例，密码变化时重建，超出容量淘汰最旧实例"""
+    monkeypatch.setattr(garmin_connect, "_service_cache", OrderedDict())
+    monkeypatch.setattr(garmin_connect, "_SERVICE_CACHE_MAXSIZE", 2)
+
+    first = garmin_connect.get_service("tester@example.com", "secret", user_id=1)
+    assert garmin_connect.get_service("tester@example.com", "secret", user_id=1) is first
+    assert garmin_connect.get_service("tester@example.com", "secret", user_id=2) is not first
+    first._ensure_authenticated()
+
+    # 密码变化时替换旧实例，并关闭旧实例的客户端
+    renewed = garmin_connect.get_service("tester@example.com", "changed", user_id=1)
+    assert renewed is not first and renewed.password == "changed"
+    assert first.client is None and not first._authenticated
+
+    renewed._ensure_authenticated()
+    garmin_connect.get_service("other@example.com", "secret", user_id=3)
+    assert len(garmin_connect._service_cache) == 2
+    assert garmin_connect.get_service("tester@example.com", "changed", user_id=1) is renewed
+    assert renewed._authenticated
+
+
+def test_fetch_keeps_client_when_closed_concurrently(fake_garmin, no_sleep, monkeypatch):
+    """测试请求进行中另一线程关闭服务时，本次请求仍使用已取得的客户端完成"""
+    service = garmin_connect.GarminConnectService("tester@example.com", "secret", user_id=1)
+    original = service._ensure_authenticated
+
+    def ensure_then_close():
+        client = original()
+        service.close()
+        return client
+
+    monkeypatch.setattr(service, "_ensure_authenticated", ensure_then_close)
+    assert service.get_heart_rates(date(2024, 1, 1)) == {"calendarDate": "2024-01-01"}
+    assert service.client is None
+
+
+def test_log_prefix_masks_email(fake_garmin):
+    """测试日志前缀隐藏邮箱或显示用户ID"""
+    assert garmin_connect.GarminConnectService("tester@example.com", "x")._log_prefix() == "[te***@example.com]"
+    assert garmin_connect.GarminConnectService("abc@example.com", "x")._log_prefix() == "[***]"
+    assert garmin_connect.GarminConnectService("tester@example.com", "x", user_id=7)._log_prefix() == "[用户 7]"
+
+
+def test_sync_date_range_propagates_auth_error(fake_garmin, no_sleep, db, monkeypatch):
+    """测试并发同步时认证错误向上抛出"""
+    service = garmin_connect.GarminConnectService("tester@example.com", "secret", user_id=1)
+
+    def fail(target_date, force_refresh=False):
+        raise garmin_connect.GarminAuthenticationError("bad password")
+
+    monkeypatch.setattr(service, "get_all_daily_data", fail)
+    with pytest.raises(garmin_connect.GarminAuthenticationError):
+        service.sync_date_range(db, 1, date(2024, 1, 1), date(2024, 1, 10))
+
+
+def test_adaptive_limiter_slows_down_after_429(no_sleep, monkeypatch):
+    """测试令牌桶：突发额度用完后排队，429后速率减半，60秒后恢复"""
+    clock = [100.0]
+    monkeypatch.setattr(garmin_connect.time, "monotonic", lambda: clock[0])
+    limiter = garmin_connect._AdaptiveLimiter(rate=2.0, burst=1, penalty_seconds=60)
+
+    limiter.acquire()
+    limiter.acquire()
+    assert no_sleep == [0.5]
+
+    clock[0] += 0.5
+    limiter.penalize()
+    assert limiter.refill_rate == 1.0
+    limiter.acquire()
+    assert no_sleep[-1] == 1.0
+
+    clock[0] += 61
+    limiter.acquire()
+    assert limiter.refill_rate == 2.0
+    assert len(no_sleep) == 2
+
+
+def test_adaptive_limiter_pauses_for_retry_after(no_sleep, monkeypatch):
+    """测试429带Retry-After时令牌桶暂停放行，暂停结束后按降低后的速率继续"""
+    clock = [100.0]
+    monkeypatch.setattr(garmin_connect.time, "monotonic", lambda: clock[0])
+    limiter = garmin_connect._AdaptiveLimiter(rate=2.0, burst=3, penalty_seconds=60)
+
+    limiter.penalize(retry_after=10)
+    limiter.acquire()
+    assert no_sleep == [11.0]
+
+    clock[0] += 20
+    limiter.acquire()
+    assert len(no_sleep) == 1
+
+
+def test_with_retry_penalizes_limiter_on_429(no_sleep):
+    """测试429会通知限速器降速，且每次重试前都会取令牌"""
+    class _Limiter:
+        acquired = 0
+        penalized = 0
+
+        def acquire(self):
+            self.acquired += 1
+
+        def penalize(self, retry_after=None):
+            self.penalized += 1
+
+    limiter = _Limiter()
+    calls = iter([_FakeHTTPError(429), _FakeHTTPError(503), "ok"])
+
+    def func():
+        result = next(calls)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    assert _with_retry(func, limiter=limiter) == "ok"
+    assert limiter.acquired == 3
+    assert limiter.penalized == 1
+
+
+def test_parse_keeps_zero_values(fake_garmin):
+    """测试0是有效值（如压力为0、步数为0），不会回退到其他字段"""
+    service = garmin_connect.GarminConnectService("tester@example.com", "secret", user_id=1)
+    raw_data = {"stress": {"avgStressLevel": 0}, "averageStressLevel": 40, "totalSteps": 0, "steps": 12}
+    result = service.parse_to_garmin_data_create(raw_data, 1, date(2024, 1, 1))
+
+    assert result.stress_level == 0
+    assert result.steps == 0
+
+
+def test_bucket_hr_samples_numpy_matches_python_path():
+    """测试心率分槽的向量化路径与逐条处理结果一致"""
+    base_ms = int(garmin_connect.datetime(2024, 1, 1, 8, 0).timestamp() * 1000)
+    hr_values = [[base_ms + i * 120_000, 60 + i % 7] for i in range(300)]
+    hr_values[3][1] = None
+    hr_values[10][1] = -1
+
+    vectorized = garmin_connect._bucket_hr_samples_numpy(hr_values)
+    # 混入非数值行，强制走逐条处理
+    fallback = garmin_connect._bucket_hr_samples(hr_values + [["bad", "row"]])
+
+    assert vectorized == fallback
+    assert vectorized[0] == (garmin_connect.dt_time(8, 0), 60)
+    assert len(vectorized) == 40
+
+
+def test_sync_heart_rate_samples_upserts_existing_slots(fake_garmin, db):
+    """测试重复同步同一天的心率采样时按时间槽更新而不是重复插入"""
+    from app.models.daily_health import HeartRateSample
+
+    service = garmin_connect.GarminConnectService("tester@example.com", "secret", user_id=1)
+    base_ms = int(garmin_connect.datetime(2024, 1, 1, 8, 0).timestamp() * 1000)
+    first = {"heartRateValues": [[base_ms + i * 900_000, 60] for i in range(4)]}
+    second = {"heartRateValues": [[base_ms + i * 900_000, 70] for i in range(6)]}
+
+    assert service._sync_heart_rate_samples(db, 1, date(2024, 1, 1), first) == 4
+    assert service._sync_heart_rate_samples(db, 1, date(2024, 1, 1), second) == 6
+
+    samples = db.query(HeartRateSample).order_by(HeartRateSample.sample_time).all()
+    assert len(samples) == 6
+    assert {s.heart_rate for s in samples} == {70}
+
+
+def test_sync_heart_rate_samples_fallback_replaces_day(fake_garmin, db, monkeypatch):
+    """测试不支持 ON CONFLICT 的数据库回退为删除后用 Core insert 重插"""
+    from app.models.daily_health import HeartRateSample
+
+    monkeypatch.setattr(garmin_connect, "_hr_sample_upsert", lambda db, rows: False)
+    service = garmin_connect.GarminConnectService("tester@example.com", "secret", user_id=1)
+    base_ms = int(garmin_connect.datetime(2024, 1, 1, 8, 0).timestamp() * 1000)
+    hr_data = {"heartRateValues": [[base_ms + i * 900_000, 65] for i in range(3)]}
+
+    assert service._sync_heart_rate_samples(db, 1, date(2024, 1, 1), hr_data) == 3
+    assert service._sync_heart_rate_samples(db, 1, date(2024, 1, 1), hr_data) == 3
+    assert db.query(HeartRateSample).count() == 3
+
+
+def test_sync_heart_rate_samples_without_unique_index(fake_garmin, db, monkeypatch):
+    """测试旧库缺少 (user_id, record_date, sample_time) 唯一索引时回退为删除重插，不报错"""
+    from weakref import WeakKeyDictionary
+    from sqlalchemy import text
+    from app.models.daily_health import HeartRateSample
+    from app.utils import db_utils
+
+    monkeypatch.setattr(db_utils, "_unique_index_cache", WeakKeyDictionary())
+    db.execute(text("DROP INDEX uq_hr_user_date_time"))
+    db.commit()
+    service = garmin_connect.GarminConnectService("tester@example.com", "secret", user_id=1)
+    base_ms = int(garmin_connect.datetime(2024, 1, 1, 8, 0).timestamp() * 1000)
+    first = {"heartRateValues": [[base_ms + i * 900_000, 60] for i in range(4)]}
+    second = {"heartRateValues": [[base_ms + i * 900_000, 70] for i in range(2)]}
+
+    assert service._sync_heart_rate_samples(db, 1, date(2024, 1, 1), first) == 4
+    assert service._sync_heart_rate_samples(db, 1, date(2024, 1, 1), second) == 2
+    assert [s.heart_rate for s in db.query(HeartRateSample)] == [70, 70]
+
+
+def test_sync_heart_rate_samples_batch_commits_once(fake_garmin, db, monkeypatch):
+    """测试多天心率采样分块写入、只提交一次"""
+    from app.models.daily_health import HeartRateSample
+
+    service = garmin_connect.GarminConnectService("tester@example.com", "secret", user_id=1)
+    monkeypatch.setattr(garmin_connect, "_HR_UPSERT_CHUNK_ROWS", 1)
+    commits = []
+    monkeypatch.setattr(db, "commit", lambda: commits.append(1) or type(db).commit(db))
+
+    saved = service._sync_heart_rate_samples_batch(db, 1, {
+        date(2024, 1, 1): SAMPLE_RAW_DATA["heart_rate"],
+        date(2024, 1, 2): SAMPLE_RAW_DATA["heart_rate"],
+        date(2024, 1, 3): None,
+    })
+
+    assert saved == db.query(HeartRateSample).count() > 0
+    assert {r.record_date for r in db.query(HeartRateSample)} == {date(2024, 1, 1), date(2024, 1, 2)}
+    assert len(commits) == 1
+
+
+def test_fetch_serves_cached_payload_without_login(fake_garmin, tmp_path, monkeypatch):
+    """测试响应缓存命中时不登录也不请求，空响应不写入缓存"""
+    from app.services.data_collection.garmin_cache import GarminResponseCache
+
+    cache = GarminResponseCache(str(tmp_path / "cache.db"))
+    monkeypatch.setattr(garmin_connect, "get_response_cache", lambda: cache)
+
+    first = garmin_connect.GarminConnectService("tester@example.com", "secret", user_id=1)
+    assert first.get_heart_rates(date(2024, 1, 1)) == {"calendarDate": "2024-01-01"}
+    assert first.get_body_battery(date(2024, 1, 1)) is None
+    assert fake_garmin.login_calls == 1
+
+    second = garmin_connect.GarminConnectService("tester@example.com", "secret", user_id=1)
+    assert second.get_heart_rates("2024-01-01") == {"calendarDate": "2024-01-01"}
+    assert fake_garmin.login_calls == 1
+    assert not second._authenticated
+
+    # 强制刷新时不读缓存，登录并重新请求
+    assert second.get_heart_rates("2024-01-01", force_refresh=True) == {"calendarDate": "2024-01-01"}
+    assert fake_garmin.login_calls == 2
+
+
+def test_response_cache_ttl_policy(tmp_path, monkeypatch):
+    """测试近两天的数据缓存会过期，更早的日期永久缓存"""
+    from datetime import timedelta
+    from app.services.data_collection import garmin_cache
+
+    assert garmin_cache.cache_ttl(date.today()) == 3600
+    assert garmin_cache.cache_ttl(date.today() - timedelta(days=2)) is None
+
+    cache = garmin_cache.GarminResponseCache(str(tmp_path / "cache.db"))
+    cache.set("fresh", {"a": 1}, ttl=None)
+    cache.set("stale", {"a": 1}, ttl=-1)
+    assert cache.get("fresh") == {"a": 1}
+    assert cache.get("stale") is None
+
+
+def test_http_validators_round_trip(tmp_path):
+    """测试条件请求校验信息的存取"""
+    from app.services.data_collection import garmin_cache
+
+    cache = garmin_cache.GarminResponseCache(str(tmp_path / "cache.db"))
+    assert cache.get_validators("url") is None
+    cache.set_validators("url", '"abc"', None, b'{"a": 1}')
+    assert cache.get_validators("url") == ('"abc"', None, b'{"a": 1}')
+    assert not garmin_cache.mount_garmin_adapter(None, cache, "global:tester@example.com")
+
+
+def test_get_all_daily_data_reuses_snapshot_when_summary_unchanged(fake_garmin, tmp_path, monkeypatch):
+    """测试摘要指纹未变化时直接复用上次的汇总结果，不再请求其他接口"""
+    from app.services.data_collection.garmin_cache import GarminResponseCache
+
+    monkeypatch.setattr(
+        garmin_connect, "get_response_cache", lambda: GarminResponseCache(str(tmp_path / "cache.db"))
+    )
+    service = garmin_connect.GarminConnectService("tester@example.com", "secret", user_id=1)
+    summary = {"totalSteps": 100}
+    sleep_calls = []
+    monkeypatch.setattr(service, "get_user_summary", lambda d, force_refresh=False: dict(summary))
+    monkeypatch.setattr(
+        service, "get_sleep_data",
+        lambda d, force_refresh=False: sleep_calls.append(force_refresh) or {"sleepTimeSeconds": 60}
+    )
+
+    first = service.get_all_daily_data("2024-01-01")
+    second = service.get_all_daily_data("2024-01-01")
+    summary["totalSteps"] = 200
+    third = service.get_all_daily_data("2024-01-01")
+    # 强制刷新时即使摘要未变化也重新请求
+    service.get_all_daily_data("2024-01-01", force_refresh=True)
+
+    assert sleep_calls == [False, False, True]
+    assert second == first
+    assert third["totalSteps"] == 200
+
+
+def test_saved_tokens_skip_password_login(fake_garmin, tmp_path, monkeypatch):
+    """测试登录后保存令牌，新实例优先用令牌登录"""
+    class _Garth:
+        def dump(self, path):
+            (tmp_path / "tokens" / "saved").mkdir(parents=True, exist_ok=True)
+
+    token_logins = []
+
+    def login(self, tokenstore=None):
+        if tokenstore:
+            token_logins.append(tokenstore)
+        else:
+            type(self).login_calls += 1
+        self.garth = _Garth()
+
+    monkeypatch.setattr(fake_garmin, "login", login)
+    monkeypatch.setattr(garmin_connect.settings, "garmin_token_dir", str(tmp_path / "tokens"))
+    monkeypatch.setattr(garmin_connect, "_token_store_path", lambda key: str(tmp_path / "tokens" / "saved"))
+
+    garmin_connect.GarminConnectService("tester@example.com", "secret", user_id=1)._ensure_authenticated()
+    service = garmin_connect.GarminConnectService("tester@example.com", "secret", user_id=1)
+    service._ensure_authenticated()
+
+    assert fake_garmin.login_calls == 1
+    assert token_logins == [str(tmp_path / "tokens" / "saved")]
+    assert service._authenticated
+
+
+def test_fast_json_parses_response_content():
+    """测试适配器返回的响应用 json_utils 解析正文"""
+    from app.services.data_collection import garmin_cache
+
+    class _Response:
+        content = b'{"calendarDate": "2024-01-01", "values": [1, 2]}'
+
+        def json(self, **kwargs):
+            raise AssertionError("should be replaced when orjson is available")
+
+    response = garmin_cache._fast_json(_Response())
+    if garmin_cache.json_utils.ORJSON_AVAILABLE:
+        assert response.json() == {"calendarDate": "2024-01-01", "values": [1, 2]}
+
+
+async def test_garmin_service_reuses_shared_http_client(monkeypatch):
+    """测试 GarminService 各实例复用同一个 HTTP 客户端，关闭后重新创建"""
+    import httpx
+    from app.services.data_collection import garmin_service
+
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"steps": 1000})
+
+    client = httpx.AsyncClient(base_url=garmin_service._GARMIN_API_BASE_URL, transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(garmin_service, "_http_client", client)
+
+    for _ in range(2):
+        data = await garmin_service.GarminService().fetch_daily_data(1, date(2024, 1, 1), "token")
+        assert data == {"steps": 1000}
+
+    assert [r.url.path for r in requests] == ["/wellness-api/rest/dailySummary"] * 2
+    assert requests[0].url.params["calendarDate"] == "2024-01-01"
+    assert garmin_service._get_http_client() is client
+
+    await garmin_service.aclose_http_client()
+    assert client.is_closed and garmin_service._http_client is None
+
+
+async def test_garmin_service_sync_range_fetches_concurrently(monkeypatch):
+    """测试日期范围同步：并发请求各日期（不超过并发上限），跳过无数据的日期，失败的日期单独返回"""
+    from app.services.data_collection import garmin_service
+
+    service = garmin_service.GarminService()
+    monkeypatch.setattr(service, "FETCH_CONCURRENCY", 2)
+    in_flight = []
+    max_in_flight = []
+
+    async def fetch(user_id, target_date, access_token=None):
+        in_flight.append(target_date)
+        max_in_flight.append(len(in_flight))
+        await asyncio.sleep(0)
+        in_flight.remove(target_date)
+        if target_date.day == 4:
+            raise RuntimeError("boom")
+        return None if target_date.day == 2 else {"steps": target_date.day * 1000}
+
+    batches = []
+    monkeypatch.setattr(service, "fetch_daily_data", fetch)
+    monkeypatch.setattr(service, "save_garmin_data_batch", lambda db, items: batches.append(items) or items)
+
+    saved, failed = await service.sync_garmin_range(None, 1, date(2024, 1, 1), date(2024, 1, 4), "token")
+
+    assert max(max_in_flight) == 2
+    assert len(batches) == 1
+    assert [(item.record_date, item.steps) for item in saved] == [
+        (date(2024, 1, 1), 1000),
+        (date(2024, 1, 3), 3000),
+    ]
+    assert failed == {date(2024, 1, 4): "boom"}
+
+
+def test_garmin_service_parse_validates_api_values():
+    """测试解析 Garmin API 数据时经过模型校验，类型不符的值被拒绝"""
+    from pydantic import ValidationError
+    from app.services.data_collection.garmin_service import GarminService
+
+    service = GarminService()
+    parsed = service.parse_garmin_data({"averageHeartRate": "62"}, 1, date(2024, 1, 1))
+    assert parsed.avg_heart_rate == 62
+    with pytest.raises(ValidationError):
+        service.parse_garmin_data({"averageHeartRate": "abc"}, 1, date(2024, 1, 1))
+
+
+@pytest.mark.parametrize("use_upsert", [True, False])
+def test_garmin_service_save_upserts_single_row(db, monkeypatch, use_upsert):
+    """测试保存同一天的数据时更新同一条记录，只更新非空字段"""
+    from app.models.daily_health import GarminData
+    from app.models.user import User
+    from app.schemas.daily_health import GarminDataCreate
+    from app.services.data_collection import garmin_service
+    from app.services.data_collection.garmin_service import GarminService
+
+    if not use_upsert:
+        monkeypatch.setattr(garmin_service, "_dialect_insert", lambda db: None)
+
+    user = User(name="测试用户")
+    db.add(user)
+    db.commit()
+
+    service = GarminService()
+    first = service.save_garmin_data(db, GarminDataCreate(
+        user_id=user.id, record_date=date(2024, 1, 1), steps=1000, avg_heart_rate=60
+    ))
+    second = service.save_garmin_data(db, GarminDataCreate(
+        user_id=user.id, record_date=date(2024, 1, 1), steps=2000
+    ))
+
+    assert second.id == first.id
+    rows = db.query(GarminData).filter(GarminData.user_id == user.id).all()
+    assert [(r.steps, r.avg_heart_rate) for r in rows] == [(2000, 60)]
+
+
+def test_garmin_service_save_without_unique_index(db, monkeypatch):
+    """测试旧库缺少 (user_id, record_date) 唯一索引时回退到先查后写，不报错"""
+    from weakref import WeakKeyDictionary
+    from sqlalchemy import text
+    from app.models.daily_health import GarminData
+    from app.models.user import User
+    from app.schemas.daily_health import GarminDataCreate
+    from app.services.data_collection.garmin_service import GarminService
+    from app.utils import db_utils
+
+    monkeypatch.setattr(db_utils, "_unique_index_cache", WeakKeyDictionary())
+    db.execute(text("DROP INDEX uq_garmin_user_date"))
+    user = User(name="测试用户")
+    db.add(user)
+    db.commit()
+
+    service = GarminService()
+    service.save_garmin_data(db, GarminDataCreate(user_id=user.id, record_date=date(2024, 1, 1), steps=1000))
+    service.save_garmin_data(db, GarminDataCreate(user_id=user.id, record_date=date(2024, 1, 1), avg_heart_rate=60))
+    service.save_garmin_data_batch(db, [
+        GarminDataCreate(user_id=user.id, record_date=date(2024, 1, 1), steps=2000),
+        GarminDataCreate(user_id=user.id, record_date=date(2024, 1, 2), steps=500),
+    ])
+
+    rows = db.query(GarminData).filter(GarminData.user_id == user.id).order_by(GarminData.record_date).all()
+    assert [(r.record_date.day, r.steps, r.avg_heart_rate) for r in rows] == [(1, 2000, 60), (2, 500, None)]
+
+
+def test_garmin_service_parse_maps_fields():
+    """测试 Garmin API 数据按字段映射解析，睡眠秒数转换为分钟"""
+    from app.schemas.daily_health import GarminDataCreate
+    from app.services.data_collection.garmin_service import GarminService
+
+    parsed = GarminService().parse_garmin_data(
+        {"averageHeartRate": 60, "steps": 8000, "sleepDurationSeconds": 27000, "deepSleepSeconds": 0},
+        1, date(2024, 1, 1)
+    )
+
+    expected = GarminDataCreate(
+        user_id=1, record_date=date(2024, 1, 1), avg_heart_rate=60, steps=8000, total_sleep_duration=450
+    )
+    assert parsed.model_dump() == expected.model_dump()
+
+
+@pytest.mark.parametrize("use_upsert", [True, False])
+def test_garmin_service_save_batch_updates_non_null_fields(db, monkeypatch, use_upsert):
+    """测试批量保存：已有记录只更新非空字段，新记录插入；不支持 ON CONFLICT 时回退结果相同"""
+    from app.models.daily_health import GarminData
+    from app.models.user import User
+    from app.schemas.daily_health import GarminDataCreate
+    from app.services.data_collection import garmin_service
+
+    if not use_upsert:
+        monkeypatch.setattr(garmin_service, "_dialect_insert", lambda db: None)
+
+    user = User(name="测试用户")
+    db.add(user)
+    db.commit()
+    db.add(GarminData(user_id=user.id, record_date=date(2024, 1, 1), steps=1000, avg_heart_rate=60))
+    db.commit()
+
+    saved = garmin_service.GarminService().save_garmin_data_batch(db, [
+        GarminDataCreate(user_id=user.id, record_date=date(2024, 1, 2), steps=500),
+        GarminDataCreate(user_id=user.id, record_date=date(2024, 1, 1), steps=2000),
+    ])
+
+    assert [(r.record_date.day, r.steps, r.avg_heart_rate) for r in saved] == [(2, 500, None), (1, 2000, 60)]
+    assert db.query(GarminData).filter(GarminData.user_id == user.id).count() == 2
+
+
+async def test_garmin_service_fetch_logs_http_errors(monkeypatch, caplog):
+    """测试网络错误记录日志并返回None"""
+    import httpx
+    from app.services.data_collection import garmin_service
+
+    def handler(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    client = httpx.AsyncClient(base_url=garmin_service._GARMIN_API_BASE_URL, transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(garmin_service, "_http_client", client)
+
+    with caplog.at_level("WARNING", logger=garmin_service.__name__):
+        assert await garmin_service.GarminService().fetch_daily_data(1, date(2024, 1, 1), "token") is None
+    assert "connection refused" in caplog.text
+    await client.aclose()
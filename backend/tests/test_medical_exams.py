@@ -69,3 +69,96 @@ def test_import_medical_exam_from_json(client, sample_user_data):
     data = response.json()
     assert "exam_id" in data
 
+
+
+def test_import_service_bulk_inserts_items(db):
+    """测试导入服务批量写入体检项目"""
+    from app.models.medical_exam import MedicalExamItem
+    from app.models.user import User
+    from app.services.data_collection.medical_exam_import import MedicalExamImportService
+
+    user = User(name="测试用户")
+    db.add(user)
+    db.commit()
+
+    exam = MedicalExamImportService.import_from_json(db, user.id, {
+        "exam": {"exam_date": "2024-01-01", "exam_type": "blood_routine"},
+        "items": [
+            {"item_name": "白细胞", "value": 6.5, "unit": "10^9/L"},
+            {"item_name": "血红蛋白", "value": 150, "is_abnormal": "high"},
+        ]
+    })
+
+    items = db.query(MedicalExamItem).filter(MedicalExamItem.exam_id == exam.id).order_by(MedicalExamItem.id).all()
+    assert [(i.item_name, i.value, i.is_abnormal) for i in items] == [
+        ("白细胞", 6.5, "normal"),
+        ("血红蛋白", 150.0, "high"),
+    ]
+    assert len(exam.items) == 2
+
+
+def test_import_service_from_csv(db, tmp_path):
+    """测试从CSV导入：逐行写入，空的数值列写入None"""
+    from app.models.user import User
+    from app.services.data_collection.medical_exam_import import MedicalExamImportService
+
+    user = User(name="测试用户")
+    db.add(user)
+    db.commit()
+
+    csv_path = tmp_path / "exam.csv"
+    csv_path.write_text(
+        "item_name,value,unit,is_abnormal\n"
+        "白细胞,6.5,10^9/L,normal\n"
+        "尿蛋白,,,abnormal\n",
+        encoding="utf-8"
+    )
+    exam = MedicalExamImportService.import_from_csv(
+        db, user.id, str(csv_path), {"exam_date": "2024-01-01", "exam_type": "blood_routine"}
+    )
+
+    items = sorted(exam.items, key=lambda i: i.id)
+    assert [(i.item_name, i.value, i.is_abnormal) for i in items] == [
+        ("白细胞", 6.5, "normal"),
+        ("尿蛋白", None, "abnormal"),
+    ]
+
+
+def test_import_service_from_csv_validates_rows(db, tmp_path):
+    """测试从CSV导入时校验各行，缺少项目名称的行被拒绝"""
+    from pydantic import ValidationError
+    from app.models.medical_exam import MedicalExamItem
+    from app.models.user import User
+    from app.services.data_collection.medical_exam_import import MedicalExamImportService
+
+    user = User(name="测试用户")
+    db.add(user)
+    db.commit()
+
+    csv_path = tmp_path / "exam.csv"
+    csv_path.write_text("value,item_name\n6.5,白细胞\n5.1\n", encoding="utf-8")
+    with pytest.raises(ValidationError):
+        MedicalExamImportService.import_from_csv(
+            db, user.id, str(csv_path), {"exam_date": "2024-01-01", "exam_type": "blood_routine"}
+        )
+    assert db.query(MedicalExamItem).count() == 0
+
+
+def test_normalize_item_name_prefers_longest_match():
+    """测试项目名称标准化：忽略大小写，模糊匹配时最长的标准名称优先"""
+    from app.services.exam_packages import normalize_item_name
+
+    assert normalize_item_name(" ca125 ") == ("tumor_ca125", "CA125")
+    assert normalize_item_name("CD4/CD8比值测定") == ("immune_cd4cd8", "CD4/CD8比值")
+    assert normalize_item_name("CD3+T细胞计数") == ("immune_cd3", "CD3+T细胞")
+    assert normalize_item_name("未知项目") == ("", "未知项目")
+    assert normalize_item_name("  ") == ("", "")
+
+
+def test_identify_package_by_item_overlap():
+    """测试套餐识别：套餐中一半以上项目出现即匹配，结果按套餐定义顺序返回"""
+    from app.services.exam_packages import identify_package
+
+    assert identify_package(["glucose_hba1c", "stool_occult", "unknown"]) == ["hba1c_test", "stool_full"]
+    assert identify_package(["cardiac_ck"]) == []
+    assert identify_package([]) == []